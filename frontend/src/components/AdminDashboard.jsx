@@ -3,28 +3,77 @@ import {
   BarChart, Bar, XAxis, YAxis, Tooltip, Legend, ResponsiveContainer, 
   AreaChart, Area, PieChart, Pie, Cell, LineChart, Line, CartesianGrid 
 } from 'recharts';
-import { ShieldAlert, Activity, Users, Clock, Terminal, Info } from 'lucide-react';
+import { ShieldAlert, Activity, Users, Clock, Terminal, Info, X } from 'lucide-react';
+
+const API_URL = 'http://127.0.0.1:5000';
+// Points per replay: plenty for the panel, a fraction of a long stored path
+const REPLAY_POINTS = 300;
+
+// Apply one streamed attempt to the panels (same shapes /admin/stats returns)
+const applyAttempt = (prev, { log, delta }) => {
+  if (!prev || prev.recent_logs.some((l) => l.id === log.id)) return prev;
+
+  const bump = (items, name) =>
+    items.some((x) => x.name === name)
+      ? items.map((x) => (x.name === name ? { ...x, value: x.value + 1 } : x))
+      : [...items, { name, value: 1 }];
+
+  const volume = prev.volume_data.some((d) => d.date === delta.date)
+    ? prev.volume_data.map((d) => (d.date === delta.date ? { ...d, bots: d.bots + delta.bots, humans: d.humans + delta.humans } : d))
+    : [{ date: delta.date, bots: delta.bots, humans: delta.humans }, ...prev.volume_data].slice(0, 7);
+
+  return {
+    ...prev,
+    recent_logs: [log, ...prev.recent_logs].slice(0, 20),
+    funnel_data: bump(prev.funnel_data, delta.funnel),
+    zoo_data: delta.bots ? bump(prev.zoo_data, delta.zoo) : prev.zoo_data,
+    heatmap_data: delta.hour ? prev.heatmap_data.map((h) => (h.hour === delta.hour ? { ...h, bots: h.bots + 1 } : h)) : prev.heatmap_data,
+    volume_data: volume,
+  };
+};
 
 const AdminDashboard = ({ onNavigate }) => {
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [replayId, setReplayId] = useState(null);
 
-  // Poll the API every 2 seconds for "Live" feel
+  // Load the full stats once, then let the server push each new attempt (SSE)
   useEffect(() => {
+    let source = null;
+    let closed = false;
+
     const fetchData = async () => {
       try {
-        const res = await fetch('http://127.0.0.1:5000/admin/stats');
+        const res = await fetch(`${API_URL}/admin/stats`);
         const json = await res.json();
         setData(json);
         setLoading(false);
+        return json;
       } catch (err) {
         console.error("Failed to fetch stats", err);
+        return null;
+      }
+    };
+
+    const connect = async () => {
+      const json = await fetchData();
+      if (closed) return;
+      if (!json) {
+        setTimeout(connect, 2000);
+        return;
       }
+      // The browser resumes from Last-Event-ID on its own after a dropped connection
+      source = new EventSource(`${API_URL}/admin/stream?since_id=${json.recent_logs[0]?.id ?? 0}`);
+      source.addEventListener('attempt', (e) => setData((prev) => applyAttempt(prev, JSON.parse(e.data))));
+      // Too far behind to replay: reload the full stats
+      source.addEventListener('reset', () => fetchData());
     };
 
-    fetchData();
-    const interval = setInterval(fetchData, 2000); // Live Refresh
-    return () => clearInterval(interval);
+    connect();
+    return () => {
+      closed = true;
+      if (source) source.close();
+    };
   }, []);
 
   if (loading) return <div className="p-10 text-center text-gray-500">Loading Security Operations Center...</div>;
@@ -171,12 +220,12 @@ const AdminDashboard = ({ onNavigate }) => {
              <h3 className="text-lg font-bold flex items-center gap-2 text-gray-800">
                 <Terminal size={18} className="text-gray-500" /> Live Threat Feed
              </h3>
-             <InfoTooltip text="A real-time ticker of blocked attempts. Look for rapid bursts of RED logs from the same source." />
+             <InfoTooltip text="A real-time ticker of blocked attempts. Look for rapid bursts of RED logs from the same source. Click a row to replay its mouse path." />
           </div>
 
           <div className="overflow-y-auto max-h-64 space-y-2 pr-2 custom-scrollbar">
             {data.recent_logs.map((log) => (
-              <div key={log.id} className="flex justify-between items-center bg-gray-50 p-3 rounded border-l-4 border-gray-300 hover:bg-gray-100 transition-colors">
+              <div key={log.id} onClick={() => setReplayId(log.id)} title="Replay mouse path" className="flex justify-between items-center bg-gray-50 p-3 rounded border-l-4 border-gray-300 hover:bg-gray-100 transition-colors cursor-pointer">
                 <div>
                     <span className={`text-xs font-bold px-2 py-1 rounded ${log.verdict === 'BOT' ? 'bg-red-100 text-red-800' : 'bg-green-100 text-green-800'}`}>
                         {log.verdict}
@@ -217,6 +266,76 @@ const AdminDashboard = ({ onNavigate }) => {
         </div>
 
       </div>
+
+      {replayId && <ReplayPanel attemptId={replayId} onClose={() => setReplayId(null)} />}
+    </div>
+  );
+};
+
+// --- REPLAY PANEL: Downsampled Path from /admin/attempts/<id>/path, Redrawn at Its Own Speed ---
+const ReplayPanel = ({ attemptId, onClose }) => {
+  const [replay, setReplay] = useState(null);
+  const [shown, setShown] = useState(0);
+
+  useEffect(() => {
+    let frame = null;
+    let cancelled = false;
+    fetch(`${API_URL}/admin/attempts/${attemptId}/path?points=${REPLAY_POINTS}`)
+      .then((res) => res.json())
+      .then((json) => {
+        if (cancelled) return;
+        setReplay(json);
+        const path = json.path || [];
+        if (!path.length) return;
+        const start = performance.now();
+        const step = (now) => {
+          const elapsed = now - start;
+          let n = 0;
+          while (n < path.length && path[n][2] - path[0][2] <= elapsed) n++;
+          setShown(n);
+          if (n < path.length && !cancelled) frame = requestAnimationFrame(step);
+        };
+        frame = requestAnimationFrame(step);
+      })
+      .catch((err) => console.error("Failed to fetch path", err));
+    return () => {
+      cancelled = true;
+      if (frame) cancelAnimationFrame(frame);
+    };
+  }, [attemptId]);
+
+  const path = replay?.path || [];
+  const xs = path.map((p) => p[0]);
+  const ys = path.map((p) => p[1]);
+  const pad = 20;
+  const box = path.length
+    ? `${Math.min(...xs) - pad} ${Math.min(...ys) - pad} ${Math.max(...xs) - Math.min(...xs) + 2 * pad} ${Math.max(...ys) - Math.min(...ys) + 2 * pad}`
+    : '0 0 100 100';
+  const points = (list) => list.map((p) => `${p[0]},${p[1]}`).join(' ');
+  const head = path[Math.max(shown - 1, 0)];
+
+  return (
+    <div className="fixed inset-0 bg-black/40 flex items-center justify-center z-50" onClick={onClose}>
+      <div className="bg-white rounded-xl shadow-xl p-5 w-full max-w-2xl" onClick={(e) => e.stopPropagation()}>
+        <div className="flex justify-between items-center mb-3">
+          <h3 className="text-lg font-bold text-gray-800">Replay #{attemptId}</h3>
+          <button onClick={onClose} className="text-gray-400 hover:text-gray-700"><X size={18} /></button>
+        </div>
+        {!replay && <div className="h-80 flex items-center justify-center text-gray-400 text-sm">Loading path...</div>}
+        {replay && !path.length && <div className="h-80 flex items-center justify-center text-gray-400 text-sm">{replay.error || 'No mouse path recorded'}</div>}
+        {path.length > 0 && (
+          <>
+            <svg viewBox={box} className="w-full h-80 bg-gray-50 rounded border border-gray-100">
+              <polyline points={points(path)} fill="none" stroke="#e5e7eb" strokeWidth={2} vectorEffect="non-scaling-stroke" />
+              <polyline points={points(path.slice(0, shown))} fill="none" stroke="#ef4444" strokeWidth={2} vectorEffect="non-scaling-stroke" />
+              <circle cx={head[0]} cy={head[1]} r={5} fill="#ef4444" />
+            </svg>
+            <p className="text-xs text-gray-500 mt-2">
+              {(replay.duration_ms / 1000).toFixed(2)} s, {path.length} of {replay.total_points} stored points
+            </p>
+          </>
+        )}
+      </div>
     </div>
   );
 };
@@ -3,6 +3,10 @@ import { useBehaviorTracking } from "../hooks/useBehaviorTracking";
 import { FaFingerprint, FaUser } from "react-icons/fa";
 import VerdictPopup from "./VerdictPopup";
 
+// Server overloaded (503), too slow or unreachable: a score in the SUSPICIOUS band sends the user
+// to the CAPTCHA, so a busy server costs real users a puzzle instead of the login
+const FALLBACK_VERDICT = { is_bot: false, confidence_score: 50, mode: "fallback" };
+
 const LoginPage = ({ onNavigate }) => {
   const [name, setName] = useState("");
   const [aadhar, setAadhar] = useState("");
@@ -11,7 +15,7 @@ const LoginPage = ({ onNavigate }) => {
   const [verdict, setVerdict] = useState(null);
   
   const loadTime = useRef(Date.now());
-  const { getPayload } = useBehaviorTracking();
+  const { getPayload, postPayload, finalizeSession } = useBehaviorTracking();
 
   useEffect(() => { loadTime.current = Date.now(); }, []);
 
@@ -20,99 +24,38 @@ const LoginPage = ({ onNavigate }) => {
     setAadhar(rawValue.replace(/(\d{4})(?=\d)/g, "$1 "));
   };
 
-  // --- HELPER: REPORT TO BACKEND ---
-  const reportBot = async (triggerSource, reason, payload) => {
-    const logData = {
-        verdict: "BOT",
-        confidence_score: 100.0,
-        trigger_source: triggerSource,
-        features_calculated: { 
-            note: reason, 
-            efficiency: 1.0, 
-            curvature: 0.0,
-            raw_path: payload.mouse_path // Send path even if empty (for Replay)
-        },
-        window_dims: `${window.outerWidth}x${window.outerHeight}`
-    };
-
-    // Fire and Forget (don't await, just send)
-    fetch("http://127.0.0.1:5000/log", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(logData),
-    }).catch(err => console.error("Logging failed:", err));
-
-    // Return the verdict object for the Popup
-    return {
-        is_bot: true,
-        confidence_score: 100.0,
-        features_calculated: logData.features_calculated
-    };
-  };
-
   const handleLogin = async (e) => {
     e.preventDefault();
     setIsLoading(true);
     const payload = getPayload();
     const timeElapsed = Date.now() - loadTime.current;
 
-    // 1. HONEYPOT
-    if (honeyPot.length > 0) {
-        console.warn("🍯 HONEYPOT CAUGHT");
-        const v = await reportBot("Honeypot", "Middle Name Filled", payload);
-        setTimeout(() => { setVerdict(v); setIsLoading(false); }, 500);
-        return;
-    }
-
-    // 2. GHOST WINDOW
-    if (window.outerWidth === 0 || window.outerHeight === 0) {
-        console.warn("👻 GHOST WINDOW");
-        const v = await reportBot("GhostWindow", "Zero Dimensions", payload);
-        setTimeout(() => { setVerdict(v); setIsLoading(false); }, 500);
-        return;
-    }
-
-    // 3. VAMPIRE CHECK
-    if (document.visibilityState === 'hidden') {
-        console.warn("🧛 VAMPIRE CHECK");
-        const v = await reportBot("VampireCheck", "Hidden Tab Execution", payload);
-        setTimeout(() => { setVerdict(v); setIsLoading(false); }, 500);
-        return;
-    }
-
-    // 4. SPEED TRAP
-    if (timeElapsed < 2500) {
-        console.warn("⚡ SPEED TRAP");
-        const v = await reportBot("SpeedTrap", `Too Fast (${timeElapsed}ms)`, payload);
-        setTimeout(() => { setVerdict(v); setIsLoading(false); }, 500);
-        return;
-    }
-
-    // 5. STATUE / TELEPATHY
-    if (payload.mouse_path.length === 0 && name.length > 0) {
-         console.warn("🔮 TELEPATHY/STATUE");
-         const v = await reportBot("StatueCheck", "No Mouse/Keys Recorded", payload);
-         setTimeout(() => { setVerdict(v); setIsLoading(false); }, 500);
-         return;
-    }
+    // Page state for the server's traps (honeypot, ghost window, hidden tab, speed, statue).
+    // The server's rule cascade decides; the model only scores what the traps let through
+    payload.client = {
+      middle_name: honeyPot,
+      name_filled: name.length > 0,
+      outer_width: window.outerWidth,
+      outer_height: window.outerHeight,
+      visibility: document.visibilityState,
+      page_ms: timeElapsed,
+    };
 
-    // 6. ML MODEL (If all checks pass)
     try {
       // Add screen dims for logging
       payload.screen_width = window.screen.width;
       payload.screen_height = window.screen.height;
 
-      const response = await fetch("http://127.0.0.1:5000/predict", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload),
-      });
-
-      const data = await response.json();
-      setVerdict(data);
+      // Features were streamed while the user was on the page; fall back to a full upload
+      let data = await finalizeSession({ screen_width: payload.screen_width, screen_height: payload.screen_height, client: payload.client });
+      if (!data) {
+        const response = await postPayload("http://127.0.0.1:5000/predict", payload);
+        data = response.ok ? await response.json() : { mode: "shed" };
+      }
+      setVerdict(data.mode === "shed" ? FALLBACK_VERDICT : data);
     } catch (error) {
       console.error("Backend Error:", error);
-      alert("Error: Ensure app.py is running!");
+      setVerdict(FALLBACK_VERDICT);
     } finally {
       setIsLoading(false);
     }
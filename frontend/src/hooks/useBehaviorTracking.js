@@ -1,9 +1,63 @@
 import { useEffect, useRef } from 'react';
 
+const API_URL = "http://127.0.0.1:5000";
+const CHUNK_INTERVAL_MS = 1000; // How often buffered points are streamed to the server
+const SCORING_TIMEOUT_MS = 8000; // Give up on /predict or finalize after this; the login page falls back
+
+// Binary telemetry body (same layout as ml/wire.py): 32-byte header, then packed columns
+const WIRE_TYPE = "application/vnd.realones.telemetry";
+const WIRE_HEADER_BYTES = 32;
+const FLAG_XY_FLOAT32 = 0x01;
+// Typed arrays use the platform's byte order; the format is little-endian
+const LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+
+/**
+ * Packs a payload into an ArrayBuffer: x, y as float32, then t, clicks and
+ * keystrokes as int32 milliseconds since the first timestamp.
+ */
+export const encodeTelemetry = ({ mouse_path = [], click_timestamps = [], keystroke_timestamps = [],
+                                  screen_width = 0, screen_height = 0 }, seq = -1) => {
+  const n = mouse_path.length;
+  const t0 = n ? mouse_path[0][2] : (click_timestamps[0] ?? keystroke_timestamps[0] ?? 0);
+  const buffer = new ArrayBuffer(WIRE_HEADER_BYTES + 4 * (3 * n + click_timestamps.length + keystroke_timestamps.length));
+
+  const header = new DataView(buffer);
+  header.setUint8(0, 0x52); // 'R'
+  header.setUint8(1, 0x54); // 'T'
+  header.setUint8(2, 1);    // version
+  header.setUint8(3, FLAG_XY_FLOAT32);
+  header.setUint32(4, n, true);
+  header.setUint32(8, click_timestamps.length, true);
+  header.setUint32(12, keystroke_timestamps.length, true);
+  header.setUint16(16, screen_width, true);
+  header.setUint16(18, screen_height, true);
+  header.setInt32(20, seq, true);
+  header.setFloat64(24, t0, true);
+
+  let offset = WIRE_HEADER_BYTES;
+  const column = (Type, length) => {
+    const view = new Type(buffer, offset, length);
+    offset += 4 * length;
+    return view;
+  };
+  const x = column(Float32Array, n), y = column(Float32Array, n), t = column(Int32Array, n);
+  for (let i = 0; i < n; i++) {
+    x[i] = mouse_path[i][0];
+    y[i] = mouse_path[i][1];
+    t[i] = mouse_path[i][2] - t0;
+  }
+  column(Int32Array, click_timestamps.length).set(click_timestamps.map(v => v - t0));
+  column(Int32Array, keystroke_timestamps.length).set(keystroke_timestamps.map(v => v - t0));
+  return buffer;
+};
+
 /**
  * Custom Hook: useBehaviorTracking
  * Purpose: Silently records mouse/keyboard physics for bot detection.
  * Logic Source: Your original index.html
+ *
+ * Mouse points are also streamed to a server session (/session/*) in small
+ * chunks, so the server keeps running features and scoring on submit is O(1).
  */
 export const useBehaviorTracking = () => {
   // Refs are used to store data without triggering re-renders (performance optimization)
@@ -11,14 +65,32 @@ export const useBehaviorTracking = () => {
   const clickTimestamps = useRef([]);
   const keystrokeTimestamps = useRef([]);
 
+  // Streaming session state
+  const sessionId = useRef(null);
+  const pendingPoints = useRef([]);  // Points recorded since the last chunk
+  const chunkSeq = useRef(0);
+  const sendQueue = useRef(Promise.resolve()); // Chunks are sent one at a time, in order
+  const binaryWire = useRef(false); // Server listed WIRE_TYPE in /session/start
+
   useEffect(() => {
+    // --- 0. Open a streaming session (scoring falls back to /predict if this fails) ---
+    fetch(`${API_URL}/session/start`, { method: "POST" })
+      .then(res => res.json())
+      .then(data => {
+        sessionId.current = data.session_id;
+        binaryWire.current = LITTLE_ENDIAN && (data.formats || []).includes(WIRE_TYPE);
+      })
+      .catch(() => { sessionId.current = null; });
+
     // --- 1. Mouse Movement (Path & Speed) ---
     const handleMouseMove = (e) => {
-      mousePath.current.push([
+      const point = [
         e.clientX, // X Coordinate
         e.clientY, // Y Coordinate
         Date.now() // Timestamp
-      ]);
+      ];
+      mousePath.current.push(point);
+      pendingPoints.current.push(point);
     };
 
     // --- 2. Click Mechanics (Dwell Time) ---
@@ -34,8 +106,11 @@ export const useBehaviorTracking = () => {
     window.addEventListener('mouseup', handleMouseUp);
     window.addEventListener('keydown', handleKeyDown);
 
+    const chunkTimer = setInterval(() => flushChunk(), CHUNK_INTERVAL_MS);
+
     // Cleanup: Remove listeners when component unmounts
     return () => {
+      clearInterval(chunkTimer);
       window.removeEventListener('mousemove', handleMouseMove);
       window.removeEventListener('mousedown', handleMouseDown);
       window.removeEventListener('mouseup', handleMouseUp);
@@ -43,6 +118,24 @@ export const useBehaviorTracking = () => {
     };
   }, []);
 
+  // Send buffered points as the next chunk; resolves once the server has them
+  const flushChunk = () => {
+    if (!sessionId.current || pendingPoints.current.length === 0) return sendQueue.current;
+    const points = pendingPoints.current;
+    const seq = chunkSeq.current++;
+    pendingPoints.current = [];
+
+    const request = binaryWire.current
+      ? { headers: { "Content-Type": WIRE_TYPE }, body: encodeTelemetry({ mouse_path: points }, seq) }
+      : { headers: { "Content-Type": "application/json" }, body: JSON.stringify({ seq, points }) };
+    sendQueue.current = sendQueue.current.then(() =>
+      fetch(`${API_URL}/session/${sessionId.current}/chunk`, { method: "POST", ...request }).then(res => {
+        if (!res.ok) sessionId.current = null; // Expired (404) or a chunk missing (409): fall back to a full /predict
+      })
+    ).catch(() => { sessionId.current = null; });
+    return sendQueue.current;
+  };
+
   // Return the exact payload structure your Python backend expects
   const getPayload = () => {
     return {
@@ -52,5 +145,40 @@ export const useBehaviorTracking = () => {
     };
   };
 
-  return { getPayload };
-};
\ No newline at end of file
+  // POST a payload to /predict: binary when the server takes it, JSON otherwise (or if it says 415).
+  // The binary body has no room for payload.client, so it goes in a header
+  const postPayload = async (url, payload) => {
+    if (binaryWire.current) {
+      const headers = { "Content-Type": WIRE_TYPE, "X-Client-Signals": JSON.stringify(payload.client || {}) };
+      const res = await fetch(url, { method: "POST", headers, body: encodeTelemetry(payload),
+                                     signal: AbortSignal.timeout(SCORING_TIMEOUT_MS) });
+      if (res.status !== 415) return res;
+      binaryWire.current = false;
+    }
+    return fetch(url, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(payload),
+                        signal: AbortSignal.timeout(SCORING_TIMEOUT_MS) });
+  };
+
+  // Score via the streaming session. Returns null if there is no usable session; an overloaded
+  // server (503) returns { mode: "shed" } so the page doesn't retry the same work on /predict
+  const finalizeSession = async (extra = {}) => {
+    await flushChunk();
+    if (!sessionId.current) return null;
+
+    const res = await fetch(`${API_URL}/session/${sessionId.current}/finalize`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        click_timestamps: clickTimestamps.current,
+        keystroke_timestamps: keystrokeTimestamps.current,
+        ...extra
+      }),
+      signal: AbortSignal.timeout(SCORING_TIMEOUT_MS),
+    });
+    sessionId.current = null;
+    if (res.status === 503) return { mode: "shed" };
+    return res.ok ? res.json() : null;
+  };
+
+  return { getPayload, postPayload, finalizeSession };
+};
@@ -0,0 +1,111 @@
+"""
+RateTracker: per-client admission ahead of the model.
+
+Every scoring request is counted against its IP and its network prefix
+(/24 for IPv4, /64 for IPv6) with a sliding-window counter: the previous
+window's count, weighted by how much of it still overlaps, plus the
+current window's count. That is three numbers per key whatever the
+traffic. Clients over the limit get a verdict without feature extraction
+or the forest.
+
+Keys are kept in LRU order and capped at `max_keys`. Idle keys are
+compacted away periodically.
+"""
+import time
+import ipaddress
+import threading
+from collections import OrderedDict
+
+
+class WindowCounter:
+    __slots__ = ("window_start", "prev", "curr", "last_seen")
+
+    def __init__(self, now):
+        self.window_start = now
+        self.prev = 0
+        self.curr = 0
+        self.last_seen = now
+
+    def hit(self, now, window_s):
+        """Counts one request and returns the estimated requests in the last window_s."""
+        elapsed = now - self.window_start
+        if elapsed >= window_s:
+            # Roll forward; more than one full window idle means the previous window was empty
+            self.prev = self.curr if elapsed < 2 * window_s else 0
+            self.curr = 0
+            self.window_start += window_s * int(elapsed // window_s)
+            elapsed = now - self.window_start
+        self.curr += 1
+        self.last_seen = now
+        return self.prev * (1 - elapsed / window_s) + self.curr
+
+
+def network_prefix(ip):
+    """'203.0.113.7' -> '203.0.113.0/24', IPv6 -> its /64. Unparseable input is returned as is."""
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    bits = 24 if addr.version == 4 else 64
+    return str(ipaddress.ip_network(f"{addr}/{bits}", strict=False))
+
+
+class RateTracker:
+    def __init__(self, window_s=60, ip_limit=30, prefix_limit=300, max_keys=100000, compact_every_s=30):
+        self.window_s = window_s
+        self.ip_limit = ip_limit
+        self.prefix_limit = prefix_limit
+        self.max_keys = max_keys
+        self.compact_every_s = compact_every_s
+        self._counters = OrderedDict()   # 'ip:<addr>' / 'net:<prefix>' -> WindowCounter
+        self._lock = threading.Lock()
+        self._last_compact = time.monotonic()
+        self._stats = {"checked": 0, "limited_ip": 0, "limited_prefix": 0,
+                       "evicted_capacity": 0, "compacted": 0}
+
+    def check(self, ip):
+        """
+        Counts a request from `ip`. Returns None if admitted, or
+        ('ip' | 'prefix', observed_rate) for the first limit it is over.
+        """
+        now = time.monotonic()
+        prefix = network_prefix(ip)
+        with self._lock:
+            if now - self._last_compact >= self.compact_every_s:
+                self._compact(now)
+            ip_rate = self._hit("ip:" + ip, now)
+            prefix_rate = self._hit("net:" + prefix, now)
+            self._stats["checked"] += 1
+            if ip_rate > self.ip_limit:
+                self._stats["limited_ip"] += 1
+                return "ip", ip_rate
+            if prefix_rate > self.prefix_limit:
+                self._stats["limited_prefix"] += 1
+                return "prefix", prefix_rate
+        return None
+
+    def _hit(self, key, now):
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = WindowCounter(now)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+                self._stats["evicted_capacity"] += 1
+        else:
+            self._counters.move_to_end(key)
+        return counter.hit(now, self.window_s)
+
+    def _compact(self, now):
+        # Keys idle for two windows have no effect on any rate; LRU order means they sit at the front
+        cutoff = now - 2 * self.window_s
+        while self._counters:
+            key, counter = next(iter(self._counters.items()))
+            if counter.last_seen >= cutoff:
+                break
+            del self._counters[key]
+            self._stats["compacted"] += 1
+        self._last_compact = now
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, tracked_keys=len(self._counters), max_keys=self.max_keys)
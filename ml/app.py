@@ -1,24 +1,142 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import pandas as pd
+from werkzeug.exceptions import HTTPException, BadRequest, RequestEntityTooLarge
 import numpy as np
-import joblib
 import sqlite3
 import json
-import sqlite3
-import json
-from datetime import datetime, timedelta 
+import os
+import atexit
+import time
+from datetime import datetime, timedelta, timezone
+
+from model_registry import ModelRegistry
+from log_writer import LogWriter
+import rollups
+import attempts
+from retention import Retention, ensure_indexes, incremental_vacuum_enabled
+from live_feed import LiveFeed, DatabaseTail, attempt_event, format_sse
+from path_codec import store_path
+from sessions import SessionStore
+from trajectory import normalize_path
+from features import extract_features, extract_features_batch, quick_features
+from replay_cache import ReplayCache, path_fingerprint
+from path_index import PathIndex, path_signature
+from admission import RateTracker
+from overload import LoadGovernor, heuristic_probability
+from cascade import Cascade, Context
+from metrics import Metrics, RequestProfiler
+from wire import WIRE_MIMETYPE, decode as decode_telemetry
 
 app = Flask(__name__)
 CORS(app)
 
+# Defaults resolve next to this file, so the service starts the same from any working directory
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- PAYLOAD LIMITS (Bound the Work One Request Can Cause) ---
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", 4 * 1024 * 1024))
+PATH_HARD_MAX_POINTS = int(os.environ.get("PATH_HARD_MAX_POINTS", 50000))   # rejected with 413 above this
+PATH_MAX_POINTS = int(os.environ.get("PATH_MAX_POINTS", 2000))              # downsampled above this
+PATH_DEDUPE = os.environ.get("PATH_DEDUPE", "0") == "1"                     # also dedupe timestamps, above PATH_MAX_POINTS only
+PATH_METHOD = os.environ.get("PATH_METHOD", "bucket")                       # or 'rdp' (see trajectory.py)
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+# Replay cache: identical (quantized) submissions reuse the earlier verdict
+REPLAY_CACHE_ENTRIES = int(os.environ.get("REPLAY_CACHE_ENTRIES", 100000))
+REPLAY_CACHE_MAX_BYTES = int(os.environ.get("REPLAY_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+REPLAY_CACHE_TTL_S = int(os.environ.get("REPLAY_CACHE_TTL_S", 3600))
+
+# Admission: scoring requests per sliding window, per client IP and per /24 (/64 for IPv6)
+RATE_WINDOW_S = int(os.environ.get("RATE_WINDOW_S", 60))
+RATE_LIMIT_PER_IP = int(os.environ.get("RATE_LIMIT_PER_IP", 30))          # over this -> BOT
+RATE_LIMIT_PER_PREFIX = int(os.environ.get("RATE_LIMIT_PER_PREFIX", 300)) # over this -> SUSPICIOUS (CAPTCHA)
+RATE_MAX_KEYS = int(os.environ.get("RATE_MAX_KEYS", 200000))             # tracked IPs + prefixes, LRU beyond
+TRUST_PROXY = os.environ.get("TRUST_PROXY", "0") == "1"                  # take the client from X-Forwarded-For
+
+# Overload protection (overload.py), per process: scoring requests running at once, how long one
+# waits for a slot before it is shed with a 503, its latency budget, and the in-flight count that
+# switches degraded scoring on (heuristic on two features, no raw path logged)
+MAX_INFLIGHT = int(os.environ.get("MAX_INFLIGHT", 64))
+ADMIT_QUEUE_MS = int(os.environ.get("ADMIT_QUEUE_MS", 50))
+LATENCY_BUDGET_MS = int(os.environ.get("LATENCY_BUDGET_MS", 250))
+DEGRADE_INFLIGHT = int(os.environ.get("DEGRADE_INFLIGHT", 48))
+DEGRADE_HOLD_S = float(os.environ.get("DEGRADE_HOLD_S", 5))
+SHED_RETRY_AFTER_S = 1
+
+# Server-side traps (rule cascade): a login submitted sooner than this after page load is scripted
+SPEED_TRAP_MS = int(os.environ.get("SPEED_TRAP_MS", 2500))
+
+# Model: hot-swapped when MODEL_PATH changes on disk (checked every MODEL_WATCH_S, 0 = off)
+# or via /admin/model/*. Artifacts named in admin requests must live under MODEL_DIR.
+MODEL_PATH = os.environ.get("MODEL_PATH", os.path.join(ML_DIR, "model.pkl"))
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(ML_DIR, "models"))
+MODEL_WATCH_S = float(os.environ.get("MODEL_WATCH_S", 5))
+MODEL_MMAP = os.environ.get("MODEL_MMAP", "1") == "1"   # map model.forest/ instead of unpickling (model_registry.py)
+SHADOW_QUEUE_SIZE = int(os.environ.get("SHADOW_QUEUE_SIZE", 1000))
+
+# Tiered scoring: the distilled tree next to the model (model.fast/, written by distill.py) scores
+# first, and only probabilities inside [TIER_BAND_LOW, TIER_BAND_HIGH] go on to the forest. The default
+# band is wider than the page's 30-70 SUSPICIOUS band, so a tree that is slightly off near the edges
+# still escalates. TIER_AUDIT_RATE of the tree's verdicts are also scored by the forest, for agreement
+TIER_BAND_LOW = float(os.environ.get("TIER_BAND_LOW", 0.2))
+TIER_BAND_HIGH = float(os.environ.get("TIER_BAND_HIGH", 0.8))
+TIER_AUDIT_RATE = float(os.environ.get("TIER_AUDIT_RATE", 0.01))
+
 # --- DATABASE SETUP ---
-DB_NAME = "database.db"
+DB_NAME = os.environ.get("DB_PATH", os.path.join(ML_DIR, "database.db"))
+
+# Retention config (see retention.py): paths, then whole rows, move to monthly archive files
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), "archive"))
+RETENTION_PATH_DAYS = int(os.environ.get("RETENTION_PATH_DAYS", 30))
+RETENTION_ROW_DAYS = int(os.environ.get("RETENTION_ROW_DAYS", 180))
+RETENTION_INTERVAL_S = int(os.environ.get("RETENTION_INTERVAL_S", 3600))   # 0 = only `python retention.py --run`
+
+# Near-duplicate path index (see path_index.py): signatures of model-scored paths, next to the database
+PATH_INDEX_DIR = os.environ.get("PATH_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), "path_index"))
+PATH_INDEX_RADIUS = float(os.environ.get("PATH_INDEX_RADIUS", 0.08))
+PATH_INDEX_MAX_ENTRIES = int(os.environ.get("PATH_INDEX_MAX_ENTRIES", 250000))   # ~450 B each in memory, per worker
+PATH_INDEX_TAIL_S = float(os.environ.get("PATH_INDEX_TAIL_S", 1.0))   # with several workers: read each other's appends
+
+# /admin/attempts page size, and points per /admin/attempts/<id>/path unless the client asks for more
+ATTEMPTS_PAGE_SIZE = 50
+ATTEMPTS_MAX_PAGE = 500
+REPLAY_POINTS = int(os.environ.get("REPLAY_POINTS", 300))
+REPLAY_MAX_POINTS = int(os.environ.get("REPLAY_MAX_POINTS", 5000))
+
+# Largest micro-batch accepted by /predict/batch
+MAX_BATCH_SIZE = 512
+
+# Write-behind logging: commit every N rows or T ms, whichever comes first
+LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", 100))
+LOG_FLUSH_MS = int(os.environ.get("LOG_FLUSH_MS", 50))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+LOG_OVERFLOW_POLICY = os.environ.get("LOG_OVERFLOW_POLICY", "drop_oldest")  # or drop_newest / block
+
+# Live dashboard stream: events kept in memory for reconnects, and how far back a resume may reach
+STREAM_BUFFER_SIZE = 1000
+STREAM_RESUME_LIMIT = 500
+STREAM_KEEPALIVE_S = 15
+# With several serve.py workers the feed reads new rows from the database this often (see live_feed.py)
+STREAM_TAIL_MS = int(os.environ.get("STREAM_TAIL_MS", 250))
+
+# Streaming telemetry sessions (/session/*): idle TTL, open-session cap, points kept for replay
+SESSION_TTL_S = int(os.environ.get("SESSION_TTL_S", 600))
+SESSION_MAX_OPEN = int(os.environ.get("SESSION_MAX_OPEN", 10000))
+SESSION_MAX_REPLAY_POINTS = int(os.environ.get("SESSION_MAX_REPLAY_POINTS", 5000))
+SESSION_MAX_CHUNK_POINTS = 2000
 
 def init_db():
     """Creates the table if it doesn't exist."""
-    conn = sqlite3.connect(DB_NAME)
+    # Autocommit mode: the schema transaction below is managed explicitly
+    conn = sqlite3.connect(DB_NAME, timeout=30, isolation_level=None)
+    # Only takes effect on a new file (before the first table); older files: retention.py --enable-incremental-vacuum
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    # WAL lets the dashboard read while the log writer commits
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
+    # Several processes may start at once (serve.py workers, rescore.py): take the write lock
+    # before reading the schema so only one of them adds a missing column
+    cursor.execute("BEGIN IMMEDIATE")
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS login_attempts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -27,99 +145,514 @@ def init_db():
             confidence_score REAL,     -- 0.0 to 100.0
             trigger_source TEXT,       -- 'Honeypot', 'SpeedTrap', 'ML_Model', 'GhostWindow'
             fail_reason TEXT,          -- Details ('Middle Name Filled', 'Efficiency 1.0')
-            mouse_path TEXT,           -- JSON string of the raw path (for Replay)
+            mouse_path TEXT,           -- Raw path for Replay: packed BLOB (path_codec.py) or legacy JSON
             window_dims TEXT,          -- '1920x1080' (for Ghost Check)
-            ip_address TEXT            -- (Optional) for counting unique attackers
+            ip_address TEXT,           -- (Optional) for counting unique attackers
+            input_timings TEXT,        -- JSON click/keystroke timestamps, so rescore.py can recompute features
+            label INTEGER              -- Reviewed ground truth (0 human, 1 bot), used by train.py
         )
     ''')
-    conn.commit()
+    # Columns added after the first release
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(login_attempts)")]
+    for name, decl in (('input_timings', 'TEXT'), ('label', 'INTEGER')):
+        if name not in columns:
+            cursor.execute(f"ALTER TABLE login_attempts ADD COLUMN {name} {decl}")
+    cursor.execute("COMMIT")
+    # Dashboard counters, kept current by a trigger on login_attempts
+    if rollups.ensure_rollups(conn) and cursor.execute("SELECT 1 FROM login_attempts LIMIT 1").fetchone():
+        print("⚠️ attempt_rollups is new: run `python rollups.py --backfill` to count existing attempts")
+    # Feed / time / verdict / trigger indexes (retention.py); a no-op once they exist
+    ensure_indexes(conn)
+    if not incremental_vacuum_enabled(conn):
+        print("⚠️ auto_vacuum is off: run `python retention.py --enable-incremental-vacuum` once to reclaim archived space")
     conn.close()
     print("✅ Database Initialized (login_attempts table ready)")
 
-# Initialize DB immediately on start
-init_db()
-
 # --- MODEL LOADING ---
-print("Loading Model...")
-try:
-    model = joblib.load('model.pkl')
-    print("✅ Model Loaded Successfully!")
-except:
-    print("⚠️ WARNING: model.pkl not found. Predictions will fail, but Logging will work.")
-    model = None
-
-# --- HELPER: LOGGING FUNCTION ---
+# The registry holds a compiled copy of the forest (one traversal gives verdict + probability),
+# and its fast tier when distill.py has written one. Nothing is loaded at import: create_app() does it
+models = ModelRegistry(MODEL_PATH, watch_s=MODEL_WATCH_S, shadow_queue=SHADOW_QUEUE_SIZE, mmap=MODEL_MMAP,
+                       band=(TIER_BAND_LOW, TIER_BAND_HIGH), audit_rate=TIER_AUDIT_RATE)
+atexit.register(models.close)
+
+# --- RETENTION (Archive Old Paths / Rows, Incremental VACUUM) ---
+retention = Retention(DB_NAME, ARCHIVE_DIR, path_days=RETENTION_PATH_DAYS,
+                      row_days=RETENTION_ROW_DAYS, interval_s=RETENTION_INTERVAL_S)
+atexit.register(retention.close)
+
+# --- METRICS (Prometheus Text on /metrics) ---
+metrics = Metrics(prefix="realones")
+metrics.describe("requests_total", "HTTP requests by endpoint and status")
+metrics.describe("errors_total", "Requests that failed inside a scoring route")
+metrics.describe("attempts_total", "Logged attempts by verdict and trigger source")
+metrics.describe("request_seconds", "Wall time per request, by endpoint")
+metrics.describe("stage_seconds", "Time per scoring stage, by route and stage")
+metrics.describe("shed_total", "Scoring requests answered 503 because no slot freed up in time")
+metrics.describe("log_writer_seconds", "Writer thread time per batch: row encoding, SQLite transaction")
+profiler = RequestProfiler()
+
+# Client-reported trigger sources are free text; anything else is counted as 'other'
+KNOWN_VERDICTS = {"BOT", "HUMAN", "SUSPICIOUS"}
+KNOWN_TRIGGERS = {"ML_Model", "ReplayCache", "RateLimit", "Honeypot", "GhostWindow",
+                  "VampireCheck", "SpeedTrap", "StatueCheck", "NearDuplicate", "Degraded_Heuristic"}
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profile = profiler.maybe_start() if request.endpoint not in ('metrics_endpoint', 'stream_admin_events') else None
+
+@app.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    endpoint = request.endpoint or 'unmatched'
+    metrics.observe("request_seconds", elapsed, endpoint=endpoint)
+    metrics.count("requests_total", endpoint=endpoint, status=response.status_code)
+    if g.get('profile') is not None:
+        profiler.finish(g.pop('profile'), endpoint, elapsed)
+    return response
+
+# --- HELPER: LOGGING FUNCTION (Write-Behind Queue) ---
+INSERT_ATTEMPT_SQL = '''
+    INSERT INTO login_attempts 
+    (timestamp, verdict, confidence_score, trigger_source, fail_reason, mouse_path, window_dims, ip_address,
+     input_timings)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def attempt_row(data):
+    """Converts an event dict into an INSERT row (runs on the writer thread)"""
+    # Packed delta-encoded BLOB (see path_codec.py); JSON text only if the path can't be packed.
+    # None: not kept (degraded mode), stored as NULL
+    raw_path = data.get('features_calculated', {}).get('raw_path', [])
+    mouse_path_blob = store_path(raw_path) if raw_path is not None else None
+    return (
+        data.get('logged_at'),
+        data.get('verdict'),
+        data.get('confidence_score'),
+        data.get('trigger_source'),
+        data.get('features_calculated', {}).get('note', 'Unknown'),
+        mouse_path_blob,
+        data.get('window_dims', 'Unknown'),
+        data.get('ip_address'),
+        json.dumps(data['input_timings']) if data.get('input_timings') else None
+    )
+
+live_feed = LiveFeed(buffer_size=STREAM_BUFFER_SIZE)
+# Started by start_background(workers > 1); it then publishes every worker's rows instead of the hook below
+feed_tail = DatabaseTail(
+    live_feed,
+    lambda after_id: [(r[0], attempt_event(*r)) for r in attempts_since(after_id, STREAM_RESUME_LIMIT)],
+    interval_s=STREAM_TAIL_MS / 1000,
+)
+
+def on_attempts_committed(committed):
+    for _, data in committed:
+        print(f"📝 Logged: {data.get('trigger_source')} -> {data.get('verdict')}")
+    # Push the new rows to every open dashboard (see /admin/stream)
+    if not feed_tail.running:
+        live_feed.publish([
+            (row_id, attempt_event(
+                row_id, data.get('logged_at'), data.get('verdict'), data.get('trigger_source'),
+                data.get('features_calculated', {}).get('note', 'Unknown'), data.get('confidence_score')
+            ))
+            for row_id, data in committed
+        ])
+    # Model-scored paths join the near-duplicate index under their row ids
+    signed = [(row_id, data["path_signature"]) for row_id, data in committed
+              if data.get("path_signature") is not None]
+    if signed:
+        path_index.add([row_id for row_id, _ in signed], [signature for _, signature in signed])
+
+log_writer = LogWriter(
+    DB_NAME, INSERT_ATTEMPT_SQL, attempt_row,
+    on_commit=on_attempts_committed,
+    batch_size=LOG_BATCH_SIZE,
+    flush_ms=LOG_FLUSH_MS,
+    max_queue=LOG_QUEUE_SIZE,
+    overflow=LOG_OVERFLOW_POLICY,
+    observe=lambda stage, seconds: metrics.observe("log_writer_seconds", seconds, stage=stage),
+)
+# Flush whatever is still queued when the process exits
+atexit.register(log_writer.close)
+
 def log_attempt(data):
-    """Writes a single event to the SQLite Database"""
+    """Queues a single event for the SQLite Database"""
+    log_attempts([data])
+
+def log_attempts(events):
+    """Queues events; the writer thread commits them in batches"""
+    # Stamp the request time (UTC, same format as CURRENT_TIMESTAMP), not the flush time
+    logged_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    for data in events:
+        data['logged_at'] = logged_at
+        verdict, trigger = data.get('verdict'), data.get('trigger_source')
+        metrics.count("attempts_total",
+                      verdict=verdict if verdict in KNOWN_VERDICTS else "other",
+                      trigger_source=trigger if trigger in KNOWN_TRIGGERS else "other")
+        if not log_writer.submit(data):
+            print(f"⚠️ Log queue full, dropped: {data.get('trigger_source')} -> {data.get('verdict')}")
+
+# --- TRAJECTORY NORMALIZATION (Runs Before extract_features) ---
+def path_too_long(raw_data):
+    path = raw_data.get('mouse_path', [])
+    return isinstance(path, (list, np.ndarray)) and len(path) > PATH_HARD_MAX_POINTS
+
+def normalize_payload(raw_data):
+    """
+    Downsamples a mouse_path longer than PATH_MAX_POINTS (trajectory.py) for scoring. Paths within
+    the limit are scored as sent, like the training data. Returns raw_data itself if nothing changed.
+    """
+    path = raw_data.get('mouse_path', [])
+    if len(path) <= PATH_MAX_POINTS:
+        return raw_data
+    normalized = normalize_path(path, PATH_MAX_POINTS, PATH_DEDUPE, PATH_METHOD)
+    if len(normalized) == len(path):
+        return raw_data
+    # Binary bodies stay arrays end to end; JSON ones go back to lists (they're echoed in the response).
+    # The path as sent is kept for the log, so Replay and rescore.py see the original
+    return dict(raw_data, mouse_path=normalized if isinstance(path, np.ndarray) else normalized.tolist(),
+                raw_mouse_path=path)
+
+def logged_path(raw_data):
+    """The mouse path as the client sent it, before normalize_payload."""
+    return raw_data.get('raw_mouse_path', raw_data.get('mouse_path', []))
+
+# --- HELPER: VERDICT PACKAGING ---
+def input_timings(raw_data):
+    """Click / keystroke timestamps as sent, kept with the row for offline re-scoring."""
+    return {
+        "click_timestamps": raw_data.get('click_timestamps', []),
+        "keystroke_timestamps": raw_data.get('keystroke_timestamps', [])
+    }
+
+def build_result(raw_data, features, prediction, probability):
+    """Turns model output into the event dict that log_attempt stores."""
+    is_bot = bool(prediction == 1)
+    return {
+        "verdict": "BOT" if is_bot else "HUMAN",
+        "confidence_score": float(probability * 100),
+        "trigger_source": "ML_Model",
+        "features_calculated": {
+            "efficiency": float(features[2]),
+            "curvature": float(features[3]),
+            "note": f"Model Prediction (Prob: {probability:.2f})",
+            "raw_path": logged_path(raw_data) # Save raw path for replay
+        },
+        "window_dims": f"{raw_data.get('screen_width',0)}x{raw_data.get('screen_height',0)}",
+        "input_timings": input_timings(raw_data)
+    }
+
+replay_cache = ReplayCache(
+    max_entries=REPLAY_CACHE_ENTRIES,
+    max_bytes=REPLAY_CACHE_MAX_BYTES,
+    ttl_s=REPLAY_CACHE_TTL_S,
+)
+
+# Opened (entries.bin loaded and merged) by create_app; start_background moves later merges to their own thread
+path_index = PathIndex(PATH_INDEX_DIR, radius=PATH_INDEX_RADIUS, max_entries=PATH_INDEX_MAX_ENTRIES)
+atexit.register(path_index.close)
+# Attempts retention moves out of database.db leave the index (and entries.bin) too
+retention.on_archive = path_index.compact
+
+def remember_verdict(fingerprint, result):
+    """Caches the small part of a model verdict that a replay needs."""
+    replay_cache.put(fingerprint, {
+        "verdict": result["verdict"],
+        "confidence_score": result["confidence_score"],
+        "efficiency": result["features_calculated"]["efficiency"],
+        "curvature": result["features_calculated"]["curvature"],
+    })
+
+def build_replay_result(raw_data, earlier, times_seen):
+    """Event for a resubmitted path: the earlier verdict, marked as a replay."""
+    return {
+        "verdict": earlier["verdict"],
+        "confidence_score": earlier["confidence_score"],
+        "trigger_source": "ReplayCache",
+        "features_calculated": {
+            "efficiency": earlier["efficiency"],
+            "curvature": earlier["curvature"],
+            "note": "Replayed Submission",  # constant, so the dashboard groups all replays
+            "times_seen": times_seen + 1,
+            "raw_path": logged_path(raw_data)
+        },
+        "window_dims": f"{raw_data.get('screen_width',0)}x{raw_data.get('screen_height',0)}",
+        "input_timings": input_timings(raw_data)
+    }
+
+# --- ADMISSION (Per-IP / Per-Prefix Rate, Checked Before Anything Else) ---
+rate_tracker = RateTracker(
+    window_s=RATE_WINDOW_S,
+    ip_limit=RATE_LIMIT_PER_IP,
+    prefix_limit=RATE_LIMIT_PER_PREFIX,
+    max_keys=RATE_MAX_KEYS,
+)
+
+def client_ip():
+    """The caller's address; the first X-Forwarded-For hop only behind a trusted proxy."""
+    if TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+def admission_result(ip):
+    """None if `ip` is within its rate, else a ready verdict (no features, no model)."""
+    limited = rate_tracker.check(ip)
+    if limited is None:
+        return None
+    scope, rate = limited
+    # One noisy IP is a bot; a busy prefix may be a shared NAT, so send it to the CAPTCHA
+    return {
+        "verdict": "BOT" if scope == "ip" else "SUSPICIOUS",
+        "confidence_score": 100.0 if scope == "ip" else 50.0,
+        "trigger_source": "RateLimit",
+        "features_calculated": {
+            "note": "Per-IP Rate Exceeded" if scope == "ip" else "Per-Prefix Rate Exceeded",
+            "rate": round(rate, 1),
+            "raw_path": []
+        },
+        "window_dims": "Unknown",
+        "ip_address": ip
+    }
+
+def public_response(result):
+    """The subset of the event the frontend's VerdictPopup reads, plus the scoring mode."""
+    features = result["features_calculated"]
+    if isinstance(features.get("raw_path"), np.ndarray):
+        # A binary client has its own path; echoing it as JSON would give the bandwidth back
+        features = {k: v for k, v in features.items() if k != "raw_path"}
+    return {
+        "is_bot": result["verdict"] == "BOT",
+        "confidence_score": result["confidence_score"],
+        "features_calculated": features,
+        "mode": result.get("mode", "full")
+    }
+
+# --- OVERLOAD (Concurrency Limit, Latency Budget, Degraded Scoring; see overload.py) ---
+governor = LoadGovernor(
+    max_inflight=MAX_INFLIGHT,
+    queue_ms=ADMIT_QUEUE_MS,
+    budget_ms=LATENCY_BUDGET_MS,
+    degrade_inflight=DEGRADE_INFLIGHT,
+    hold_s=DEGRADE_HOLD_S,
+)
+SCORING_ENDPOINTS = {"predict", "session_finalize", "predict_batch"}
+
+@app.before_request
+def admit_scoring_request():
+    """Scoring routes take a slot first; with none free within ADMIT_QUEUE_MS the request is shed."""
+    if request.endpoint not in SCORING_ENDPOINTS:
+        return None
+    ticket = governor.admit(g.request_start)
+    if ticket is None:
+        metrics.count("shed_total", endpoint=request.endpoint)
+        response = jsonify({"error": "Scoring service overloaded, retry shortly", "mode": "shed"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SHED_RETRY_AFTER_S)
+        return response
+    g.ticket = ticket
+
+@app.teardown_request
+def release_scoring_slot(exc):
+    ticket = g.pop('ticket', None)
+    if ticket is not None:
+        governor.release(ticket)
+
+def degraded_result(raw_data, movement_time, path_efficiency):
+    """Event for a request scored under overload: two features and a fixed heuristic, no forest, no path."""
+    probability = heuristic_probability(movement_time, path_efficiency)
+    return {
+        "verdict": "BOT" if probability > 0.7 else "SUSPICIOUS" if probability > 0.3 else "HUMAN",
+        "confidence_score": float(probability * 100),
+        "trigger_source": "Degraded_Heuristic",
+        "features_calculated": {
+            "efficiency": float(path_efficiency),
+            "curvature": 0.0,  # not computed in degraded mode
+            "note": "Degraded Heuristic (Overload)",
+            "raw_path": None
+        },
+        "window_dims": f"{raw_data.get('screen_width',0)}x{raw_data.get('screen_height',0)}",
+        "input_timings": input_timings(raw_data)
+    }
+
+def stamp_mode(result, ticket):
+    """Records how the request was scored; in degraded mode the event is logged without its raw path."""
+    result["mode"] = ticket.mode
+    if ticket.degraded:
+        result["features_calculated"]["raw_path"] = None
+    return result
+
+# --- REQUEST BODIES (JSON, or the Binary Telemetry Format in wire.py) ---
+ACCEPTED_FORMATS = ["application/json", WIRE_MIMETYPE]
+
+def request_payload():
+    """The telemetry body as a dict, chosen by Content-Type: wire.py's binary format or JSON."""
+    if request.mimetype == WIRE_MIMETYPE:
+        try:
+            payload = decode_telemetry(request.get_data(cache=False))
+        except ValueError as e:
+            raise BadRequest(f"Bad telemetry body: {e}")
+        # The binary body only has the telemetry columns; the page state rides in a header
+        signals = request.headers.get('X-Client-Signals')
+        if signals:
+            try:
+                payload['client'] = json.loads(signals)
+            except ValueError:
+                raise BadRequest("Bad X-Client-Signals header")
+        return payload
+    payload = request.json
+    if not isinstance(payload, dict):
+        raise BadRequest("Body must be a JSON object")
+    return payload
+
+def as_points(points, name):
+    """A body's list of [x, y, t] as an (n, 3) float64 array (empty lists pass); BadRequest if it isn't one."""
+    if not isinstance(points, (list, np.ndarray)):
+        raise BadRequest(f"{name} must be a list of [x, y, t] triples")
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        
-        # Convert list/dict to JSON string for storage
-        mouse_path_str = json.dumps(data.get('features_calculated', {}).get('raw_path', []))
-        
-        cursor.execute('''
-            INSERT INTO login_attempts 
-            (verdict, confidence_score, trigger_source, fail_reason, mouse_path, window_dims)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            data.get('verdict'),
-            data.get('confidence_score'),
-            data.get('trigger_source'),
-            data.get('features_calculated', {}).get('note', 'Unknown'),
-            mouse_path_str,
-            data.get('window_dims', 'Unknown')
-        ))
-        conn.commit()
-        conn.close()
-        print(f"📝 Logged: {data.get('trigger_source')} -> {data.get('verdict')}")
-    except Exception as e:
-        print(f"❌ Database Error: {e}")
+        block = np.asarray(points, dtype=np.float64)
+    except (TypeError, ValueError):   # strings, ragged rows, dicts
+        block = None
+    if block is None or (block.size and (block.ndim != 2 or block.shape[1] != 3 or not np.isfinite(block).all())):
+        raise BadRequest(f"{name} must be [x, y, t] triples of finite numbers")
+    return block
 
-# --- FEATURE EXTRACTION (The Math) ---
-def extract_features(data):
-    # (Keeping your existing logic essentially the same)
-    mouse_path = np.array(data.get('mouse_path', []))
-    click_timestamps = data.get('click_timestamps', [0, 0])
-    keystroke_timestamps = data.get('keystroke_timestamps', [])
+def check_json_body(raw_data):
+    """400 for a JSON body the feature code can't read. wire.py bodies are checked by decode()."""
+    as_points(raw_data.get('mouse_path', []), "mouse_path")
+    for name in ('click_timestamps', 'keystroke_timestamps'):
+        values = raw_data.get(name, [])
+        try:
+            stamps = np.asarray(values, dtype=np.float64) if isinstance(values, list) else None
+        except (TypeError, ValueError):
+            stamps = None
+        if stamps is None or stamps.ndim != 1 or not np.isfinite(stamps).all():
+            raise BadRequest(f"{name} must be a list of finite numbers")
 
-    if len(mouse_path) < 2:
-        return [0, 0, 1.0, 0, 0, 0] # Default Bot values
-    
-    points = mouse_path[:, :2]
-    timestamps = mouse_path[:, 2]
-    
-    movement_time = timestamps[-1] - timestamps[0]
-    
-    diffs = np.diff(points, axis=0)
-    segment_dists = np.sqrt((diffs ** 2).sum(axis=1))
-    time_diffs = np.diff(timestamps) + 0.001
-    speeds = segment_dists / time_diffs
-    speed_variance = np.std(speeds)
-    
-    total_dist = segment_dists.sum()
-    straight_dist = np.linalg.norm(points[-1] - points[0])
-    path_efficiency = straight_dist / total_dist if total_dist > 0 else 1
-    
-    curvature_sum = 0
-    if len(points) > 2:
-        v1 = diffs[:-1]; v2 = diffs[1:]
-        norm_v1 = np.linalg.norm(v1, axis=1, keepdims=True)
-        norm_v2 = np.linalg.norm(v2, axis=1, keepdims=True)
-        dot = (v1 * v2).sum(axis=1)
-        valid = (norm_v1 * norm_v2).flatten()
-        curvature_sum = np.sum(np.arccos(np.clip(dot / (valid + 1e-10), -1.0, 1.0)))
+def scoring_payload(route):
+    """Parsed, size-checked, normalized body; Context calls it when the first rule needs the body."""
+    with metrics.stage("parse", route=route):
+        raw_data = request_payload() or {}
+    if path_too_long(raw_data):
+        raise RequestEntityTooLarge(f"mouse_path too long (max {PATH_HARD_MAX_POINTS} points)")
+    if request.mimetype != WIRE_MIMETYPE:
+        check_json_body(raw_data)
+    with metrics.stage("normalize", route=route):
+        return normalize_payload(raw_data)
+
+# --- RULE CASCADE (Cheap Server-Side Checks First; the Model Only Sees What They Pass) ---
+# LoginPage.jsx used to run the traps and report them to /log. The page now only
+# sends its state ("client" in the body); the verdict is drawn here, cheapest rule first
+cascade = Cascade()
+# Cost estimates order the rules. Reading the body costs a parse first (~100 us for a
+# browser-sized JSON body), so the IP-only rate limit goes ahead of the body traps
+BODY_US = 100
+
+def client_signals(ctx):
+    """Page state sent with a submission: middle_name, name_filled, outer_width/height, visibility, page_ms."""
+    signals = ctx.payload.get('client')
+    return signals if isinstance(signals, dict) else {}
+
+def submission_fingerprint(ctx):
+    """path_fingerprint of the body, computed once (the ReplayCache rule and remember_verdict share it)."""
+    return ctx.memo("fingerprint", lambda c: path_fingerprint(c.payload))
+
+def submission_signature(ctx):
+    """path_signature of the submitted (or streamed) path, computed once; None for paths too plain to compare."""
+    return ctx.memo("signature", lambda c: path_signature(
+        c.session.replay_path() if c.session else c.payload.get('mouse_path', [])))
+
+def trap_result(ctx, verdict, confidence, note):
+    """Event for a submission a rule decided; the cascade fills in trigger_source."""
+    raw_data = ctx.payload
+    return {
+        "verdict": verdict,
+        "confidence_score": confidence,
+        "features_calculated": {
+            "efficiency": 1.0,  # the values the browser traps always reported
+            "curvature": 0.0,
+            "note": note,
+            "raw_path": ctx.session.replay_path() if ctx.session else logged_path(raw_data)
+        },
+        "window_dims": f"{raw_data.get('screen_width',0)}x{raw_data.get('screen_height',0)}",
+        "input_timings": input_timings(raw_data)
+    }
 
-    click_dwell = click_timestamps[1] - click_timestamps[0] if len(click_timestamps) >= 2 else 0
-    flight_avg = np.mean(np.diff(keystroke_timestamps)) if len(keystroke_timestamps) > 1 else 0
+@cascade.rule("RateLimit", cost_us=30)
+def rate_limit_rule(ctx):
+    # Needs only the IP: an over-rate client is answered before its body is parsed
+    return admission_result(ctx.ip) if ctx.ip else None
 
-    return [movement_time, speed_variance, path_efficiency, curvature_sum, click_dwell, flight_avg]
+@cascade.rule("Honeypot", cost_us=BODY_US + 1)
+def honeypot_rule(ctx):
+    if client_signals(ctx).get('middle_name'):
+        return trap_result(ctx, "BOT", 100.0, "Middle Name Filled")
+
+@cascade.rule("GhostWindow", cost_us=BODY_US + 1)
+def ghost_window_rule(ctx):
+    signals = client_signals(ctx)
+    if signals.get('outer_width') == 0 or signals.get('outer_height') == 0:
+        return trap_result(ctx, "BOT", 100.0, "Zero Dimensions")
+
+@cascade.rule("VampireCheck", cost_us=BODY_US + 1)
+def vampire_rule(ctx):
+    if client_signals(ctx).get('visibility') == 'hidden':
+        return trap_result(ctx, "BOT", 100.0, "Hidden Tab Execution")
+
+@cascade.rule("SpeedTrap", cost_us=BODY_US + 2)
+def speed_trap_rule(ctx):
+    # A streaming session opens on page load, so the server can time it with its own clock
+    if ctx.session is not None:
+        elapsed = (time.monotonic() - ctx.session.created) * 1000
+    else:
+        elapsed = client_signals(ctx).get('page_ms')
+    if isinstance(elapsed, (int, float)) and elapsed < SPEED_TRAP_MS:
+        return trap_result(ctx, "BOT", 100.0, f"Too Fast ({int(elapsed)}ms)")
+
+@cascade.rule("StatueCheck", cost_us=BODY_US + 2)
+def statue_rule(ctx):
+    raw_data = ctx.payload
+    points = ctx.session.features.n_points if ctx.session else len(raw_data.get('mouse_path', []))
+    typed = len(raw_data.get('keystroke_timestamps', [])) > 0 or client_signals(ctx).get('name_filled')
+    if points == 0 and typed:
+        return trap_result(ctx, "BOT", 100.0, "No Mouse/Keys Recorded")
+
+@cascade.rule("ReplayCache", cost_us=BODY_US + 50)
+def replay_rule(ctx):
+    # Hashes the whole path, so it runs after the constant-time traps.
+    # Streaming sessions have no single posted path to fingerprint
+    if ctx.session is not None:
+        return None
+    cached = replay_cache.get(submission_fingerprint(ctx))
+    if cached is not None:
+        return build_replay_result(ctx.payload, *cached)
+
+@cascade.rule("NearDuplicate", cost_us=BODY_US + 100)
+def near_duplicate_rule(ctx):
+    # A recorded human path posted again with jitter: the fingerprint differs, the shape does not
+    signature = submission_signature(ctx)
+    match = path_index.lookup(signature) if signature is not None else None
+    if match is not None:
+        result = trap_result(ctx, "SUSPICIOUS", 70.0, "Near-Duplicate Path")
+        result["features_calculated"].update(matched_attempt=match[0], distance=round(match[1], 4))
+        return result
+
+def rule_verdict(ctx, route, ticket):
+    """The deciding rule's event, logged and with the client IP, or None (score it with the model)."""
+    with metrics.stage("cascade", route=route):
+        decided = cascade.run(ctx)
+    if decided is None:
+        return None
+    result = stamp_mode(decided[1], ticket)
+    result["ip_address"] = ctx.ip
+    log_attempt(result)
+    return result
 
 # --- ROUTE 1: LOGGING ONLY (For Client-Side Traps) ---
 @app.route('/log', methods=['POST'])
 def log_event():
-    """Frontend calls this when a trap (Honeypot, Ghost) is triggered locally."""
+    """Trap reports from clients that decide locally (the traps now also run server-side, see the cascade)."""
     data = request.json
+    data['ip_address'] = client_ip()
     log_attempt(data)
     return jsonify({"status": "logged"}), 200
 
@@ -127,43 +660,209 @@ def log_event():
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        raw_data = request.json
-        features = extract_features(raw_data)
-        
-        # Prediction
-        prediction = model.predict([features])[0]
-        probability = model.predict_proba([features])[0][1]
-        
-        # Prepare Verdict
-        is_bot = bool(prediction == 1)
-        verdict_text = "BOT" if is_bot else "HUMAN"
-        
-        result = {
-            "verdict": verdict_text,
-            "confidence_score": float(probability * 100),
-            "trigger_source": "ML_Model",
-            "features_calculated": {
-                "efficiency": features[2],
-                "curvature": features[3],
-                "note": f"Model Prediction (Prob: {probability:.2f})",
-                "raw_path": raw_data.get('mouse_path', []) # Save raw path for replay
-            },
-            "window_dims": f"{raw_data.get('screen_width',0)}x{raw_data.get('screen_height',0)}"
-        }
+        # Rate limit, traps, replay cache: the first rule that decides answers (see the cascade)
+        ip = client_ip()
+        ticket = g.ticket
+        ctx = Context(ip, lambda: scoring_payload("predict"))
+        decided = rule_verdict(ctx, "predict", ticket)
+        if decided is not None:
+            return jsonify(public_response(decided))
+        raw_data = ctx.payload
+
+        if governor.check_budget(ticket):
+            # Overloaded, or this request already spent its budget: two features, no forest
+            with metrics.stage("degraded", route="predict"):
+                result = degraded_result(raw_data, *quick_features(raw_data))
+        else:
+            with metrics.stage("features", route="predict"):
+                features = extract_features(raw_data)
+
+            # Prediction (single pass over the compiled forest; a sample is mirrored to the shadow model)
+            with metrics.stage("model", route="predict"):
+                prediction, probability = models.predict_one(features)
+
+            # Prepare Verdict
+            result = build_result(raw_data, features, prediction, probability)
+            remember_verdict(submission_fingerprint(ctx), result)
+            result["path_signature"] = submission_signature(ctx)
+        stamp_mode(result, ticket)
+        result["ip_address"] = ip
         
         # LOG IT!
-        log_attempt(result)
+        with metrics.stage("log_enqueue", route="predict"):
+            log_attempt(result)
         
-        return jsonify({
-            "is_bot": is_bot,
-            "confidence_score": result["confidence_score"],
-            "features_calculated": result["features_calculated"]
-        })
+        return jsonify(public_response(result))
 
+    except HTTPException as e:
+        # e.g. 413 from MAX_CONTENT_LENGTH, 400 for malformed JSON
+        return jsonify({"error": e.description}), e.code
     except Exception as e:
         print(f"ERROR: {e}")
+        metrics.count("errors_total", endpoint=request.endpoint)
         return jsonify({"error": str(e)}), 500
     
+# --- ROUTE 2c: STREAMING SESSIONS (Features Updated Per Chunk) ---
+sessions = SessionStore(
+    ttl_s=SESSION_TTL_S,
+    max_sessions=SESSION_MAX_OPEN,
+    max_replay_points=SESSION_MAX_REPLAY_POINTS,
+)
+
+@app.route('/session/start', methods=['POST'])
+def session_start():
+    if startup["workers"] > 1:
+        # A session lives in one process and the next chunk may reach another; the page scores via /predict
+        return jsonify({"error": "Streaming sessions need a single worker", "formats": ACCEPTED_FORMATS}), 404
+    session = sessions.start()
+    # "formats": the bodies /predict and /session/* accept, so the browser can pick the binary one
+    return jsonify({"session_id": session.id, "ttl_s": SESSION_TTL_S, "formats": ACCEPTED_FORMATS})
+
+@app.route('/session/<session_id>/chunk', methods=['POST'])
+def session_chunk(session_id):
+    """
+    Body: {"seq": n, "points": [[x, y, t], ...]} or wire.py bytes, seq counting from 0.
+    Re-sent chunks (same seq) are ignored; a chunk ahead of the next expected seq gets a 409.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired session"}), 404
+
+    try:
+        body = request_payload()
+    except HTTPException as e:
+        return jsonify({"error": e.description}), e.code
+    seq = body.get('seq')
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+        return jsonify({"error": "seq must be a non-negative integer"}), 400
+    points = body['mouse_path'] if request.mimetype == WIRE_MIMETYPE else body.get('points', [])
+    if not isinstance(points, (list, np.ndarray)):
+        return jsonify({"error": "points must be a list of [x, y, t] triples"}), 400
+    if len(points) > SESSION_MAX_CHUNK_POINTS:
+        return jsonify({"error": f"Chunk too large (max {SESSION_MAX_CHUNK_POINTS} points)"}), 413
+    try:
+        block = as_points(points, "points")
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+
+    outcome = sessions.add_chunk(session, seq, block)
+    if outcome == "gap":
+        return jsonify({"error": "Chunk out of order", "expected_seq": session.next_seq}), 409
+    return jsonify({"applied": outcome == "applied", "points": session.features.n_points})
+
+@app.route('/session/<session_id>/finalize', methods=['POST'])
+def session_finalize(session_id):
+    """Scores the session from its running totals. Body: clicks, keystrokes, screen size."""
+    session = sessions.pop(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    try:
+        ip = client_ip()
+        ticket = g.ticket
+        ctx = Context(ip, lambda: scoring_payload("session"), session=session)
+        decided = rule_verdict(ctx, "session", ticket)
+        if decided is not None:
+            return jsonify(public_response(decided))
+        raw_data = ctx.payload
+
+        with metrics.stage("features", route="session"):
+            path_features = session.features.path_features()
+            if path_features is None:
+                features = [0, 0, 1.0, 0, 0, 0] # Default Bot values (same as extract_features)
+            else:
+                click_timestamps = raw_data.get('click_timestamps', [0, 0])
+                keystroke_timestamps = raw_data.get('keystroke_timestamps', [])
+                click_dwell = click_timestamps[1] - click_timestamps[0] if len(click_timestamps) >= 2 else 0
+                flight_avg = np.mean(np.diff(keystroke_timestamps)) if len(keystroke_timestamps) > 1 else 0
+                features = path_features + [click_dwell, flight_avg]
+
+        if governor.check_budget(ticket):
+            # The running totals are cheap either way; degraded mode skips the forest and the replay path
+            with metrics.stage("degraded", route="session"):
+                result = degraded_result(raw_data, features[0], features[2])
+        else:
+            with metrics.stage("model", route="session"):
+                prediction, probability = models.predict_one(features)
+            raw_data['mouse_path'] = session.replay_path()
+            result = build_result(raw_data, features, prediction, probability)
+            result["path_signature"] = submission_signature(ctx)
+        stamp_mode(result, ticket)
+        result["ip_address"] = ip
+        with metrics.stage("log_enqueue", route="session"):
+            log_attempt(result)
+        return jsonify(public_response(result))
+
+    except HTTPException as e:
+        # e.g. 413 from MAX_CONTENT_LENGTH, 400 for malformed JSON
+        return jsonify({"error": e.description}), e.code
+    except Exception as e:
+        print(f"ERROR: {e}")
+        metrics.count("errors_total", endpoint=request.endpoint)
+        return jsonify({"error": str(e)}), 500
+
+# --- ROUTE 2b: BATCH PREDICTION (For Gateways that Micro-Batch Logins) ---
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Scores {"payloads": [...]} with one feature pass and one forest call.
+    Payloads that carry the end user's "ip_address" go through admission
+    per payload; the gateway itself is not rate limited.
+    """
+    try:
+        with metrics.stage("parse", route="batch"):
+            payloads = request.json.get('payloads', [])
+        if len(payloads) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large (max {MAX_BATCH_SIZE})"}), 413
+        if not payloads:
+            return jsonify({"results": []})
+        if any(path_too_long(p) for p in payloads):
+            return jsonify({"error": f"mouse_path too long (max {PATH_HARD_MAX_POINTS} points)"}), 413
+        with metrics.stage("normalize", route="batch"):
+            payloads = [normalize_payload(p) for p in payloads]
+
+        # Payloads a rule decides (rate limit, traps, replays) are answered up front; only the rest
+        # go through features + model
+        with metrics.stage("cascade", route="batch"):
+            contexts = [Context(p.get('ip_address'), lambda p=p: p) for p in payloads]
+            results = [None] * len(payloads)
+            to_score = []
+            for i, ctx in enumerate(contexts):
+                decided = cascade.run(ctx)
+                if decided is not None:
+                    results[i] = decided[1]
+                else:
+                    to_score.append(i)
+
+        ticket = g.ticket
+        if to_score and governor.check_budget(ticket):
+            with metrics.stage("degraded", route="batch"):
+                for i in to_score:
+                    results[i] = degraded_result(payloads[i], *quick_features(payloads[i]))
+        elif to_score:
+            with metrics.stage("features", route="batch"):
+                features = extract_features_batch([payloads[i] for i in to_score])
+            with metrics.stage("model", route="batch"):
+                predictions, probabilities = models.predict(features)
+            for j, i in enumerate(to_score):
+                results[i] = build_result(payloads[i], features[j], predictions[j], probabilities[j])
+                remember_verdict(submission_fingerprint(contexts[i]), results[i])
+                results[i]["path_signature"] = submission_signature(contexts[i])
+        for raw_data, result in zip(payloads, results):
+            stamp_mode(result, ticket)
+            result["ip_address"] = raw_data.get('ip_address')
+        with metrics.stage("log_enqueue", route="batch"):
+            log_attempts(results)
+
+        return jsonify({"results": [public_response(r) for r in results]})
+
+    except HTTPException as e:
+        # e.g. 413 from MAX_CONTENT_LENGTH, 400 for malformed JSON
+        return jsonify({"error": e.description}), e.code
+    except Exception as e:
+        print(f"ERROR: {e}")
+        metrics.count("errors_total", endpoint=request.endpoint)
+        return jsonify({"error": str(e)}), 500
+
 # --- ROUTE 3: ADMIN DASHBOARD STATS (WITH IST CONVERSION) ---
 @app.route('/admin/stats', methods=['GET'])
 def get_admin_stats():
@@ -183,37 +882,18 @@ def get_admin_stats():
         for r in cursor.fetchall()
     ]
     
-    # 2. ATTACK FUNNEL (Count by Trigger) - No time change needed here
-    cursor.execute("SELECT trigger_source, COUNT(*) FROM login_attempts GROUP BY trigger_source")
-    funnel_data = [{"name": r[0], "value": r[1]} for r in cursor.fetchall()]
+    # 2-5 read the hourly rollups (IST bucket precomputed at write time, see rollups.py)
+    # 2. ATTACK FUNNEL (Count by Trigger)
+    funnel_data = rollups.funnel(cursor)
     
-    # 3. THE ZOO (Bot Types) - No time change needed here
-    cursor.execute("SELECT fail_reason, COUNT(*) FROM login_attempts WHERE verdict='BOT' GROUP BY fail_reason")
-    zoo_data = [{"name": r[0], "value": r[1]} for r in cursor.fetchall()]
+    # 3. THE ZOO (Bot Types)
+    zoo_data = rollups.zoo(cursor)
     
     # 4. HOURLY HEATMAP (Bots per Hour in IST)
-    # We must shift to IST *before* extracting the hour, otherwise 2:00 AM UTC (7:30 AM IST) counts as 2 AM.
-    cursor.execute("""
-        SELECT strftime('%H', datetime(timestamp, '+5.5 hours')) as hour, 
-               COUNT(*) 
-        FROM login_attempts 
-        WHERE verdict='BOT' 
-        GROUP BY hour
-    """)
-    heatmap_raw = {int(r[0]): r[1] for r in cursor.fetchall()}
-    heatmap_data = [{"hour": f"{h:02d}:00", "bots": heatmap_raw.get(h, 0)} for h in range(24)]
+    heatmap_data = rollups.heatmap(cursor)
 
     # 5. HUMAN vs MACHINE (Traffic Volume by IST Date)
-    # An attack at 1 AM IST should count for Today, not Yesterday.
-    cursor.execute("""
-        SELECT date(datetime(timestamp, '+5.5 hours')) as day, 
-               SUM(CASE WHEN verdict='BOT' THEN 1 ELSE 0 END) as bots,
-               SUM(CASE WHEN verdict='HUMAN' THEN 1 ELSE 0 END) as humans
-        FROM login_attempts 
-        GROUP BY day 
-        ORDER BY day DESC LIMIT 7
-    """)
-    volume_data = [{"date": r[0], "bots": r[1], "humans": r[2]} for r in cursor.fetchall()]
+    volume_data = rollups.volume(cursor)
     
     conn.close()
     
@@ -225,5 +905,329 @@ def get_admin_stats():
         "volume_data": volume_data
     })
 
+# --- ROUTE 3a: ATTEMPT SEARCH & PATH REPLAY (Keyset Pages, see attempts.py) ---
+@app.route('/admin/attempts', methods=['GET'])
+def search_attempts():
+    """
+    ?since=&until= (UTC) &verdict=&trigger_source=&fail_reason= &limit=50, newest first.
+    Pass next_before_id back as ?before_id= for the following page.
+    """
+    try:
+        filters = attempts.parse_filters(request.args)
+        limit = int(request.args.get('limit', ATTEMPTS_PAGE_SIZE))
+        before_id = request.args.get('before_id')
+        before_id = int(before_id) if before_id else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 1 <= limit <= ATTEMPTS_MAX_PAGE:
+        return jsonify({"error": f"limit must be between 1 and {ATTEMPTS_MAX_PAGE}"}), 400
+    rows, next_before_id = attempts.search(DB_NAME, ARCHIVE_DIR, filters, before_id, limit)
+    return jsonify({"attempts": rows, "next_before_id": next_before_id})
+
+@app.route('/admin/attempts/<int:attempt_id>/path', methods=['GET'])
+def get_attempt_path(attempt_id):
+    """
+    The stored mouse path for Replay, at most ?points= points (default REPLAY_POINTS).
+    ?from_ms=&to_ms= cut it to a window, in ms from the first point, before downsampling.
+    """
+    try:
+        points = int(request.args.get('points', REPLAY_POINTS))
+        window = [float(request.args[k]) if request.args.get(k) else None for k in ('from_ms', 'to_ms')]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 2 <= points <= REPLAY_MAX_POINTS:
+        return jsonify({"error": f"points must be between 2 and {REPLAY_MAX_POINTS}"}), 400
+    try:
+        value = attempts.stored_path(DB_NAME, ARCHIVE_DIR, attempt_id)
+    except KeyError:
+        return jsonify({"error": f"No attempt {attempt_id}"}), 404
+    try:
+        path, total, duration_ms = attempts.replay_path(value, points, *window)
+    except ValueError as e:
+        # A legacy row whose JSON was cut off or holds [x, y] pairs: the attempt exists, its path doesn't replay
+        return jsonify({"error": f"Stored path of attempt {attempt_id} can't be read ({e})"}), 422
+    return jsonify({"id": attempt_id, "total_points": total, "duration_ms": duration_ms,
+                    "path": path.tolist()})
+
+# --- ROUTE 3b: LIVE STREAM (Server-Sent Events) ---
+def attempts_since(last_id, limit):
+    """Catch-up read for reconnecting dashboards: rows after last_id, oldest first."""
+    conn = sqlite3.connect(DB_NAME)
+    rows = conn.execute('''
+        SELECT id, timestamp, verdict, trigger_source, fail_reason, confidence_score
+        FROM login_attempts WHERE id > ? ORDER BY id LIMIT ?
+    ''', (last_id, limit)).fetchall()
+    conn.close()
+    return rows
+
+@app.route('/admin/stream', methods=['GET'])
+def stream_admin_events():
+    """
+    Pushes each new attempt as an SSE 'attempt' event (feed row + panel deltas).
+    Resume with ?since_id=N or the browser's Last-Event-ID header. If the client
+    is too far behind, a 'reset' event tells it to reload /admin/stats.
+    """
+    since = request.headers.get('Last-Event-ID') or request.args.get('since_id')
+    if since is not None:
+        try:
+            last_id = int(since)
+        except ValueError:
+            return jsonify({"error": f"since_id must be an attempt id, got {since!r}"}), 400
+    else:
+        # Fresh subscriber: start from whatever is newest right now
+        conn = sqlite3.connect(DB_NAME)
+        last_id = max(live_feed.latest_id, conn.execute("SELECT IFNULL(MAX(id), 0) FROM login_attempts").fetchone()[0])
+        conn.close()
+
+    def catch_up(last_id):
+        rows = attempts_since(last_id, STREAM_RESUME_LIMIT + 1)
+        if len(rows) > STREAM_RESUME_LIMIT:
+            return None
+        return [(r[0], attempt_event(*r)) for r in rows]
+
+    def generate(last_id):
+        live_feed.subscribe()
+        try:
+            yield "retry: 2000\n\n"
+            needs_catch_up = since is not None
+            while True:
+                if needs_catch_up:
+                    missed = catch_up(last_id)
+                    if missed is None:
+                        last_id = live_feed.latest_id
+                        yield format_sse(last_id, "reset", {})
+                    else:
+                        for row_id, payload in missed:
+                            yield format_sse(row_id, "attempt", payload)
+                            last_id = row_id
+                    needs_catch_up = False
+
+                frames = live_feed.wait_since(last_id, STREAM_KEEPALIVE_S)
+                if frames is None:
+                    needs_catch_up = True
+                    continue
+                if not frames:
+                    yield ": keepalive\n\n"
+                for row_id, frame in frames:
+                    yield frame
+                    last_id = row_id
+        finally:
+            live_feed.unsubscribe()
+
+    return Response(
+        stream_with_context(generate(last_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# --- ROUTE 4: RUNTIME COUNTERS (Queue Depth, Drops) ---
+@app.route('/admin/runtime', methods=['GET'])
+def get_runtime_stats():
+    return jsonify({
+        "log_writer": log_writer.stats(),
+        "live_feed": dict(live_feed.stats(), tail=feed_tail.stats()),
+        "sessions": sessions.stats(),
+        "replay_cache": replay_cache.stats(),
+        "path_index": path_index.stats(),
+        "admission": rate_tracker.stats(),
+        "model": models.stats(),
+        "cascade": cascade.stats(),
+        "overload": governor.stats(),
+        "retention": retention.stats()
+    })
+
+# --- ROUTE 5: MODEL HOT SWAP & SHADOW SCORING ---
+def model_artifact(body):
+    """Resolves the "artifact" in an admin request to a file under MODEL_DIR."""
+    name = (body or {}).get('artifact')
+    if not name:
+        return None
+    root = os.path.realpath(MODEL_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    # Pickles run code on load: never accept a path outside the model directory
+    if os.path.dirname(path) != root:
+        raise ValueError(f"artifact must be a file name inside {MODEL_DIR}/")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{MODEL_DIR}/{name} not found")
+    return path
+
+@app.route('/admin/model/reload', methods=['POST'])
+def reload_model():
+    """Body (optional): {"artifact": "model-<version>.pkl"}. Default: re-read MODEL_PATH."""
+    try:
+        loaded = models.reload(model_artifact(request.get_json(silent=True)))
+        print(f"✅ Model swapped: {loaded.version}")
+        return jsonify(models.stats())
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e), "active": models.stats()["active"]}), 400
+
+@app.route('/admin/model/shadow', methods=['POST', 'DELETE'])
+def shadow_model():
+    """POST {"artifact": ..., "sample_rate": 0.1} starts shadow scoring; DELETE stops it."""
+    if request.method == 'DELETE':
+        stopped = models.stop_shadow()
+        return jsonify({"stopped": stopped.stats() if stopped else None})
+    try:
+        body = request.get_json(silent=True) or {}
+        path = model_artifact(body)
+        if path is None:
+            return jsonify({"error": "artifact is required"}), 400
+        candidate = models.start_shadow(path, float(body.get('sample_rate', 0.1)))
+        print(f"✅ Shadow model: {candidate.version}")
+        return jsonify(models.stats())
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/admin/model/shadow/promote', methods=['POST'])
+def promote_shadow_model():
+    """Swaps the shadow candidate in as the active model."""
+    promoted = models.promote_shadow()
+    if promoted is None:
+        return jsonify({"error": "No shadow model running"}), 409
+    print(f"✅ Shadow model promoted: {promoted.version}")
+    return jsonify(models.stats())
+
+# --- ROUTE 6: METRICS & SAMPLED PROFILING ---
+metrics.collect(log_writer.stats, prefix="log_writer")
+metrics.collect(live_feed.stats, prefix="live_feed")
+metrics.collect(feed_tail.stats, prefix="live_feed_tail")
+metrics.collect(sessions.stats, prefix="sessions")
+metrics.collect(replay_cache.stats, prefix="replay_cache")
+metrics.collect(path_index.stats, prefix="path_index")
+metrics.collect(rate_tracker.stats, prefix="admission")
+metrics.collect(models.stats, prefix="model")
+metrics.collect(cascade.stats, prefix="cascade")
+metrics.collect(governor.stats, prefix="overload")
+metrics.collect(retention.stats, prefix="retention")
+metrics.collect(lambda: {"profiled": profiler.profiled, "sample_rate": profiler.sample_rate}, prefix="profiler")
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text: request/stage histograms, attempt counters, component gauges."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+def request_profiles():
+    """
+    POST {"sample_rate": 0.01, "keep": 20} profiles that fraction of requests with cProfile.
+    GET returns the kept profiles (top functions by cumulative time); DELETE switches it off.
+    """
+    if request.method == 'POST':
+        try:
+            body = request.json or {}
+            profiler.configure(float(body.get('sample_rate', 0.01)), keep=body.get('keep'))
+        except HTTPException as e:
+            return jsonify({"error": e.description}), e.code
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        print(f"📝 Request profiling at sample rate {profiler.sample_rate}")
+    elif request.method == 'DELETE':
+        profiler.configure(0.0)
+    return jsonify({"sample_rate": profiler.sample_rate, "profiled": profiler.profiled,
+                    "profiles": profiler.recent()})
+
+# --- ROUTE 7: READINESS (200 Once the Model Is Loaded and Warm) ---
+startup = {"created": False, "ready": False, "workers": 1}
+startup_ms = {}   # init_db / model_load / warmup durations, reported by /ready
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """For load balancers / orchestrators: 503 until create_app() has finished, or with no model."""
+    ready = startup["ready"] and models.active is not None
+    body = {"ready": ready, "model": models.active.version if models.active else None, "startup": startup_ms}
+    return jsonify(body), 200 if ready else 503
+
+# --- APPLICATION FACTORY (Startup Work Happens Here, Not at Import) ---
+def warmup_payloads():
+    """A straight drag, a wandering path and an empty one: every branch of extract_features."""
+    steps = np.arange(60)
+    t = 1.76e12 + steps * 16.0
+    line = np.column_stack([200 + steps * 6.0, 300 + steps * 2.0, t])
+    curve = np.column_stack([200 + steps * 6.0 + 25 * np.sin(steps / 6), 300 + 40 * np.cos(steps / 9), t])
+    common = {"click_timestamps": [0, 110], "keystroke_timestamps": [0, 140, 310, 450],
+              "screen_width": 1920, "screen_height": 1080}
+    return [dict(common, mouse_path=path) for path in (line.tolist(), curve.tolist(), [])]
+
+def warm_up():
+    """
+    Scores the synthetic payloads through the /predict and /predict/batch code (nothing is
+    logged, cached or counted), so the first real request doesn't pay for first-call setup.
+    """
+    payloads = [normalize_payload(p) for p in warmup_payloads()]
+    for raw_data in payloads:
+        path_fingerprint(raw_data)
+        features = extract_features(raw_data)
+        prediction, probability = models.predict_one(features, shadow=False)
+        result = build_result(raw_data, features, prediction, probability)
+        with app.test_request_context('/predict', method='POST'):
+            jsonify(public_response(result))
+    models.predict(extract_features_batch(payloads))
+
+def start_background(workers=1):
+    """
+    Starts the threads this process needs; serve.py calls it in each worker after fork.
+    With more than one worker the live feed tails the database, the path index tails
+    entries.bin, and /session/* is off.
+    """
+    startup["workers"] = workers
+    log_writer.start()
+    if workers > 1:
+        conn = sqlite3.connect(DB_NAME)
+        feed_tail.start(conn.execute("SELECT IFNULL(MAX(id), 0) FROM login_attempts").fetchone()[0])
+        conn.close()
+    models.start()
+    retention.start()
+    path_index.start(tail_s=PATH_INDEX_TAIL_S if workers > 1 else None)
+
+def create_app(background=True):
+    """
+    Database schema, model load and warm-up, then the Flask app. serve.py calls this
+    once in its master with background=False and starts the threads per worker.
+    """
+    if startup["created"]:
+        return app
+    startup["created"] = True
+    begin = time.perf_counter()
+    init_db()
+    startup_ms["init_db"] = round((time.perf_counter() - begin) * 1000, 1)
+
+    begin = time.perf_counter()
+    try:
+        path_index.open()
+        print(f"✅ Path index: {len(path_index)} signatures ({PATH_INDEX_DIR})")
+    except Exception as e:
+        # Keep scoring; new signatures are indexed in memory only until the directory is fixed
+        path_index.directory = None
+        print(f"⚠️ Path index not loadable ({e}): near-duplicate checks start empty")
+    startup_ms["path_index"] = round((time.perf_counter() - begin) * 1000, 1)
+
+    print("Loading Model...")
+    begin = time.perf_counter()
+    try:
+        models.reload()
+        print(f"✅ Model Loaded Successfully! ({models.active.version})")
+        if models.active.fast is None:
+            print("📝 No fast tier for this model (python distill.py): the forest scores every request")
+    except Exception as e:
+        print(f"⚠️ WARNING: {MODEL_PATH} not loadable ({e}). Predictions will fail, but Logging will work.")
+    startup_ms["model_load"] = round((time.perf_counter() - begin) * 1000, 1)
+
+    if models.active is not None:
+        begin = time.perf_counter()
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"⚠️ Warm-up failed: {e}")
+        startup_ms["warmup"] = round((time.perf_counter() - begin) * 1000, 1)
+
+    if background:
+        start_background()
+    startup["ready"] = True
+    return app
+
 if __name__ == '__main__':
-    app.run(port=5000, debug=True)
\ No newline at end of file
+    create_app().run(port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Attempt search (/admin/attempts) and stored-path reads (/admin/attempts/<id>/path).
+
+search() returns newest first and pages by keyset on id: each page ends
+with next_before_id, and the next request asks for `id < before_id ORDER BY
+id DESC LIMIT n`. That is one index range scan however deep the page is;
+OFFSET would read and discard every row in front of it. When database.db
+runs out of matches, the search continues in the monthly archive files
+(retention.py), newest month first. Archived ids are all older than the hot
+ones, so the order still holds.
+
+Filters: since / until (UTC, 'YYYY-MM-DD HH:MM:SS' or ISO 8601), verdict,
+trigger_source, fail_reason (exact match).
+
+Paths come back downsampled (trajectory.bucket_resample keeps the first
+and last points and the timing), optionally cut to a time window first.
+"""
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+
+import retention
+from path_codec import load_path
+from trajectory import bucket_resample
+
+EXACT_FILTERS = ("verdict", "trigger_source", "fail_reason")
+
+SELECT_COLUMNS = '''
+    id, timestamp, datetime(timestamp, '+5.5 hours'), verdict, trigger_source, fail_reason,
+    confidence_score, window_dims, ip_address, label
+'''
+
+
+def parse_time(value):
+    """'2026-10-18 09:00:00', '2026-10-18T09:00:00Z', '2026-10-18' ... -> the stored UTC format."""
+    moment = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def parse_filters(args):
+    """Query-string args -> {column: value}. Raises ValueError on a bad time."""
+    filters = {name: args[name] for name in EXACT_FILTERS if args.get(name)}
+    for name in ("since", "until"):
+        if args.get(name):
+            filters[name] = parse_time(args[name])
+    return filters
+
+
+def _where(filters, before_id):
+    clauses, params = [], []
+    for name in EXACT_FILTERS:
+        if name in filters:
+            clauses.append(f"{name} = ?")
+            params.append(filters[name])
+    if "since" in filters:
+        clauses.append("timestamp >= ?")
+        params.append(filters["since"])
+    if "until" in filters:
+        clauses.append("timestamp < ?")
+        params.append(filters["until"])
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _rows(conn, filters, before_id, limit, archived):
+    where, params = _where(filters, before_id)
+    rows = conn.execute(
+        f"SELECT {SELECT_COLUMNS} FROM login_attempts{where} ORDER BY id DESC LIMIT ?", params + [limit]
+    ).fetchall()
+    return [{
+        "id": r[0], "timestamp": r[1], "time": r[2], "verdict": r[3], "source": r[4],
+        "fail_reason": r[5], "score": r[6], "window_dims": r[7], "ip_address": r[8],
+        "label": r[9], "archived": archived,
+    } for r in rows]
+
+
+def _months_in_range(archive_dir, filters):
+    """Archive partitions that can hold rows in [since, until), newest first."""
+    since, until = filters.get("since"), filters.get("until")
+    return [(month, path) for month, path in reversed(retention.partitions(archive_dir))
+            if (since is None or month >= since[:7]) and (until is None or month <= until[:7])]
+
+
+def search(db_path, archive_dir, filters, before_id=None, limit=50):
+    """(rows newest first, next_before_id or None)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        found = _rows(conn, filters, before_id, limit, archived=False)
+    finally:
+        conn.close()
+    for _, path in _months_in_range(archive_dir, filters):
+        if len(found) >= limit:
+            break
+        cursor = found[-1]["id"] if found else before_id
+        part = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            found += _rows(part, filters, cursor, limit - len(found), archived=True)
+        finally:
+            part.close()
+    return found, (found[-1]["id"] if len(found) == limit else None)
+
+
+def stored_path(db_path, archive_dir, attempt_id):
+    """Stored mouse_path value (None if no path was kept), wherever retention put it. KeyError: no such attempt."""
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT timestamp, mouse_path FROM login_attempts WHERE id = ?", (attempt_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is not None:
+        timestamp, value = row
+        # NULL once the path has been archived (or if none was recorded)
+        return value if value is not None else retention.archived_path(archive_dir, attempt_id, timestamp)
+    for _, path in reversed(retention.partitions(archive_dir)):
+        part = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = part.execute("SELECT timestamp FROM login_attempts WHERE id = ?", (attempt_id,)).fetchone()
+        finally:
+            part.close()
+        if row is not None:
+            return retention.archived_path(archive_dir, attempt_id, row[0])
+    raise KeyError(attempt_id)
+
+
+def replay_path(value, points, from_ms=None, to_ms=None):
+    """
+    (path, total points stored, duration ms): the stored path cut to [from_ms, to_ms]
+    (ms from its first point) and downsampled to at most `points`. ValueError if the
+    stored value can't be read (load_path).
+    """
+    arr = load_path(value)
+    total = len(arr)
+    duration = float(arr[-1, 2] - arr[0, 2]) if total else 0.0
+    if total and (from_ms is not None or to_ms is not None):
+        offset = arr[:, 2] - arr[0, 2]
+        keep = np.ones(total, dtype=bool)
+        if from_ms is not None:
+            keep &= offset >= from_ms
+        if to_ms is not None:
+            keep &= offset <= to_ms
+        arr = arr[keep]
+    return bucket_resample(arr, points), total, duration
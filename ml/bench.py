@@ -0,0 +1,318 @@
+"""
+Microbenchmarks for the scoring hot path, stage by stage and end to end.
+
+    python bench.py                                   # everything, prints a table
+    python bench.py --save bench_baseline.json        # keep this run as the baseline
+    python bench.py --compare bench_baseline.json     # exit 1 if a stage got slower
+    python bench.py --only extract_features,model --quick
+
+Stages (parameter in brackets):
+    json_parse[n]          json.loads of a /predict body with n points
+    wire_decode[n]         wire.decode of the same body in the binary format
+    normalize[n]           downsample above PATH_MAX_POINTS (trajectory.py, app settings)
+    extract_features[n]    features.py on an n-point path
+    extract_batch[b]       extract_features_batch, b payloads of 200 points
+    model_sklearn[b]       RandomForest predict + predict_proba (the original pair)
+    model_compiled[b]      CompiledForest.predict, arrays in memory
+    model_mapped[b]        CompiledForest.predict on np.load(mmap_mode='r') arrays (what the app runs)
+    log_submit[n]          log_attempt's cost on the request thread (queue put)
+    log_commit[n]          the writer's cost for one row: path encode, INSERT, commit
+    predict_request[n]     the whole POST /predict through the Flask test client
+    predict_request_wire[n]  the same with a binary (wire.py) body
+    predict_threads[k]     POST /predict (200 points) from k threads, per request
+
+Every case is timed until it has run for --min-time seconds, in inner loops
+sized so timer overhead stays under ~1%. The median per call is compared
+against the baseline; anything more than --tolerance slower fails.
+app.py is imported in a temporary directory, so database.db is not touched.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import platform
+import argparse
+import threading
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+PATH_SIZES = [10, 100, 1000, 10000, 100000]
+BATCH_SIZES = [1, 16, 256, 512]
+THREADS = [1, 4, 8]
+
+
+def random_path(n, rng, x0=600.0):
+    """n mousemove points: wandering heading, 8-24 ms apart."""
+    heading = np.cumsum(rng.normal(0, 0.2, n))
+    step = rng.gamma(2.0, 2.0, n)
+    xy = np.cumsum(np.column_stack([np.cos(heading), np.sin(heading)]) * step[:, None], axis=0)
+    t = 1.76e12 + np.cumsum(rng.integers(8, 24, n))
+    return np.column_stack([np.round(xy + x0), t]).tolist()
+
+
+def payload(n, rng, x0=600.0):
+    return {
+        "mouse_path": random_path(n, rng, x0),
+        "click_timestamps": [0, int(rng.integers(80, 150))],
+        "keystroke_timestamps": np.cumsum(rng.integers(90, 280, 20)).tolist(),
+        "screen_width": 1920, "screen_height": 1080,
+    }
+
+
+def measure(fn, min_time, min_samples=5):
+    """Median / p95 seconds per call."""
+    start = time.perf_counter()
+    fn()
+    estimate = max(time.perf_counter() - start, 1e-7)
+    number = max(1, int(0.002 / estimate))  # ~2 ms per sample
+    samples = []
+    spent = 0.0
+    while spent < min_time or len(samples) < min_samples:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / number)
+        spent += elapsed
+    samples = np.array(samples)
+    return {"median_ms": float(np.median(samples) * 1000), "p95_ms": float(np.percentile(samples, 95) * 1000),
+            "calls": number * len(samples)}
+
+
+def import_app():
+    """app.py in a scratch directory, with admission and the replay cache out of the way."""
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    os.environ.setdefault("DB_PATH", os.path.join(scratch, "database.db"))
+    os.environ.setdefault("MODEL_WATCH_S", "0")
+    os.environ.setdefault("RATE_LIMIT_PER_IP", str(10 ** 9))
+    os.environ.setdefault("RATE_LIMIT_PER_PREFIX", str(10 ** 9))
+    os.environ.setdefault("REPLAY_CACHE_ENTRIES", "1")  # alternate two paths -> every call misses
+    os.chdir(scratch)
+    sys.path.insert(0, ML_DIR)
+    import app
+    app.create_app()
+    return app
+
+
+# --- STAGES: each yields (case name, zero-arg callable) ---
+def stage_json_parse(ctx):
+    for n in ctx.sizes:
+        body = json.dumps(payload(n, ctx.rng))
+        yield f"json_parse[{n}]", lambda body=body: json.loads(body)
+
+
+def stage_wire_decode(ctx):
+    import wire
+    for n in ctx.sizes:
+        data = payload(n, ctx.rng)
+        data["mouse_path"] = np.round(data["mouse_path"]).tolist()   # browser coordinates are integers
+        body = wire.encode(data)
+        yield f"wire_decode[{n}]", lambda body=body: wire.decode(body)
+
+
+def stage_normalize(ctx):
+    for n in ctx.sizes:
+        data = payload(n, ctx.rng)
+        yield f"normalize[{n}]", lambda data=data: ctx.app.normalize_payload(data)
+
+
+def stage_extract_features(ctx):
+    from features import extract_features
+    for n in ctx.sizes:
+        data = payload(n, ctx.rng)
+        yield f"extract_features[{n}]", lambda data=data: extract_features(data)
+
+
+def stage_extract_batch(ctx):
+    from features import extract_features_batch
+    for b in ctx.batches:
+        payloads = [payload(200, ctx.rng) for _ in range(b)]
+        yield f"extract_batch[{b}]", lambda payloads=payloads: extract_features_batch(payloads)
+
+
+def stage_model(ctx):
+    import warnings
+    import joblib
+    from compiled_forest import CompiledForest
+    warnings.filterwarnings("ignore")
+    model = joblib.load(os.path.join(ML_DIR, "model.pkl"))
+    engine = CompiledForest.from_sklearn(model)
+    mapped_dir = os.path.join(tempfile.mkdtemp(prefix="bench-forest-"), "model.forest")
+    engine.save(mapped_dir)
+    mapped, _ = CompiledForest.open(mapped_dir, mmap=True)
+    X_all = np.loadtxt(os.path.join(ML_DIR, "training_data.csv"), delimiter=',', skiprows=1)[:, :6]
+    for b in ctx.batches:
+        X = X_all[:b]
+        yield f"model_sklearn[{b}]", lambda X=X: (model.predict(X), model.predict_proba(X))
+        yield f"model_compiled[{b}]", lambda X=X: engine.predict(X)
+        yield f"model_mapped[{b}]", lambda X=X: mapped.predict(X)
+
+
+def stage_log_attempt(ctx):
+    import sqlite3
+    from log_writer import LogWriter
+    app = ctx.app
+    # Same queue settings as the app's writer, never started: timing the put, not the background thread
+    queue_only = LogWriter(app.DB_NAME, app.INSERT_ATTEMPT_SQL, app.attempt_row,
+                           max_queue=10 ** 7, overflow=app.LOG_OVERFLOW_POLICY)
+    conn = sqlite3.connect(app.DB_NAME)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for n in ctx.sizes:
+        result = app.build_result(payload(n, ctx.rng), [0.0] * 6, 0, 0.1)
+        result["logged_at"] = "2026-01-01 00:00:00"
+        # What the request thread pays (a queue put), then what the writer pays per row
+        # when a batch holds a single row (path encode + INSERT + commit)
+        yield f"log_submit[{n}]", lambda result=result: queue_only.submit(result)
+
+        def commit_one(result=result):
+            conn.execute(app.INSERT_ATTEMPT_SQL, app.attempt_row(result))
+            conn.commit()
+        yield f"log_commit[{n}]", commit_one
+    conn.close()
+
+
+def stage_predict_request(ctx):
+    import wire
+    client = ctx.app.app.test_client()
+    for n in ctx.sizes:
+        if n > ctx.app.PATH_HARD_MAX_POINTS:
+            print(f"   predict_request[{n}] skipped: over PATH_HARD_MAX_POINTS ({ctx.app.PATH_HARD_MAX_POINTS})")
+            continue
+        payloads = [payload(n, ctx.rng, x0) for x0 in (600.0, 900.0)]
+        for p in payloads:
+            p["mouse_path"] = np.round(p["mouse_path"]).tolist()
+        for suffix, content_type, bodies in (
+                ("", "application/json", [json.dumps(p) for p in payloads]),
+                ("_wire", wire.WIRE_MIMETYPE, [wire.encode(p) for p in payloads])):
+            turn = [0]
+
+            def post(bodies=bodies, content_type=content_type, turn=turn):
+                turn[0] ^= 1
+                res = client.post('/predict', data=bodies[turn[0]], content_type=content_type)
+                assert res.status_code == 200, res.get_data(as_text=True)
+            yield f"predict_request{suffix}[{n}]", post
+
+
+def stage_predict_threads(ctx):
+    app = ctx.app
+    bodies = [json.dumps(payload(200, ctx.rng, x0)) for x0 in (600.0, 900.0)]
+    for k in THREADS:
+        per_thread = max(5, int(ctx.min_time * 200 / k))
+
+        def run(k=k, per_thread=per_thread):
+            def worker():
+                client = app.app.test_client()
+                for i in range(per_thread):
+                    client.post('/predict', data=bodies[i & 1], content_type='application/json')
+            threads = [threading.Thread(target=worker) for _ in range(k)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        # One call = k * per_thread requests; reported per request
+        yield f"predict_threads[{k}]", (run, k * per_thread)
+
+
+STAGES = {
+    "json_parse": stage_json_parse,
+    "wire_decode": stage_wire_decode,
+    "normalize": stage_normalize,
+    "extract_features": stage_extract_features,
+    "extract_batch": stage_extract_batch,
+    "model": stage_model,
+    "log_attempt": stage_log_attempt,
+    "predict_request": stage_predict_request,
+    "predict_threads": stage_predict_threads,
+}
+
+
+class Context:
+    def __init__(self, args):
+        self.rng = np.random.default_rng(args.seed)
+        self.sizes = [n for n in PATH_SIZES if not args.quick or n <= 10000]
+        self.batches = BATCH_SIZES
+        self.min_time = args.min_time
+        self.app = None
+
+
+def run(stages, ctx):
+    results = {}
+    for name in stages:
+        for case, fn in STAGES[name](ctx):
+            if isinstance(fn, tuple):
+                fn, per_call = fn
+                r = measure(fn, ctx.min_time, min_samples=3)
+                r = {"median_ms": r["median_ms"] / per_call, "p95_ms": r["p95_ms"] / per_call,
+                     "calls": r["calls"] * per_call}
+            else:
+                r = measure(fn, ctx.min_time)
+            results[case] = r
+            print(f"   {case:26s} median {r['median_ms']:10.4f} ms | p95 {r['p95_ms']:10.4f} ms | {r['calls']} calls")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Cases slower than baseline * (1 + tolerance)."""
+    slower = []
+    for case, r in results.items():
+        base = baseline["results"].get(case)
+        if base is None:
+            continue
+        ratio = r["median_ms"] / base["median_ms"] if base["median_ms"] > 0 else 1.0
+        if ratio > 1 + tolerance:
+            slower.append((case, base["median_ms"], r["median_ms"], ratio))
+    return slower
+
+
+if __name__ == '__main__':
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    parser = argparse.ArgumentParser(description="Benchmark the /predict hot path stage by stage")
+    parser.add_argument('--only', default=None, help=f"comma-separated stages: {', '.join(STAGES)}")
+    parser.add_argument('--quick', action='store_true', help="path sizes up to 10k only")
+    parser.add_argument('--min-time', type=float, default=0.3, help="seconds of timing per case")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--out', default=None, help="write results JSON here")
+    parser.add_argument('--save', default=None, help="write results JSON as the new baseline")
+    parser.add_argument('--compare', default=None, help="baseline JSON to check against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    stages = args.only.split(',') if args.only else list(STAGES)
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    # import_app() changes directory; resolve file arguments first
+    args.out, args.save, args.compare = (os.path.abspath(p) if p else None for p in (args.out, args.save, args.compare))
+    ctx = Context(args)
+    if {"normalize", "log_attempt", "predict_request", "predict_threads"} & set(stages):
+        ctx.app = import_app()
+
+    results = run(stages, ctx)
+    report = {
+        "created_at": time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()),
+        "machine": {"python": platform.python_version(), "numpy": np.__version__,
+                    "platform": platform.platform(), "cpus": os.cpu_count()},
+        "min_time": args.min_time,
+        "results": results,
+    }
+    for path in (args.out, args.save):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"✅ Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.tolerance)
+        checked = len(set(results) & set(baseline["results"]))
+        if slower:
+            for case, before, after, ratio in slower:
+                print(f"❌ {case}: {before:.4f} ms -> {after:.4f} ms ({(ratio - 1) * 100:+.0f}%)")
+            print(f"❌ {len(slower)} of {checked} cases slower than baseline by more than {args.tolerance * 100:.0f}%")
+            sys.exit(1)
+        print(f"✅ {checked} cases within {args.tolerance * 100:.0f}% of {args.compare}")
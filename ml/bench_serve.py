@@ -0,0 +1,278 @@
+"""
+How serve.py scales: throughput and memory per worker count.
+
+    python bench_serve.py                              # 1, 2, 4 ... up to the CPU count
+    python bench_serve.py --workers 1,2,4,8 --duration 15 --json scaling.json
+    python bench_serve.py --cold-start 5             # process launch -> first /predict answered
+
+For each worker count it starts serve.py (in a temporary directory, so
+database.db is not touched), drives POST /predict closed loop from
+--procs client processes until --duration is up, then reads the
+processes' memory from /proc:
+
+    rss      resident set of one worker, shared pages counted in full
+    pss      resident set with each shared page split between its users
+    uss      pages only this worker has (what one more worker really costs)
+
+The clients run on the same machine as the server, so keep --procs low
+enough that they don't eat the cores the workers are supposed to use.
+Linux only (/proc).
+
+--cold-start times a fresh single-worker serve.py from launch until its
+first POST /predict returns 200, interpreter start included: what a new
+replica costs before it can take traffic.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from loadgen import make_submission, route
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def human_bodies(count, seed):
+    """Pre-encoded /predict bodies, so the clients spend their CPU on sending."""
+    rng = random.Random(seed)
+    bodies = []
+    while len(bodies) < count:
+        endpoint, body = route(make_submission("human", rng, time.time() * 1000))
+        if endpoint == "/predict":
+            bodies.append(json.dumps(body))
+    return bodies
+
+
+def drive(port, bodies, threads, duration):
+    """One client process: `threads` keep-alive connections posting back to back. Returns latencies (ms)."""
+    deadline = time.monotonic() + duration
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def loop(offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine, i = [], offset
+        while time.monotonic() < deadline:
+            body = bodies[i % len(bodies)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request("POST", "/predict", body, {"Content-Type": "application/json"})
+                res = conn.getresponse()
+                res.read()
+                ok = res.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                ok = False
+            if ok:
+                mine.append((time.perf_counter() - start) * 1000)
+            else:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=loop, args=(t * 997,)) for t in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return latencies, errors[0]
+
+
+def memory_kb(pid):
+    """{"rss", "pss", "uss"} in kB from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {"rss": fields.get("Rss", 0), "pss": fields.get("Pss", 0),
+            "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)}
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_ready(port, proc, workers, timeout=60):
+    """Until the port answers and every worker has been forked."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"serve.py exited with {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/admin/runtime")
+            conn.getresponse().read()
+            conn.close()
+            if len(children(proc.pid)) >= workers:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"serve.py not ready after {timeout} s")
+
+
+def start_server(workers, port):
+    """serve.py in a scratch directory, with admission and the replay cache out of the way."""
+    scratch = tempfile.mkdtemp(prefix="bench-serve-")
+    env = dict(os.environ,
+               DB_PATH=os.path.join(scratch, "database.db"),
+               MODEL_WATCH_S="0",
+               RATE_LIMIT_PER_IP=str(10 ** 9), RATE_LIMIT_PER_PREFIX=str(10 ** 9),
+               REPLAY_CACHE_ENTRIES="1")   # bodies cycle, so every request is scored
+    return subprocess.Popen(
+        [sys.executable, "-W", "ignore", os.path.join(ML_DIR, "serve.py"), "--workers", str(workers), "--port", str(port)],
+        cwd=scratch, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def run_case(workers, args, bodies):
+    port = free_port()
+    proc = start_server(workers, port)
+    try:
+        wait_ready(port, proc, workers)
+        idle = [memory_kb(pid) for pid in children(proc.pid)]
+        start = time.monotonic()
+        with ProcessPoolExecutor(args.procs) as pool:
+            parts = list(pool.map(drive, [port] * args.procs, [bodies] * args.procs,
+                                  [args.threads] * args.procs, [args.duration] * args.procs))
+        wall_s = time.monotonic() - start
+        loaded = [memory_kb(pid) for pid in children(proc.pid)]
+        master = memory_kb(proc.pid)
+    finally:
+        stop_server(proc)
+
+    latencies = np.array([ms for part, _ in parts for ms in part]) if parts else np.zeros(0)
+    errors = sum(e for _, e in parts)
+    per_worker = {key: round(float(np.mean([m[key] for m in loaded])) / 1024, 1) for key in ("rss", "pss", "uss")}
+    return {
+        "workers": workers,
+        "requests": int(len(latencies)),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall_s, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+        "worker_mb_idle": {key: round(float(np.mean([m[key] for m in idle])) / 1024, 1) for key in ("rss", "pss", "uss")},
+        "worker_mb": per_worker,
+        "master_mb": {key: round(master[key] / 1024, 1) for key in ("rss", "pss", "uss")},
+        # What the whole server costs: pss adds up without counting shared pages twice
+        "total_pss_mb": round((master["pss"] + sum(m["pss"] for m in loaded)) / 1024, 1),
+    }
+
+
+def cold_start(body, timeout=120):
+    """Seconds from launching serve.py until a /predict answers 200, and the server's /ready report."""
+    port = free_port()
+    start = time.perf_counter()
+    proc = start_server(1, port)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"serve.py exited with {proc.returncode}")
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"no answer from serve.py after {timeout} s")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                conn.request("POST", "/predict", body, {"Content-Type": "application/json"})
+                res = conn.getresponse()
+                res.read()
+                if res.status == 200:
+                    elapsed = time.perf_counter() - start
+                    conn.request("GET", "/ready")
+                    res = conn.getresponse()
+                    raw = res.read()
+                    conn.close()
+                    ready = json.loads(raw) if res.status == 200 else None
+                    return elapsed, ready
+                conn.close()
+            except (OSError, http.client.HTTPException, ValueError):
+                pass
+            time.sleep(0.01)
+    finally:
+        stop_server(proc)
+
+
+if __name__ == '__main__':
+    cpus = os.cpu_count() or 1
+    default_counts = sorted({1, *(2 ** k for k in range(1, 8) if 2 ** k <= cpus), cpus})
+
+    parser = argparse.ArgumentParser(description="Throughput and memory of serve.py by worker count")
+    parser.add_argument('--workers', default=",".join(map(str, default_counts)), help="comma-separated worker counts")
+    parser.add_argument('--duration', type=float, default=10, help="seconds of load per worker count")
+    parser.add_argument('--procs', type=int, default=max(1, cpus // 2), help="client processes")
+    parser.add_argument('--threads', type=int, default=8, help="connections per client process")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--cold-start', type=int, default=0, metavar="RUNS",
+                        help="time launch -> first response RUNS times instead of the scaling run")
+    parser.add_argument('--json', default=None, help="also write the results here")
+    args = parser.parse_args()
+
+    if args.cold_start:
+        body = human_bodies(1, args.seed)[0]
+        runs = []
+        for i in range(args.cold_start):
+            elapsed, ready = cold_start(body)
+            startup = (ready or {}).get("startup", {})
+            runs.append({"first_response_s": round(elapsed, 3), "startup": startup})
+            print(f"   run {i + 1}: first response after {elapsed:.3f} s"
+                  + (f" | {', '.join(f'{k} {v}' for k, v in startup.items())}" if startup else ""))
+        times = [r["first_response_s"] for r in runs]
+        print(f"Cold start: median {np.median(times):.3f} s, min {min(times):.3f} s, max {max(times):.3f} s")
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"cold_start": runs, "median_s": float(np.median(times))}, f, indent=2)
+            print(f"✅ Results written to {args.json}")
+        sys.exit(0)
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("❌ bench_serve.py reads /proc/<pid>/smaps_rollup (Linux 4.14+)")
+
+    bodies = human_bodies(500, args.seed)
+    print(f"{cpus} CPUs | {args.procs} client procs x {args.threads} connections | {args.duration:g} s per case")
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'rss MB':>8} {'pss MB':>8} {'uss MB':>8} {'total pss':>10}")
+    results = []
+    for workers in (int(w) for w in args.workers.split(',')):
+        r = run_case(workers, args, bodies)
+        base = results[0]["throughput_rps"] if results else r["throughput_rps"]
+        r["speedup"] = round(r["throughput_rps"] / base, 2) if base else None
+        results.append(r)
+        m = r["worker_mb"]
+        print(f"{workers:>7} {r['throughput_rps']:>9} {r['speedup']:>7}x {r['p50_ms']:>8} {r['p99_ms']:>8} "
+              f"{m['rss']:>8} {m['pss']:>8} {m['uss']:>8} {r['total_pss_mb']:>10}"
+              + (f"  ⚠️ {r['errors']} errors" if r["errors"] else ""))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cpus": cpus, "procs": args.procs, "threads": args.threads,
+                       "duration": args.duration, "results": results}, f, indent=2)
+        print(f"✅ Results written to {args.json}")
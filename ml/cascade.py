@@ -0,0 +1,126 @@
+"""
+Cost-ordered rule cascade in front of the model.
+
+    cascade = Cascade()
+
+    @cascade.rule("Honeypot", cost_us=1)
+    def honeypot(ctx):
+        if ctx.payload.get("client", {}).get("middle_name"):
+            return {"verdict": "BOT", ...}
+
+    decided = cascade.run(ctx)   # (rule name, result) or None -> ask the model
+
+Rules run cheapest first (by the registered estimate) and the first one
+that returns a result decides; its name becomes the result's
+trigger_source. A rule returns None to pass the submission on. Only what
+no rule decides reaches features + forest, and stats() shows how much
+model work that saved, plus the measured cost of every rule, so a bad
+estimate is easy to spot.
+
+Context loads the request body on first use: a rule that only needs the
+client IP (RateLimit) runs before any parsing, and a rejected request is
+never parsed. The load is not counted in the measured cost of the rule that
+happened to trigger it.
+"""
+import time
+import threading
+
+
+class Context:
+    """One submission as the rules see it. `load()` -> payload dict, called at most once."""
+
+    def __init__(self, ip, load, session=None):
+        self.ip = ip                # None: not rate limited (batch payloads without an end-user IP)
+        self.session = session      # the streaming session being finalized, if any
+        self._load = load
+        self._payload = None
+        self._memo = {}
+        self.load_seconds = 0.0
+
+    @property
+    def payload(self):
+        if self._payload is None:
+            start = time.perf_counter()
+            self._payload = self._load()
+            self.load_seconds = time.perf_counter() - start
+        return self._payload
+
+    def memo(self, key, fn):
+        """fn(self) once per submission; later rules (and the route) reuse the value."""
+        if key not in self._memo:
+            self._memo[key] = fn(self)
+        return self._memo[key]
+
+
+class Rule:
+    __slots__ = ("name", "check", "cost_us", "runs", "hits", "seconds")
+
+    def __init__(self, name, check, cost_us):
+        self.name = name
+        self.check = check
+        self.cost_us = cost_us
+        self.runs = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+
+class Cascade:
+    def __init__(self):
+        self._rules = []
+        self._lock = threading.Lock()
+        self._counters = {"evaluated": 0, "decided": 0, "passed": 0}
+
+    def rule(self, name, cost_us):
+        """Decorator: registers check(ctx) under `name` (the trigger_source it records)."""
+        def register(check):
+            self.add(name, check, cost_us)
+            return check
+        return register
+
+    def add(self, name, check, cost_us):
+        if any(r.name == name for r in self._rules):
+            raise ValueError(f"rule {name!r} is already registered")
+        # A new list, never sorted in place: run() may be iterating the old one
+        self._rules = sorted(self._rules + [Rule(name, check, cost_us)], key=lambda r: r.cost_us)
+
+    @property
+    def names(self):
+        return [r.name for r in self._rules]
+
+    def run(self, ctx):
+        """(rule name, result) from the first rule that decides, or None. A rule's exception propagates."""
+        decided = None
+        timings = []
+        for rule in self._rules:
+            loaded = ctx.load_seconds
+            start = time.perf_counter()
+            result = rule.check(ctx)
+            timings.append((rule, time.perf_counter() - start - (ctx.load_seconds - loaded)))
+            if result is not None:
+                result["trigger_source"] = rule.name
+                decided = (rule.name, result)
+                break
+        with self._lock:
+            self._counters["evaluated"] += 1
+            self._counters["decided" if decided else "passed"] += 1
+            for rule, seconds in timings:
+                rule.runs += 1
+                rule.seconds += seconds
+            if decided:
+                timings[-1][0].hits += 1
+        return decided
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            rules = {r.name: {
+                "cost_us": r.cost_us,
+                "runs": r.runs,
+                "hits": r.hits,
+                "hit_rate": round(r.hits / r.runs, 4) if r.runs else 0.0,
+                "mean_us": round(r.seconds / r.runs * 1e6, 2) if r.runs else 0.0,
+            } for r in self._rules}
+        # Share of submissions that never reached features + forest
+        evaluated = counters["evaluated"]
+        counters["model_skipped_rate"] = round(counters["decided"] / evaluated, 4) if evaluated else 0.0
+        return dict(counters, rules=rules)
@@ -0,0 +1,181 @@
+"""
+CompiledForest: a flattened copy of the RandomForest in model.pkl.
+
+All trees are packed into a handful of NumPy arrays (feature, threshold,
+left/right child, leaf value) and every row walks every tree at once, so
+one call gives both the verdict and the probability. No scikit-learn
+validation runs on the hot path.
+
+save() writes the arrays as plain .npy files in a directory; open() maps
+them back read-only (np.load mmap_mode='r'). That needs neither joblib nor
+scikit-learn, and every process serving the same file shares its pages.
+
+Run `python compiled_forest.py` to check parity against predict_proba on
+training_data.csv and print a latency comparison. The same parity is asserted by
+`python -m pytest tests` (tests/test_compiled_forest.py).
+"""
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+ARRAYS = ("feature", "threshold", "children", "leaf_value", "roots", "classes")
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, children, leaf_value, roots, depth, classes, feature_names=None):
+        self.feature = feature          # int32, split feature per node (0 for leaves)
+        self.threshold = threshold      # float64, +inf for leaves so they always go "left"
+        self.children = children        # int32, [2i] = right child, [2i + 1] = left child (self for leaves)
+        self.leaf_value = leaf_value    # float64, P(class 1) stored at each node
+        self.roots = roots              # int32, global index of each tree's root
+        self.depth = depth              # deepest tree, = number of traversal steps
+        self.classes = classes
+        self.feature_names = feature_names
+        self.n_trees = len(roots)
+        self.n_features = len(feature_names) if feature_names is not None else int(feature.max()) + 1
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Packs a fitted RandomForestClassifier (binary) into flat arrays."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # Same normalisation DecisionTreeClassifier.predict_proba applies
+            counts = tree.value[:, 0, :]
+            values.append(counts[:, 1] / counts.sum(axis=1))
+
+            roots.append(offset)
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+
+        # Interleave so the next node is children[2 * node + went_left]
+        children = np.column_stack([np.concatenate(rights), np.concatenate(lefts)]).ravel()
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=children.astype(np.int32),
+            leaf_value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=np.int32),
+            depth=depth,
+            classes=np.asarray(model.classes_),
+            feature_names=getattr(model, 'feature_names_in_', None),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Loads a pickled RandomForestClassifier and compiles it."""
+        import joblib  # pulls in scikit-learn when unpickling; only paid on this path
+        return cls.from_sklearn(joblib.load(path))
+
+    # --- NATIVE ARRAY FORMAT (directory of .npy files + meta.json) ---
+    def save(self, directory, meta=None):
+        """Writes the arrays to `directory` (created). `meta` is stored alongside, returned by open()."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        names = None if self.feature_names is None else [str(n) for n in self.feature_names]
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(dict(meta or {}, depth=int(self.depth), feature_names=names), f)
+
+    @classmethod
+    def open(cls, directory, mmap=True):
+        """Reads a save()d forest. With mmap the arrays are read-only views of the files."""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                  for name in ARRAYS}
+        # Plain ndarray views of the mapping: np.memmap's subclass hooks cost ~50 us per predict
+        arrays = {name: array.view(np.ndarray) for name, array in arrays.items()}
+        names = meta.get("feature_names")
+        engine = cls(depth=meta["depth"], feature_names=np.array(names, dtype=object) if names else None, **arrays)
+        return engine, meta
+
+    def predict_proba(self, X):
+        """P(class 1) for each row of X, shape (N,)."""
+        # Trees compare float32 inputs against float64 thresholds; copy that exactly
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        flat = X.ravel()
+        row_base = (np.arange(len(X)) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.depth):
+            go_left = flat[row_base + self.feature[node]] <= self.threshold[node]
+            node = self.children[2 * node + go_left]
+
+        return self.leaf_value[node].sum(axis=1) / self.n_trees
+
+    def predict(self, X):
+        """Returns (labels, probabilities) from a single traversal."""
+        probability = self.predict_proba(X)
+        # argmax over [1 - p, p] as RandomForestClassifier.predict does; ties go to classes[0]
+        labels = self.classes[(probability > 1 - probability).astype(int)]
+        return labels, probability
+
+    def predict_one(self, features):
+        """Scores one feature vector, returns (label, probability)."""
+        labels, probability = self.predict([features])
+        return labels[0], float(probability[0])
+
+
+# --- PARITY CHECK & LATENCY COMPARISON ---
+def _time_per_call(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+if __name__ == '__main__':
+    import warnings
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    parser = argparse.ArgumentParser(description="Check CompiledForest against scikit-learn")
+    parser.add_argument('--model', default='model.pkl')
+    parser.add_argument('--data', default='training_data.csv')
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=256, help="micro-batch size to time")
+    args = parser.parse_args()
+
+    import joblib
+    model = joblib.load(args.model)
+    engine = CompiledForest.from_sklearn(model)
+    X = np.loadtxt(args.data, delimiter=',', skiprows=1)[:, :6]
+
+    expected = model.predict_proba(X)[:, 1]
+    expected_labels = model.predict(X)
+    labels, got = engine.predict(X)
+
+    max_diff = np.abs(expected - got).max()
+    mismatches = int((expected_labels != labels).sum())
+    print(f"Rows: {len(X)} | Trees: {engine.n_trees} | Nodes: {len(engine.feature)} | Depth: {engine.depth}")
+    print(f"Max |proba diff|: {max_diff:.3e} | Verdict mismatches: {mismatches}")
+
+    row = X[:1]
+    sk_single = _time_per_call(lambda: (model.predict(row), model.predict_proba(row)), args.repeats)
+    cf_single = _time_per_call(lambda: engine.predict(row), args.repeats)
+    print(f"Single row : sklearn predict+predict_proba {sk_single:.3f} ms | compiled {cf_single:.3f} ms ({sk_single / cf_single:.1f}x)")
+    for size in (args.batch, len(X)):
+        batch = X[:size]
+        sk_batch = _time_per_call(lambda: (model.predict(batch), model.predict_proba(batch)), max(1, args.repeats // 20))
+        cf_batch = _time_per_call(lambda: engine.predict(batch), max(1, args.repeats // 20))
+        print(f"{size} rows : sklearn predict+predict_proba {sk_batch:.3f} ms | compiled {cf_batch:.3f} ms ({sk_batch / cf_batch:.1f}x)")
+
+    if max_diff > 1e-9 or mismatches:
+        print("❌ PARITY FAILED")
+        raise SystemExit(1)
+    print("✅ Parity OK")
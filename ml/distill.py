@@ -0,0 +1,136 @@
+"""
+Distils the forest into the fast tier: one shallow tree fitted to its probabilities.
+
+    python distill.py                               # model.pkl + training_data.csv -> model.fast/
+    python distill.py --max-depth 3 --band 0.25,0.75
+    python distill.py --dry-run                     # report only, write nothing
+
+The tree is a regression tree on the forest's P(bot), not on the labels:
+it learns where the forest is sure and where it is not, so its own
+uncertain region lines up with the forest's. The CSV is two tight
+clusters, so the fit also sees --mix rows interpolated between random
+pairs of CSV rows (scored by the forest too); without them nothing
+teaches the tree what lies in between.
+
+The report is on a held-out split: how many rows the band escalates,
+how often the tiered verdict (and the HUMAN / SUSPICIOUS / BOT band the
+login page shows) matches the forest alone, and the single-row latency
+of both. The tree is written next to the pickle it was distilled from and
+is only used with that exact file (model_registry.open_fast).
+"""
+import time
+import argparse
+import numpy as np
+
+from compiled_forest import CompiledForest
+from model_registry import FastTier, frontend_band, save_fast
+
+
+def mixed_rows(X, n, rng):
+    """n rows on the straight lines between random pairs of rows of X."""
+    if n <= 0 or len(X) < 2:
+        return np.empty((0, X.shape[1]))
+    a = X[rng.integers(0, len(X), n)]
+    b = X[rng.integers(0, len(X), n)]
+    w = rng.random((n, 1))
+    return a + w * (b - a)
+
+
+def fit_tree(X, probability, max_depth, min_samples_leaf, seed):
+    """DecisionTreeRegressor on P(bot), as a one-tree CompiledForest."""
+    from sklearn.tree import DecisionTreeRegressor
+    tree = DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=min_samples_leaf, random_state=seed)
+    # Fitted on float32 like the forest was, so thresholds compare the same way at serve time
+    tree.fit(np.asarray(X, dtype=np.float32), probability)
+    t = tree.tree_
+    is_leaf = t.children_left == -1
+    node_ids = np.arange(t.node_count)
+    left = np.where(is_leaf, node_ids, t.children_left)
+    right = np.where(is_leaf, node_ids, t.children_right)
+    return CompiledForest(
+        feature=np.where(is_leaf, 0, t.feature).astype(np.int32),
+        threshold=np.where(is_leaf, np.inf, t.threshold).astype(np.float64),
+        children=np.column_stack([right, left]).ravel().astype(np.int32),
+        leaf_value=np.clip(t.value[:, 0, 0], 0.0, 1.0).astype(np.float64),
+        roots=np.array([0], dtype=np.int32),
+        depth=int(t.max_depth),
+        classes=np.array([0, 1]),
+    )
+
+
+def per_row_ms(fn, rows):
+    times = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        start = time.perf_counter()
+        fn(row)
+        times[i] = (time.perf_counter() - start) * 1000
+    return float(np.percentile(times, 50)), float(np.mean(times))
+
+
+def tier_report(forest, fast, X, band):
+    """Escalation rate, agreement with the forest alone and single-row latency, on the rows X."""
+    low, high = band
+    forest_p = forest.predict_proba(X)
+    fast_p = fast.predict_proba(X)
+    escalate = (fast_p >= low) & (fast_p <= high)
+    tiered_p = np.where(escalate, forest_p, fast_p)
+    bands_forest = np.array([frontend_band(p) for p in forest_p])
+    bands_tiered = np.array([frontend_band(p) for p in tiered_p])
+
+    def tiered_one(row):
+        p = fast.predict_proba_one(row)
+        return forest.predict_one(row) if low <= p <= high else p
+
+    rows = [row.tolist() for row in X[:min(len(X), 2000)]]
+    forest_p50, forest_mean = per_row_ms(forest.predict_one, rows)
+    tiered_p50, tiered_mean = per_row_ms(tiered_one, rows)
+    return {
+        "rows": int(len(X)),
+        "band": [low, high],
+        "escalation_rate": round(float(escalate.mean()), 4),
+        "verdict_agreement": round(float(((tiered_p > 0.5) == (forest_p > 0.5)).mean()), 4),
+        "band_agreement": round(float((bands_tiered == bands_forest).mean()), 4),
+        "forest_ms": {"p50": round(forest_p50, 4), "mean": round(forest_mean, 4)},
+        "tiered_ms": {"p50": round(tiered_p50, 4), "mean": round(tiered_mean, 4)},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Distil the forest into a shallow fast-tier tree")
+    parser.add_argument('--model', default='model.pkl')
+    parser.add_argument('--data', default='training_data.csv')
+    parser.add_argument('--max-depth', type=int, default=4)
+    parser.add_argument('--min-samples-leaf', type=int, default=20)
+    parser.add_argument('--mix', type=int, default=20000, help="interpolated rows added to the fit")
+    parser.add_argument('--band', default="0.2,0.8", help="escalation band the report uses (serving: TIER_BAND_*)")
+    parser.add_argument('--holdout', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dry-run', action='store_true', help="print the report, write nothing")
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+    from train import load_csv
+
+    band = tuple(float(v) for v in args.band.split(','))
+    rng = np.random.default_rng(args.seed)
+    forest = CompiledForest.load(args.model)
+    X, y = load_csv(args.data)
+    X_fit, X_test = train_test_split(X, test_size=args.holdout, stratify=y, random_state=args.seed)
+    X_fit = np.vstack([X_fit, mixed_rows(X_fit, args.mix, rng)])
+    engine = fit_tree(X_fit, forest.predict_proba(X_fit), args.max_depth, args.min_samples_leaf, args.seed)
+    fast = FastTier(engine, {})
+    print(f"Fast tier: depth {engine.depth}, {len(engine.feature)} nodes (forest: {forest.n_trees} trees, {len(forest.feature)} nodes)")
+
+    reports = {"holdout": tier_report(forest, fast, X_test, band),
+               "holdout_mixed": tier_report(forest, fast, mixed_rows(X_test, len(X_test), rng), band)}
+    for name, report in reports.items():
+        saved = 1 - report["tiered_ms"]["mean"] / report["forest_ms"]["mean"]
+        print(f"{name:>14}: {report['rows']} rows | escalated {report['escalation_rate']:.1%} | "
+              f"verdict agreement {report['verdict_agreement']:.2%} | band agreement {report['band_agreement']:.2%} | "
+              f"forest {report['forest_ms']['mean']:.4f} ms, tiered {report['tiered_ms']['mean']:.4f} ms ({saved:.0%} saved)")
+
+    if args.dry_run:
+        print("📝 Dry run: nothing written")
+    else:
+        save_fast(engine, args.model, meta={"max_depth": args.max_depth, "mix": args.mix, "report": reports["holdout"]})
+        print(f"✅ Wrote the fast tier for {args.model}")
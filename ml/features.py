@@ -0,0 +1,128 @@
+"""
+Feature extraction shared by the Flask app and the offline tools.
+
+Six features per attempt, in the order model.pkl was trained on
+(FEATURE_NAMES, also the columns of training_data.csv).
+"""
+import numpy as np
+
+FEATURE_NAMES = ["movement_time", "speed_variance", "path_efficiency", "curvature_sum",
+                 "click_dwell", "typing_flight_avg"]
+
+# --- FEATURE EXTRACTION (The Math) ---
+def extract_features(data):
+    # (Keeping your existing logic essentially the same)
+    mouse_path = np.asarray(data.get('mouse_path', []), dtype=np.float64)  # no copy for wire.py bodies
+    click_timestamps = data.get('click_timestamps', [0, 0])
+    keystroke_timestamps = data.get('keystroke_timestamps', [])
+
+    if len(mouse_path) < 2:
+        return [0, 0, 1.0, 0, 0, 0] # Default Bot values
+    
+    points = mouse_path[:, :2]
+    timestamps = mouse_path[:, 2]
+    
+    movement_time = timestamps[-1] - timestamps[0]
+    
+    diffs = np.diff(points, axis=0)
+    segment_dists = np.sqrt((diffs ** 2).sum(axis=1))
+    time_diffs = np.diff(timestamps) + 0.001
+    speeds = segment_dists / time_diffs
+    speed_variance = np.std(speeds)
+    
+    total_dist = segment_dists.sum()
+    straight_dist = np.linalg.norm(points[-1] - points[0])
+    path_efficiency = straight_dist / total_dist if total_dist > 0 else 1
+    
+    curvature_sum = 0
+    if len(points) > 2:
+        v1 = diffs[:-1]; v2 = diffs[1:]
+        norm_v1 = np.linalg.norm(v1, axis=1, keepdims=True)
+        norm_v2 = np.linalg.norm(v2, axis=1, keepdims=True)
+        dot = (v1 * v2).sum(axis=1)
+        valid = (norm_v1 * norm_v2).flatten()
+        curvature_sum = np.sum(np.arccos(np.clip(dot / (valid + 1e-10), -1.0, 1.0)))
+
+    click_dwell = click_timestamps[1] - click_timestamps[0] if len(click_timestamps) >= 2 else 0
+    flight_avg = np.mean(np.diff(keystroke_timestamps)) if len(keystroke_timestamps) > 1 else 0
+
+    return [movement_time, speed_variance, path_efficiency, curvature_sum, click_dwell, flight_avg]
+
+# --- DEGRADED-MODE FEATURES (Two of the Six, for overload.heuristic_probability) ---
+def quick_features(data):
+    """(movement_time, path_efficiency) exactly as extract_features computes them, skipping the rest."""
+    mouse_path = np.asarray(data.get('mouse_path', []), dtype=np.float64)
+    if len(mouse_path) < 2:
+        return 0, 1.0 # Default Bot values
+    points = mouse_path[:, :2]
+    total_dist = np.sqrt((np.diff(points, axis=0) ** 2).sum(axis=1)).sum()
+    straight_dist = np.linalg.norm(points[-1] - points[0])
+    return mouse_path[-1, 2] - mouse_path[0, 2], straight_dist / total_dist if total_dist > 0 else 1
+
+# --- BATCHED FEATURE EXTRACTION (Same Math, N Paths at Once) ---
+def extract_features_batch(payloads):
+    """
+    Vectorized extract_features for N payloads. Returns an (N, 6) array.
+    All paths are concatenated into one (M, 3) array and split by offsets,
+    so the NumPy work is a fixed number of calls whatever N is.
+    """
+    n = len(payloads)
+    features = np.zeros((n, 6))
+    features[:, 2] = 1.0  # Default Bot values for short paths
+
+    paths = [np.asarray(p.get('mouse_path', []), dtype=float) for p in payloads]
+    valid = np.array([len(p) >= 2 for p in paths], dtype=bool)
+
+    if valid.any():
+        stacked = np.concatenate([p[:, :3] for p, ok in zip(paths, valid) if ok])
+        lengths = np.array([len(p) for p, ok in zip(paths, valid) if ok])
+        k = len(lengths)
+        ends = np.cumsum(lengths) - 1
+        starts = ends - lengths + 1
+
+        points = stacked[:, :2]
+        timestamps = stacked[:, 2]
+        movement_time = timestamps[ends] - timestamps[starts]
+
+        # Segments that join the last point of one path to the first of the next are dropped
+        keep = np.ones(len(stacked) - 1, dtype=bool)
+        keep[ends[:-1]] = False
+        owner = np.repeat(np.arange(k), lengths - 1)
+        seg_count = lengths - 1
+
+        diffs = np.diff(points, axis=0)[keep]
+        segment_dists = np.sqrt((diffs ** 2).sum(axis=1))
+        time_diffs = np.diff(timestamps)[keep] + 0.001
+        speeds = segment_dists / time_diffs
+        speed_mean = np.bincount(owner, speeds, minlength=k) / seg_count
+        speed_variance = np.sqrt(np.bincount(owner, (speeds - speed_mean[owner]) ** 2, minlength=k) / seg_count)
+
+        total_dist = np.bincount(owner, segment_dists, minlength=k)
+        straight_dist = np.linalg.norm(points[ends] - points[starts], axis=1)
+        path_efficiency = np.ones(k)
+        np.divide(straight_dist, total_dist, out=path_efficiency, where=total_dist > 0)
+
+        # Angle between consecutive segments of the same path
+        same_path = owner[:-1] == owner[1:]
+        v1 = diffs[:-1][same_path]; v2 = diffs[1:][same_path]
+        norm_v1 = np.linalg.norm(v1, axis=1)
+        norm_v2 = np.linalg.norm(v2, axis=1)
+        dot = (v1 * v2).sum(axis=1)
+        angles = np.arccos(np.clip(dot / (norm_v1 * norm_v2 + 1e-10), -1.0, 1.0))
+        curvature_sum = np.bincount(owner[:-1][same_path], angles, minlength=k)
+
+        features[valid, 0] = movement_time
+        features[valid, 1] = speed_variance
+        features[valid, 2] = path_efficiency
+        features[valid, 3] = curvature_sum
+
+    for i, data in enumerate(payloads):
+        if not valid[i]:
+            continue
+        click_timestamps = data.get('click_timestamps', [0, 0])
+        keystroke_timestamps = data.get('keystroke_timestamps', [])
+        # mean(diff(k)) telescopes to (last - first) / (n - 1)
+        features[i, 4] = click_timestamps[1] - click_timestamps[0] if len(click_timestamps) >= 2 else 0
+        features[i, 5] = (keystroke_timestamps[-1] - keystroke_timestamps[0]) / (len(keystroke_timestamps) - 1) if len(keystroke_timestamps) > 1 else 0
+
+    return features
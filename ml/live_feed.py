@@ -0,0 +1,164 @@
+"""
+LiveFeed: fan-out of newly committed login_attempts to dashboard streams.
+
+The log writer publishes each committed row once. The event is serialized
+once into a small ring buffer, and every connected /admin/stream client
+waits on the same condition variable. A dashboard tab costs one idle
+thread, not a /admin/stats recomputation every 2 seconds.
+
+With several worker processes (serve.py) each has its own feed, and its
+log writer only sees its own rows. There a DatabaseTail is the only
+publisher: one thread per process reads rows after the newest id it has
+published, so every feed gets every worker's rows in id order. SQLite
+commits one writer at a time, so ids are committed in increasing order
+and `id > last` misses nothing. The cost is one query per interval per
+process, not per dashboard tab.
+"""
+import json
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+# Same UTC -> IST shift the dashboard queries use ('+5.5 hours')
+IST_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def attempt_event(row_id, timestamp, verdict, trigger_source, fail_reason, confidence_score):
+    """
+    One stream event: the live-feed row plus the deltas to apply to the
+    funnel / zoo / heatmap / volume panels. `timestamp` is UTC text as
+    stored in login_attempts ('YYYY-MM-DD HH:MM:SS').
+    """
+    ist = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S') + IST_OFFSET
+    is_bot = verdict == 'BOT'
+    return {
+        "log": {
+            "id": row_id,
+            "time": ist.strftime('%Y-%m-%d %H:%M:%S'),
+            "verdict": verdict,
+            "source": trigger_source,
+            "score": confidence_score,
+        },
+        "delta": {
+            "funnel": trigger_source,
+            "zoo": fail_reason if is_bot else None,
+            "hour": ist.strftime('%H:00') if is_bot else None,
+            "date": ist.strftime('%Y-%m-%d'),
+            "bots": int(is_bot),
+            "humans": int(verdict == 'HUMAN'),
+        },
+    }
+
+
+def format_sse(row_id, event_type, payload):
+    return f"id: {row_id}\nevent: {event_type}\ndata: {json.dumps(payload)}\n\n"
+
+
+class LiveFeed:
+    def __init__(self, buffer_size=1000):
+        self._events = deque(maxlen=buffer_size)  # (row_id, serialized SSE frame)
+        self._cond = threading.Condition()
+        self.subscribers = 0
+        self.published = 0
+
+    def publish(self, events):
+        """events: [(row_id, payload)] in commit order."""
+        frames = [(row_id, format_sse(row_id, "attempt", payload)) for row_id, payload in events]
+        with self._cond:
+            self._events.extend(frames)
+            self.published += len(frames)
+            self._cond.notify_all()
+
+    @property
+    def latest_id(self):
+        with self._cond:
+            return self._events[-1][0] if self._events else 0
+
+    def wait_since(self, last_id, timeout):
+        """
+        Frames with id > last_id, blocking up to `timeout` seconds for new ones.
+        Returns None when last_id has already fallen out of the ring buffer,
+        so the caller must catch up from the database.
+        """
+        with self._cond:
+            if self._events and last_id < self._events[0][0] - 1:
+                return None
+            if not self._events or self._events[-1][0] <= last_id:
+                self._cond.wait(timeout)
+                if self._events and last_id < self._events[0][0] - 1:
+                    return None
+            # Ids only grow, so walk back from the newest frame
+            frames = []
+            for frame in reversed(self._events):
+                if frame[0] <= last_id:
+                    break
+                frames.append(frame)
+            frames.reverse()
+            return frames
+
+    def stats(self):
+        with self._cond:
+            return {
+                "subscribers": self.subscribers,
+                "published": self.published,
+                "buffered": len(self._events),
+            }
+
+    def subscribe(self):
+        with self._cond:
+            self.subscribers += 1
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+
+
+class DatabaseTail:
+    """Publishes rows from fetch(after_id) -> [(row_id, payload)] (oldest first) every interval_s."""
+
+    def __init__(self, feed, fetch, interval_s=0.25):
+        self.feed = feed
+        self.fetch = fetch
+        self.interval_s = interval_s
+        self.last_id = 0
+        self.polls = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, after_id):
+        """Publishes rows after `after_id` (the newest row at startup) from now on."""
+        if self._thread is None:
+            self.last_id = after_id
+            self._thread = threading.Thread(target=self._run, name="feed-tail", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ Live feed tail failed: {e}")
+
+    def poll(self):
+        """Reads and publishes everything after last_id; returns how many rows that was."""
+        published = 0
+        while True:
+            events = self.fetch(self.last_id)
+            if not events:
+                break
+            self.feed.publish(events)
+            self.last_id = events[-1][0]
+            published += len(events)
+        self.polls += 1
+        return published
+
+    def close(self):
+        self._stop.set()
+
+    def stats(self):
+        return {"running": int(self.running), "polls": self.polls, "last_id": self.last_id}
@@ -0,0 +1,337 @@
+"""
+Synthetic traffic for load tests: no browser, no Selenium.
+
+Each strategy builds what the browser would have recorded for one of the
+bot_*.py scripts (or a human), in the exact shape of
+useBehaviorTracking.getPayload(), plus the page state LoginPage.handleLogin
+sends as "client". Everything goes to /predict; the server's rule cascade
+catches Honeypot / GhostWindow / VampireCheck / SpeedTrap / StatueCheck
+and the model scores the rest.
+
+    python loadgen.py --url http://127.0.0.1:5000 --rps 200 --duration 30 --procs 4
+    python loadgen.py --offline --rps 100 --duration 10          # Flask test client
+    python loadgen.py --mix human=0.7,linear=0.1,smart=0.1,teleport=0.1 --json run.json
+
+The schedule is open loop: request i is due at start + i / rps, and
+latency counts from when it was due, so a slow server can't hide its
+queueing by slowing the client down. Each simulated client gets its own
+address: X-Forwarded-For over HTTP (honoured when the server runs with
+TRUST_PROXY=1), REMOTE_ADDR offline. Offline mode runs app.py in a
+temporary directory, so the real database.db is never written.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+STRATEGIES = ("human", "linear", "smart", "suspicious", "teleport", "vampire", "honeypot")
+
+# Browser viewport, Aadhaar input and Login button positions used by the generated paths
+SCREEN = (1920, 1080)
+WINDOW = (1280, 800)
+INPUT_XY = (470, 360)
+BUTTON_XY = (520, 450)
+
+
+# --- WHAT THE BROWSER RECORDS (one Submission per login) ---
+class Submission:
+    __slots__ = ("strategy", "mouse_path", "click_timestamps", "keystroke_timestamps",
+                 "elapsed_ms", "honeypot", "hidden", "window", "name_filled")
+
+    def __init__(self, strategy, mouse_path, clicks, keys, elapsed_ms,
+                 honeypot=False, hidden=False, window=WINDOW, name_filled=True):
+        self.strategy = strategy
+        self.mouse_path = mouse_path
+        self.click_timestamps = clicks
+        self.keystroke_timestamps = keys
+        self.elapsed_ms = elapsed_ms
+        self.honeypot = honeypot
+        self.hidden = hidden
+        self.window = window
+        self.name_filled = name_filled
+
+    def payload(self):
+        """Same keys as useBehaviorTracking.getPayload()."""
+        return {
+            "mouse_path": self.mouse_path,
+            "click_timestamps": self.click_timestamps,
+            "keystroke_timestamps": self.keystroke_timestamps,
+        }
+
+
+def _typing(rng, start, chars, low, high):
+    gaps = [rng.uniform(low, high) for _ in range(chars)]
+    return [int(start + t) for t in np.cumsum(gaps)]
+
+
+def _line(rng, start, end, steps, t0, dt_low, dt_high, jitter=0.0, bow=0.0):
+    """Points from start to end; bow adds a sine arc (bot_smart), jitter a uniform shake."""
+    points, t = [], t0
+    for i in range(steps + 1):
+        s = i / steps
+        x = start[0] + (end[0] - start[0]) * s + rng.uniform(-jitter, jitter)
+        y = start[1] + (end[1] - start[1]) * s + bow * math.sin(s * math.pi) + rng.uniform(-jitter, jitter)
+        points.append([round(x, 1), round(y, 1), int(t)])
+        t += rng.uniform(dt_low, dt_high)
+    return points
+
+
+def _human_path(rng, t0):
+    """A few eased, bowed strokes with hand tremor, sampled every 8-24 ms like mousemove."""
+    waypoints = [(rng.uniform(200, 1000), rng.uniform(150, 650)) for _ in range(rng.randint(2, 4))]
+    waypoints += [INPUT_XY, BUTTON_XY]
+    x, y = rng.uniform(100, 1100), rng.uniform(100, 700)
+    points, t = [], t0
+    for wx, wy in waypoints:
+        dist = math.hypot(wx - x, wy - y)
+        steps = max(8, int(dist / rng.uniform(6, 14)))
+        bow = rng.uniform(-0.15, 0.15) * dist
+        for i in range(1, steps + 1):
+            s = i / steps
+            ease = s * s * (3 - 2 * s)
+            nx = -(wy - y) / (dist or 1)
+            ny = (wx - x) / (dist or 1)
+            arc = bow * math.sin(s * math.pi)
+            px = x + (wx - x) * ease + nx * arc + rng.gauss(0, 0.8)
+            py = y + (wy - y) * ease + ny * arc + rng.gauss(0, 0.8)
+            points.append([round(px), round(py), int(t)])
+            t += rng.uniform(8, 24)
+        x, y = wx, wy
+        t += rng.uniform(150, 600)  # pause before the next stroke
+    return points, t
+
+
+def make_submission(strategy, rng, now_ms):
+    """What the page has recorded when the Login click fires, for one strategy."""
+    if strategy == "human":
+        load = now_ms - rng.uniform(6000, 20000)
+        keys = _typing(rng, load + 1500, rng.randint(18, 30), 90, 280)
+        path, t = _human_path(rng, keys[-1] + rng.uniform(200, 600))
+        down = t + rng.uniform(20, 80)
+        clicks = [int(down), int(down + rng.uniform(80, 150))]
+        return Submission(strategy, path, clicks, keys, clicks[-1] - load)
+
+    if strategy in ("linear", "smart", "suspicious"):
+        load = now_ms - rng.uniform(3000, 6000)
+        # send_keys types in a few ms per key; bot_suspicious types 50-150 ms per key
+        low, high = (50, 150) if strategy == "suspicious" else (1, 6)
+        keys = _typing(rng, load + 2000, 24, low, high)
+        if strategy == "linear":
+            path = _line(rng, INPUT_XY, BUTTON_XY, 50, keys[-1] + 50, 10, 14)
+        elif strategy == "smart":
+            path = _line(rng, INPUT_XY, BUTTON_XY, 80, keys[-1] + 50, 20, 26, jitter=2, bow=50)
+        else:
+            path = _line(rng, INPUT_XY, BUTTON_XY, 40, keys[-1] + 50, 20, 24)
+        down = path[-1][2] + rng.uniform(1, 5)
+        clicks = [int(down), int(down + rng.uniform(0, 4))]
+        return Submission(strategy, path, clicks, keys, max(clicks[-1] - load, 2600))
+
+    if strategy == "teleport":
+        # Values set through JS and a scripted click two seconds after load: nothing recorded
+        return Submission(strategy, [], [], [], rng.uniform(2000, 2400))
+
+    if strategy == "vampire":
+        load = now_ms - rng.uniform(5000, 5500)
+        keys = _typing(rng, load + 2000, 24, 1, 6)
+        return Submission(strategy, [], [], keys, now_ms - load, hidden=True)
+
+    if strategy == "honeypot":
+        load = now_ms - rng.uniform(2000, 3000)
+        keys = _typing(rng, load + 2000, 26, 1, 6)
+        return Submission(strategy, [], [], keys, now_ms - load, honeypot=True)
+
+    raise ValueError(f"unknown strategy {strategy!r}")
+
+
+# --- LOGINPAGE.JSX: PAGE STATE WITH THE TELEMETRY, THE SERVER DECIDES ---
+def route(sub):
+    """(endpoint, body) exactly as handleLogin would send it."""
+    body = sub.payload()
+    body["screen_width"], body["screen_height"] = SCREEN
+    body["client"] = {
+        "middle_name": "Kumar" if sub.honeypot else "",
+        "name_filled": sub.name_filled,
+        "outer_width": sub.window[0],
+        "outer_height": sub.window[1],
+        "visibility": "hidden" if sub.hidden else "visible",
+        "page_ms": int(sub.elapsed_ms),
+    }
+    return "/predict", body
+
+
+def verdict_label(endpoint, status, response):
+    """HUMAN / SUSPICIOUS / BOT as VerdictPopup shows it."""
+    if status != 200 or response is None:
+        return "error"
+    score = response.get("confidence_score") or 0
+    return "HUMAN" if score <= 30 else "SUSPICIOUS" if score <= 70 else "BOT"
+
+
+# --- CLIENTS ---
+class HttpClient:
+    """One keep-alive connection per thread."""
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self._local = threading.local()
+
+    def post(self, endpoint, body, client_ip):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        data = json.dumps(body)
+        headers = {"Content-Type": "application/json", "X-Forwarded-For": client_ip}
+        try:
+            conn.request("POST", endpoint, data, headers)
+            res = conn.getresponse()
+            raw = res.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            return 0, None
+        try:
+            return res.status, json.loads(raw)
+        except ValueError:
+            return res.status, None
+
+
+class OfflineClient:
+    """Flask test client against app.py, imported in a scratch working directory."""
+
+    def __init__(self, ml_dir):
+        import tempfile
+        scratch = tempfile.mkdtemp(prefix="loadgen-")
+        os.environ.setdefault("DB_PATH", os.path.join(scratch, "database.db"))
+        os.environ.setdefault("MODEL_WATCH_S", "0")
+        os.chdir(scratch)
+        sys.path.insert(0, ml_dir)
+        import app
+        self.app = app.create_app()
+
+    def post(self, endpoint, body, client_ip):
+        res = self.app.test_client().post(endpoint, json=body, environ_base={"REMOTE_ADDR": client_ip})
+        return res.status_code, res.get_json(silent=True)
+
+
+def run_worker(worker, args):
+    """One process: `args.threads` threads share this process's slice of the schedule."""
+    rng_seed = args.seed * 1000 + worker
+    client = OfflineClient(args.ml_dir) if args.offline else HttpClient(args.url)
+    names, weights = zip(*args.mix.items())
+    rate = args.rps / args.procs
+    total = int(rate * args.duration)
+    start = args.start_at
+    slots = iter(range(total))
+    slot_lock = threading.Lock()
+    records = []   # (strategy, endpoint, status, verdict, latency_ms)
+
+    def loop(thread_index):
+        rng = random.Random(rng_seed * 100 + thread_index)
+        while True:
+            with slot_lock:
+                i = next(slots, None)
+            if i is None:
+                return
+            due = start + i / rate
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            strategy = rng.choices(names, weights)[0]
+            sub = make_submission(strategy, rng, time.time() * 1000)
+            endpoint, body = route(sub)
+            client_ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+            status, response = client.post(endpoint, body, client_ip)
+            latency_ms = (time.time() - due) * 1000
+            records.append((strategy, endpoint, status, verdict_label(endpoint, status, response), latency_ms))
+
+    threads = [threading.Thread(target=loop, args=(t,)) for t in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return records
+
+
+# --- REPORT ---
+def summarize(records, wall_s):
+    def block(rows):
+        latency = np.array([r[4] for r in rows]) if rows else np.zeros(1)
+        errors = sum(1 for r in rows if r[3] == "error")
+        verdicts = {}
+        for r in rows:
+            verdicts[r[3]] = verdicts.get(r[3], 0) + 1
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / wall_s, 1) if wall_s else 0,
+            "error_rate": round(errors / len(rows), 4) if rows else 0,
+            "p50_ms": round(float(np.percentile(latency, 50)), 2),
+            "p95_ms": round(float(np.percentile(latency, 95)), 2),
+            "p99_ms": round(float(np.percentile(latency, 99)), 2),
+            "verdicts": dict(sorted(verdicts.items())),
+        }
+
+    report = {"overall": block(records), "by_strategy": {}, "by_endpoint": {}}
+    for key, index in (("by_strategy", 0), ("by_endpoint", 1)):
+        for value in sorted({r[index] for r in records}):
+            report[key][value] = block([r for r in records if r[index] == value])
+    return report
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in STRATEGIES:
+            raise argparse.ArgumentTypeError(f"unknown strategy {name!r} (choose from {', '.join(STRATEGIES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Synthetic login traffic for /predict")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--offline', action='store_true', help="drive app.py through the Flask test client")
+    parser.add_argument('--rps', type=float, default=50)
+    parser.add_argument('--duration', type=float, default=10, help="seconds")
+    parser.add_argument('--procs', type=int, default=1, help="client processes")
+    parser.add_argument('--threads', type=int, default=16, help="in-flight requests per process")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(
+        "human=0.6,linear=0.08,smart=0.08,suspicious=0.08,teleport=0.06,vampire=0.05,honeypot=0.05"))
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', default=None, help="also write the report here")
+    args = parser.parse_args()
+    args.ml_dir = os.path.dirname(os.path.abspath(__file__))
+    if args.offline:
+        args.procs = 1  # one app instance; threads give the concurrency
+
+    print(f"{'Offline' if args.offline else args.url} | target {args.rps:g} rps for {args.duration:g} s "
+          f"| {args.procs} procs x {args.threads} threads")
+    args.start_at = time.time() + (3.0 if args.offline or args.procs > 1 else 0.5)  # room to import / fork
+    if args.procs == 1:
+        records = run_worker(0, args)
+    else:
+        with ProcessPoolExecutor(args.procs) as pool:
+            records = [r for part in pool.map(run_worker, range(args.procs), [args] * args.procs) for r in part]
+    wall_s = max(time.time() - args.start_at, 1e-9)
+
+    report = summarize(records, wall_s)
+    report["config"] = {k: v for k, v in vars(args).items() if k not in ("ml_dir", "start_at")}
+
+    o = report["overall"]
+    print(f"Requests {o['requests']} | {o['throughput_rps']} rps | errors {o['error_rate'] * 100:.2f}% "
+          f"| p50 {o['p50_ms']} ms, p95 {o['p95_ms']} ms, p99 {o['p99_ms']} ms")
+    for name, b in report["by_strategy"].items():
+        print(f"  {name:11s} {b['requests']:>7} req | p50 {b['p50_ms']:>8} | p99 {b['p99_ms']:>8} ms | {b['verdicts']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.json}")
@@ -0,0 +1,191 @@
+"""
+LogWriter: write-behind queue for login_attempts.
+
+Request threads only put events on a bounded queue. One background thread
+owns a long-lived SQLite connection (WAL mode) and commits whatever is
+pending as a single transaction every `batch_size` rows or `flush_ms`
+milliseconds, whichever comes first.
+"""
+import time
+import queue
+import sqlite3
+import threading
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+class LogWriter:
+    def __init__(self, db_path, insert_sql, to_row, on_commit=None,
+                 batch_size=100, flush_ms=50, max_queue=10000,
+                 overflow="drop_oldest", block_timeout=0.05, max_retries=3, observe=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.db_path = db_path
+        self.insert_sql = insert_sql
+        self.to_row = to_row            # event dict -> tuple for insert_sql (runs on the writer thread)
+        self.on_commit = on_commit      # called with [(row_id, event), ...] after each commit
+        self.observe = observe          # called with ("encode" | "insert", seconds) per batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counters = {
+            "queued": 0,           # accepted onto the queue
+            "written": 0,          # committed to SQLite
+            "dropped_overflow": 0, # lost because the queue was full
+            "dropped_errors": 0,   # lost because the batch failed after all retries
+            "batches": 0,
+            "retries": 0,
+        }
+
+    # --- PRODUCER SIDE (request threads) ---
+    def submit(self, event):
+        """Queues one event. Returns False if the overflow policy dropped it."""
+        try:
+            if self.overflow == "block":
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            if self.overflow != "drop_oldest":
+                self._count("dropped_overflow")
+                return False
+            # Make room by discarding the oldest pending event
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._count("dropped_overflow")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self._count("dropped_overflow")
+                return False
+        self._count("queued")
+        return True
+
+    # --- CONSUMER SIDE (writer thread) ---
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                batch = self._next_batch()
+                if batch:
+                    self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def _next_batch(self):
+        """Blocks for the first event, then gathers more until size or time runs out."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                elif self._stop.is_set():
+                    batch.append(self._queue.get_nowait())  # shutting down: drain without waiting
+                else:
+                    break
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, conn, batch):
+        try:
+            self._commit(conn, batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _commit(self, conn, batch):
+        rows, events = [], []
+        start = time.perf_counter()
+        for event in batch:
+            try:
+                rows.append(self.to_row(event))
+                events.append(event)
+            except Exception as e:
+                print(f"❌ Log Row Error: {e}")
+                self._count("dropped_errors")
+        if not rows:
+            return
+        encoded = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with conn:  # one transaction for the whole batch
+                    row_ids = [conn.execute(self.insert_sql, row).lastrowid for row in rows]
+                break
+            except sqlite3.Error as e:
+                # Only lock/busy errors are worth retrying
+                if attempt == self.max_retries or not isinstance(e, sqlite3.OperationalError):
+                    print(f"❌ Database Error (batch of {len(rows)} dropped): {e}")
+                    self._count("dropped_errors", len(rows))
+                    return
+                self._count("retries")
+                time.sleep(0.05 * (2 ** attempt))
+
+        self._count("written", len(rows))
+        self._count("batches")
+        if self.observe:
+            self.observe("encode", encoded - start)
+            self.observe("insert", time.perf_counter() - encoded)
+        if self.on_commit:
+            try:
+                self.on_commit(list(zip(row_ids, events)))
+            except Exception as e:
+                print(f"⚠️ on_commit hook failed: {e}")
+
+    # --- LIFECYCLE ---
+    def flush(self, timeout=5.0):
+        """Waits until everything queued so far has been handled."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout=5.0):
+        """Stops the writer after draining the queue (registered with atexit)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._counters)
+        snapshot["pending"] = self._queue.qsize()
+        snapshot["capacity"] = self._queue.maxsize
+        snapshot["overflow_policy"] = self.overflow
+        return snapshot
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
@@ -0,0 +1,184 @@
+"""
+Metrics: counters and fixed-bucket histograms, served as Prometheus text.
+
+    metrics = Metrics(prefix="realones")
+    with metrics.stage("features"):
+        ...
+    metrics.count("attempts_total", verdict="BOT", trigger_source="ML_Model")
+    metrics.render()   # text/plain; version=0.0.4
+
+Every update is a dict lookup and an add under one lock, cheap enough for
+the request path. No client library needed.
+
+RequestProfiler runs cProfile on a sampled fraction of requests once it is
+switched on (POST /admin/profile). It keeps the top functions of the last
+few profiled requests. Only one request is profiled at a time.
+"""
+import io
+import time
+import random
+import pstats
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Seconds. Wide enough for a 0.1 ms forest call and a multi-second stalled commit
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _flatten(values, prefix=""):
+    """{"a": {"b": 1}} -> {"a_b": 1}, numbers only (component stats() nest a level or two)."""
+    flat = {}
+    for key, value in values.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    def __init__(self, prefix="realones", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}     # name -> {label pairs: value}
+        self._histograms = {}   # name -> {label pairs: [bucket counts..., +Inf count, sum]}
+        self._collectors = []   # callables returning {name: value} read at scrape time
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    # --- UPDATES (request threads, writer thread) ---
+    def count(self, name, n=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + n
+
+    def observe(self, name, seconds, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            cells = series.get(key)
+            if cells is None:
+                cells = series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    cells[i] += 1
+                    break
+            else:
+                cells[len(self.buckets)] += 1
+            cells[-1] += seconds
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """Times the block into the stage_seconds histogram, labelled stage=<name>."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=name, **labels)
+
+    def collect(self, fn, prefix=""):
+        """fn() -> dict, read on every scrape (a component's stats()); numeric values become gauges."""
+        self._collectors.append((fn, prefix))
+
+    # --- EXPOSITION ---
+    def render(self):
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: {k: list(c) for k, c in s.items()} for n, s in self._histograms.items()}
+        out = []
+        for name in sorted(counters):
+            full = f"{self.prefix}_{name}"
+            if name in self._help:
+                out.append(f"# HELP {full} {self._help[name]}")
+            out.append(f"# TYPE {full} counter")
+            for key, value in sorted(counters[name].items()):
+                out.append(f"{full}{_labels(key)} {value}")
+        for name in sorted(histograms):
+            full = f"{self.prefix}_{name}"
+            if name in self._help:
+                out.append(f"# HELP {full} {self._help[name]}")
+            out.append(f"# TYPE {full} histogram")
+            for key, cells in sorted(histograms[name].items()):
+                running = 0
+                for bound, n in zip(self.buckets, cells):
+                    running += n
+                    out.append(f"{full}_bucket{_labels(key + (('le', repr(bound)),))} {running}")
+                running += cells[len(self.buckets)]
+                out.append(f"{full}_bucket{_labels(key + (('le', '+Inf'),))} {running}")
+                out.append(f"{full}_sum{_labels(key)} {cells[-1]!r}")
+                out.append(f"{full}_count{_labels(key)} {running}")
+        for fn, prefix in self._collectors:
+            try:
+                values = _flatten(fn(), prefix)
+            except Exception as e:
+                out.append(f"# collector {prefix or fn} failed: {e}")
+                continue
+            for name, value in sorted(values.items()):
+                full = f"{self.prefix}_{name}"
+                out.append(f"# TYPE {full} gauge")
+                out.append(f"{full} {value}")
+        return "\n".join(out) + "\n"
+
+
+class RequestProfiler:
+    def __init__(self, keep=20, top=25):
+        self.sample_rate = 0.0
+        self.top = top
+        self._profiles = deque(maxlen=keep)
+        self._busy = threading.Lock()
+        self.profiled = 0
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def configure(self, sample_rate, keep=None):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be in [0, 1]")
+        self.sample_rate = sample_rate
+        if keep:
+            self._profiles = deque(self._profiles, maxlen=keep)
+
+    def maybe_start(self):
+        """Returns a running Profile for this request, or None (not sampled / another one running)."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile, endpoint, elapsed_s):
+        profile.disable()
+        self._busy.release()
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(self.top)
+        self._profiles.append({
+            "endpoint": endpoint,
+            "at": time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()),
+            "elapsed_ms": round(elapsed_s * 1000, 3),
+            "stats": text.getvalue(),
+        })
+        self.profiled += 1
+
+    def recent(self):
+        return list(self._profiles)
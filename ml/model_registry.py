@@ -0,0 +1,515 @@
+"""
+ModelRegistry: the model /predict scores with, swappable while serving.
+
+The active model is one immutable LoadedModel; a request reads the
+reference once and uses it to the end, so a swap never mixes two models
+inside one request. A new artifact is loaded, compiled and validated
+first (feature order, classes, sane probabilities on probe rows), and
+only then does the reference change. A failed load leaves the old model
+serving.
+
+Reloads come from POST /admin/model/reload or from the watcher thread,
+which reloads when the model file's mtime changes.
+
+With mmap on, the first load of a pickle also writes its compiled arrays
+next to it (model.pkl -> model.forest/, see CompiledForest.save). Later
+loads of the same file map those instead of unpickling: no scikit-learn
+import, and processes serving the same model share its pages.
+
+A model can carry a distilled first tier (model.pkl -> model.fast/, written
+by distill.py from that exact pickle): one shallow tree that scores first.
+Only rows it puts inside the escalation band go on to the forest, so the
+forest's work is spent where the verdict is actually in doubt. A small
+sample of the rows the tree settles is also scored by the forest, to keep
+measuring how often the two agree.
+
+ShadowScorer runs a candidate model on a sampled fraction of live
+traffic. Requests only drop (features, production verdict) on a bounded
+queue. A background thread scores the candidate and records agreement,
+probability drift and latency next to the production model's numbers.
+"""
+import os
+import json
+import time
+import queue
+import random
+import shutil
+import threading
+from collections import deque
+import numpy as np
+
+from compiled_forest import CompiledForest
+from features import FEATURE_NAMES
+
+# Rows every candidate must score to a probability in [0, 1]: all-zero (the short-path default),
+# a typical human and a typical scripted attempt
+PROBE_ROWS = np.array([
+    [0, 0, 1.0, 0, 0, 0],
+    [850.0, 0.45, 0.6, 20.0, 120.0, 230.0],
+    [120.0, 0.01, 1.0, 0.0, 2.0, 0.0],
+])
+
+# Where the frontend's verdict changes (VerdictPopup.jsx): score <= 30 HUMAN, <= 70 SUSPICIOUS, else BOT
+FRONTEND_BANDS = (0.3, 0.7)
+
+
+def frontend_band(probability):
+    """0 / 1 / 2: the HUMAN / SUSPICIOUS / BOT band the login page shows for this probability."""
+    return int(probability > FRONTEND_BANDS[0]) + int(probability > FRONTEND_BANDS[1])
+
+
+class LatencyWindow:
+    """The last `size` latencies (ms), for p50 / p99 in stats()."""
+
+    def __init__(self, size=1024):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, ms):
+        with self._lock:
+            self._samples.append(ms)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=np.float64, count=len(self._samples))
+            count = self.count
+        if not len(samples):
+            return {"count": count, "p50_ms": None, "p99_ms": None}
+        return {"count": count,
+                "p50_ms": round(float(np.percentile(samples, 50)), 4),
+                "p99_ms": round(float(np.percentile(samples, 99)), 4)}
+
+
+class FastTier:
+    """The distilled tree in front of a forest. predict_proba_one walks it in plain Python."""
+
+    def __init__(self, engine, meta):
+        if engine.n_trees != 1:
+            raise ValueError(f"a fast tier is one tree, got {engine.n_trees}")
+        self.engine = engine
+        self.meta = meta
+        # One row through one shallow tree: list indexing beats any NumPy call overhead
+        self._feature = engine.feature.tolist()
+        self._threshold = engine.threshold.tolist()
+        self._children = engine.children.tolist()
+        self._value = engine.leaf_value.tolist()
+        self._root = int(engine.roots[0])
+
+    def predict_proba_one(self, features):
+        # Same float32 rounding of the inputs as the forest (see CompiledForest.predict_proba)
+        row = np.asarray(features, dtype=np.float32).tolist()
+        feature, threshold, children = self._feature, self._threshold, self._children
+        node = self._root
+        for _ in range(self.engine.depth):
+            node = children[2 * node + (row[feature[node]] <= threshold[node])]
+        return self._value[node]
+
+    def predict_proba(self, X):
+        return self.engine.predict_proba(X)
+
+
+class LoadedModel:
+    __slots__ = ("engine", "path", "version", "mtime", "loaded_at", "metadata", "fast")
+
+    def __init__(self, engine, path, version, mtime, metadata, fast=None):
+        self.engine = engine
+        self.path = path
+        self.version = version
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.metadata = metadata
+        self.fast = fast          # FastTier or None (every row goes to the forest)
+
+    def describe(self):
+        return {"path": self.path, "version": self.version,
+                "loaded_at": time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.loaded_at)),
+                "fast_tier": self.fast.meta.get("report") if self.fast else None}
+
+
+def compiled_path(path):
+    """Where the mapped copy of a pickled model lives: model.pkl -> model.forest/"""
+    return os.path.splitext(path)[0] + ".forest"
+
+
+def _source_stamp(path):
+    """Identifies the pickle a compiled copy was made from."""
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def open_compiled(path):
+    """The mapped CompiledForest for `path` if one exists and was made from this exact file, else None."""
+    directory = compiled_path(path)
+    if not os.path.isdir(directory):
+        return None
+    try:
+        engine, meta = CompiledForest.open(directory, mmap=True)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Ignoring unreadable {directory}: {e}")
+        return None
+    return engine if meta.get("source") == _source_stamp(path) else None
+
+
+def save_compiled(engine, path):
+    """Writes the arrays for `path` (best effort) and returns them mapped, or None if that failed."""
+    directory = compiled_path(path)
+    staging = f"{directory}.tmp-{os.getpid()}"
+    try:
+        engine.save(staging, meta={"source": _source_stamp(path)})
+        if os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+        return CompiledForest.open(directory, mmap=True)[0]
+    except OSError as e:
+        # Read-only model directory, or another process got there first: serve from memory
+        shutil.rmtree(staging, ignore_errors=True)
+        print(f"⚠️ Could not write {directory}: {e}")
+        return None
+
+
+def fast_path(path):
+    """Where the distilled tier of a pickled model lives: model.pkl -> model.fast/"""
+    return os.path.splitext(path)[0] + ".fast"
+
+
+def save_fast(engine, path, meta=None):
+    """Writes a distilled tree (distill.py) as the fast tier of the pickle at `path`."""
+    engine.save(fast_path(path), meta=dict(meta or {}, source=_source_stamp(path)))
+
+
+def open_fast(path, mmap=True):
+    """The FastTier distilled from this exact file, or None (no tier, unreadable, or made from another file)."""
+    directory = fast_path(path)
+    if not os.path.isdir(directory):
+        return None
+    try:
+        engine, meta = CompiledForest.open(directory, mmap=mmap)
+        fast = FastTier(engine, meta)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Ignoring unreadable {directory}: {e}")
+        return None
+    if meta.get("source") != _source_stamp(path):
+        print(f"⚠️ Ignoring {directory}: distilled from a different {os.path.basename(path)} (re-run distill.py)")
+        return None
+    return fast
+
+
+def load_model(path, mmap=False):
+    """Loads, compiles and validates an artifact. Raises ValueError if it can't serve."""
+    mtime = os.path.getmtime(path)
+    sidecar = os.path.splitext(path)[0] + ".json"
+    metadata = {}
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            metadata = json.load(f)
+
+    engine = open_compiled(path) if mmap else None
+    if engine is None:
+        import joblib  # unpickling imports scikit-learn: the slow part of a cold start
+        model = joblib.load(path)
+        if not hasattr(model, "estimators_"):
+            raise ValueError(f"{path} is not a fitted forest ({type(model).__name__})")
+        engine = CompiledForest.from_sklearn(model)
+        if mmap:
+            engine = save_compiled(engine, path) or engine
+
+    names = engine.feature_names
+    if names is not None and list(names) != FEATURE_NAMES:
+        raise ValueError(f"feature order {list(names)} does not match {FEATURE_NAMES}")
+    if metadata.get("feature_names", FEATURE_NAMES) != FEATURE_NAMES:
+        raise ValueError(f"sidecar feature order {metadata['feature_names']} does not match {FEATURE_NAMES}")
+    if [int(c) for c in engine.classes] != [0, 1]:
+        raise ValueError(f"expected classes [0, 1], got {list(engine.classes)}")
+
+    _, probabilities = engine.predict(PROBE_ROWS)
+    if not np.all(np.isfinite(probabilities)) or probabilities.min() < 0 or probabilities.max() > 1:
+        raise ValueError(f"probe rows scored out of range: {probabilities}")
+
+    fast = open_fast(path, mmap=mmap)
+    if fast is not None:
+        fast_probabilities = fast.predict_proba(PROBE_ROWS)
+        if not np.all(np.isfinite(fast_probabilities)) or fast_probabilities.min() < 0 or fast_probabilities.max() > 1:
+            print(f"⚠️ Ignoring {fast_path(path)}: probe rows scored out of range")
+            fast = None
+
+    version = metadata.get("version") or f"{os.path.basename(path)}@{int(mtime)}"
+    return LoadedModel(engine, path, version, mtime, metadata, fast)
+
+
+class TierStats:
+    """How the fast tier and the forest split the work; audits compare both on a sample of fast verdicts."""
+
+    def __init__(self, band, audit_rate):
+        low, high = band
+        if not 0 <= low <= high <= 1:
+            raise ValueError(f"escalation band must satisfy 0 <= low <= high <= 1, got {band}")
+        if not 0 <= audit_rate <= 1:
+            raise ValueError("audit_rate must be in [0, 1]")
+        self.band = (low, high)
+        self.audit_rate = audit_rate
+        self._lock = threading.Lock()
+        self._counters = {"fast": 0, "escalated": 0, "audited": 0, "audit_agree": 0, "audit_band_agree": 0}
+        self.fast_latency = LatencyWindow()
+        self.forest_latency = LatencyWindow()
+
+    def count(self, fast=0, escalated=0):
+        with self._lock:
+            self._counters["fast"] += fast
+            self._counters["escalated"] += escalated
+
+    def audit(self, fast_probability, forest_probability):
+        with self._lock:
+            self._counters["audited"] += 1
+            self._counters["audit_agree"] += (fast_probability > 0.5) == (forest_probability > 0.5)
+            self._counters["audit_band_agree"] += frontend_band(fast_probability) == frontend_band(forest_probability)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        scored = counters["fast"] + counters["escalated"]
+        audited = counters["audited"]
+        fast_ms = self.fast_latency.summary()
+        forest_ms = self.forest_latency.summary()
+        saved = None
+        if fast_ms["p50_ms"] is not None and forest_ms["p50_ms"] is not None:
+            # Forest time the fast verdicts didn't spend, at median latencies
+            saved = round(counters["fast"] * (forest_ms["p50_ms"] - fast_ms["p50_ms"]), 3)
+        return dict(
+            counters,
+            band=list(self.band),
+            audit_rate=self.audit_rate,
+            escalation_rate=round(counters["escalated"] / scored, 4) if scored else None,
+            audit_agreement=round(counters["audit_agree"] / audited, 4) if audited else None,
+            audit_band_agreement=round(counters["audit_band_agree"] / audited, 4) if audited else None,
+            fast_latency=fast_ms,
+            forest_latency=forest_ms,
+            forest_ms_saved=saved,
+        )
+
+
+class ShadowScorer:
+    def __init__(self, candidate, sample_rate, max_queue=1000):
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._latency = LatencyWindow()
+        self._counters = {"sampled": 0, "dropped": 0, "scored": 0, "agree": 0,
+                          "prod_bot_shadow_human": 0, "prod_human_shadow_bot": 0, "errors": 0}
+        self._abs_prob_delta = 0.0
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    def offer(self, features, label, probability):
+        """Called on the request path: a coin flip and a put_nowait, nothing else."""
+        if random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((features, label, probability))
+            with self._lock:
+                self._counters["sampled"] += 1
+        except queue.Full:
+            with self._lock:
+                self._counters["dropped"] += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                features, label, probability = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                start = time.perf_counter()
+                shadow_label, shadow_probability = self.candidate.engine.predict_one(features)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                print(f"⚠️ Shadow model error: {e}")
+                with self._lock:
+                    self._counters["errors"] += 1
+                continue
+            with self._lock:
+                self._latency.add(elapsed_ms)
+                self._counters["scored"] += 1
+                self._abs_prob_delta += abs(shadow_probability - probability)
+                if shadow_label == label:
+                    self._counters["agree"] += 1
+                elif label == 1:
+                    self._counters["prod_bot_shadow_human"] += 1
+                else:
+                    self._counters["prod_human_shadow_bot"] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def stats(self):
+        with self._lock:
+            scored = self._counters["scored"]
+            return dict(
+                self._counters,
+                model=self.candidate.describe(),
+                sample_rate=self.sample_rate,
+                pending=self._queue.qsize(),
+                agreement_rate=round(self._counters["agree"] / scored, 4) if scored else None,
+                mean_abs_prob_delta=round(self._abs_prob_delta / scored, 4) if scored else None,
+                latency=self._latency.summary(),
+            )
+
+
+class ModelRegistry:
+    def __init__(self, path, watch_s=0, shadow_queue=1000, mmap=False, band=(0.2, 0.8), audit_rate=0.01):
+        self.path = path
+        self.watch_s = watch_s
+        self.shadow_queue = shadow_queue
+        self.mmap = mmap
+        self.active = None        # LoadedModel; replaced whole, never mutated
+        self.shadow = None        # ShadowScorer or None
+        self._lock = threading.Lock()   # serializes reloads / shadow changes, never taken by scoring
+        self._latency = LatencyWindow()
+        self.tiers = TierStats(band, audit_rate)
+        self._counters = {"reloads": 0, "failed_reloads": 0}
+        self._last_error = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    # --- SCORING (request threads) ---
+    def predict_one(self, features, shadow=True):
+        """(label, probability) from the active model; optionally mirrored to the shadow."""
+        current = self.active
+        if current is None:
+            raise RuntimeError("No model loaded")
+        start = time.perf_counter()
+        label, probability = self._tiered_one(current, features)
+        self._latency.add((time.perf_counter() - start) * 1000)
+        scorer = self.shadow
+        if shadow and scorer is not None:
+            scorer.offer(features, label, probability)
+        return label, probability
+
+    def _tiered_one(self, current, features):
+        """The fast tier's verdict unless it lands in the escalation band, then the forest's."""
+        tiers = self.tiers
+        if current.fast is not None:
+            start = time.perf_counter()
+            probability = current.fast.predict_proba_one(features)
+            tiers.fast_latency.add((time.perf_counter() - start) * 1000)
+            low, high = tiers.band
+            if not low <= probability <= high:
+                tiers.count(fast=1)
+                if tiers.audit_rate and random.random() < tiers.audit_rate:
+                    start = time.perf_counter()
+                    _, forest_probability = current.engine.predict_one(features)
+                    tiers.forest_latency.add((time.perf_counter() - start) * 1000)
+                    tiers.audit(probability, forest_probability)
+                # Same rule as CompiledForest.predict: ties go to classes[0]
+                return current.engine.classes[int(probability > 1 - probability)], probability
+            tiers.count(escalated=1)
+        start = time.perf_counter()
+        label, probability = current.engine.predict_one(features)
+        tiers.forest_latency.add((time.perf_counter() - start) * 1000)
+        return label, probability
+
+    def predict(self, X):
+        """(labels, probabilities) for a batch: fast tier on every row, the forest on the band only."""
+        current = self.active
+        if current is None:
+            raise RuntimeError("No model loaded")
+        if current.fast is None:
+            return current.engine.predict(X)
+        X = np.asarray(X, dtype=np.float64)
+        probability = current.fast.predict_proba(X)
+        low, high = self.tiers.band
+        escalate = (probability >= low) & (probability <= high)
+        n_escalated = int(escalate.sum())
+        if n_escalated:
+            probability[escalate] = current.engine.predict_proba(X[escalate])
+        self.tiers.count(fast=len(X) - n_escalated, escalated=n_escalated)
+        labels = current.engine.classes[(probability > 1 - probability).astype(int)]
+        return labels, probability
+
+    # --- SWAPS (admin endpoint / watcher) ---
+    def reload(self, path=None):
+        """Loads `path` (default: the configured model path) and makes it active if it validates."""
+        path = path or self.path
+        with self._lock:
+            try:
+                loaded = load_model(path, mmap=self.mmap)
+            except Exception as e:
+                self._counters["failed_reloads"] += 1
+                self._last_error = f"{path}: {e}"
+                raise
+            self.active = loaded
+            self._counters["reloads"] += 1
+            self._last_error = None
+            return loaded
+
+    def start_shadow(self, path, sample_rate):
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        candidate = load_model(path, mmap=self.mmap)
+        with self._lock:
+            previous, self.shadow = self.shadow, ShadowScorer(candidate, sample_rate, self.shadow_queue)
+        if previous is not None:
+            previous.stop()
+        return candidate
+
+    def stop_shadow(self):
+        with self._lock:
+            previous, self.shadow = self.shadow, None
+        if previous is not None:
+            previous.stop()
+        return previous
+
+    def promote_shadow(self):
+        """Makes the shadow candidate the active model (already validated when it was loaded)."""
+        with self._lock:
+            scorer, self.shadow = self.shadow, None
+            if scorer is None:
+                return None
+            self.active = scorer.candidate
+            self._counters["reloads"] += 1
+        scorer.stop()
+        return scorer.candidate
+
+    # --- FILE WATCHER ---
+    def start(self):
+        if self.watch_s > 0 and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher.start()
+        return self
+
+    def _watch(self):
+        seen_mtime = self.active.mtime if self.active is not None else None
+        while not self._stop.wait(self.watch_s):
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                continue
+            if mtime == seen_mtime:
+                continue
+            # Whatever happens, don't retry this same file version; a finished copy bumps mtime again
+            seen_mtime = mtime
+            try:
+                loaded = self.reload()
+                print(f"✅ Model reloaded: {loaded.version}")
+            except Exception as e:
+                print(f"⚠️ Model reload failed, still serving {self.active.version if self.active else 'nothing'}: {e}")
+
+    def close(self):
+        self._stop.set()
+        self.stop_shadow()
+
+    def stats(self):
+        current = self.active
+        scorer = self.shadow
+        return dict(
+            self._counters,
+            active=current.describe() if current else None,
+            last_error=self._last_error,
+            latency=self._latency.summary(),
+            tiers=self.tiers.stats(),
+            shadow=scorer.stats() if scorer else None,
+        )
@@ -0,0 +1,175 @@
+"""
+LoadGovernor: admission control and degraded mode for the scoring routes.
+
+    ticket = governor.admit(started)    # None -> shed: answer 503 + Retry-After
+    ...                                 # ticket.mode: "full" or "degraded"
+    governor.release(ticket)
+
+Per process, three mechanisms:
+
+  * a concurrency limit. At most max_inflight scoring requests run at once.
+    A request over the limit waits up to queue_ms for a slot and is then
+    shed. A fast 503 beats a login that times out in the browser.
+  * a latency budget per request (budget_ms from when it arrived). A
+    request that has used its budget before the expensive part
+    (check_budget) is scored the degraded way.
+  * degraded mode. It switches on when inflight reaches degrade_inflight
+    or the moving average of request time goes over budget_ms. It switches
+    off once both are back under half of those, and not before hold_s.
+    While it is on, requests are scored by heuristic_probability on
+    movement_time and path_efficiency (features.quick_features, no
+    forest) and are logged without their raw path.
+
+Run `python overload.py` to see how the heuristic compares with the labels
+in training_data.csv and what it costs next to the full scoring.
+"""
+import time
+import argparse
+import threading
+
+# Degraded-mode heuristic. training_data.csv: human movement_time 1st percentile ~610 ms, scripted
+# 99th ~780 ms and median ~120 ms; scripted paths sit at path_efficiency ~1.0, human median ~0.78
+FAST_MOVEMENT_MS = 500
+STRAIGHT_EFFICIENCY = 0.98
+
+# Moving average weight of the newest request time
+EWMA_ALPHA = 0.1
+
+
+def heuristic_probability(movement_time, path_efficiency):
+    """P(bot)-like score from two features: both scripted-looking -> 0.95, one -> 0.5 (CAPTCHA), neither -> 0.1."""
+    signals = int(movement_time < FAST_MOVEMENT_MS) + int(path_efficiency > STRAIGHT_EFFICIENCY)
+    return (0.1, 0.5, 0.95)[signals]
+
+
+class Ticket:
+    __slots__ = ("mode", "deadline", "started")
+
+    def __init__(self, mode, started, budget_s):
+        self.mode = mode
+        self.started = started
+        self.deadline = started + budget_s
+
+    @property
+    def degraded(self):
+        return self.mode == "degraded"
+
+    def over_budget(self):
+        return time.perf_counter() > self.deadline
+
+
+class LoadGovernor:
+    def __init__(self, max_inflight=64, queue_ms=50, budget_ms=250, degrade_inflight=48, hold_s=5.0):
+        if max_inflight < 1:
+            raise ValueError("max_inflight must be at least 1")
+        self.max_inflight = max_inflight
+        self.queue_s = queue_ms / 1000
+        self.budget_s = budget_ms / 1000
+        self.degrade_inflight = min(degrade_inflight, max_inflight)
+        self.hold_s = hold_s
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._ewma_s = 0.0
+        self._degraded_since = None   # monotonic time degraded mode last switched on, None while off
+        self._counters = {"admitted": 0, "shed": 0, "scored_full": 0, "scored_degraded": 0, "over_budget": 0,
+                          "degraded_entered": 0, "degraded_left": 0}
+
+    # --- REQUEST PATH ---
+    def admit(self, started=None):
+        """A Ticket, or None if no slot freed up within queue_ms (shed the request)."""
+        started = time.perf_counter() if started is None else started
+        if not self._slots.acquire(timeout=self.queue_s):
+            with self._lock:
+                self._counters["shed"] += 1
+            return None
+        with self._lock:
+            self._inflight += 1
+            self._counters["admitted"] += 1
+            self._update_mode()
+            mode = "degraded" if self._degraded_since is not None else "full"
+        return Ticket(mode, started, self.budget_s)
+
+    def check_budget(self, ticket):
+        """True if the request is to be scored the degraded way: degraded already, or out of budget (it is now)."""
+        if ticket.degraded or not ticket.over_budget():
+            return ticket.degraded
+        ticket.mode = "degraded"
+        with self._lock:
+            self._counters["over_budget"] += 1
+        return True
+
+    def release(self, ticket):
+        elapsed = time.perf_counter() - ticket.started
+        with self._lock:
+            self._inflight -= 1
+            self._counters["scored_" + ticket.mode] += 1
+            self._ewma_s += EWMA_ALPHA * (elapsed - self._ewma_s)
+            self._update_mode()
+        self._slots.release()
+
+    def _update_mode(self):
+        """Switches degraded mode on or off (caller holds the lock)."""
+        now = time.monotonic()
+        if self._degraded_since is None:
+            if self._inflight >= self.degrade_inflight or self._ewma_s > self.budget_s:
+                self._degraded_since = now
+                self._counters["degraded_entered"] += 1
+                print(f"⚠️ Overloaded ({self._inflight} in flight, {self._ewma_s * 1000:.0f} ms average): degraded scoring on")
+        elif (now - self._degraded_since >= self.hold_s
+              and self._inflight < self.degrade_inflight / 2 and self._ewma_s < self.budget_s / 2):
+            self._degraded_since = None
+            self._counters["degraded_left"] += 1
+            print("✅ Load back to normal: degraded scoring off")
+
+    def stats(self):
+        with self._lock:
+            degraded_s = time.monotonic() - self._degraded_since if self._degraded_since is not None else 0.0
+            return dict(
+                self._counters,
+                inflight=self._inflight,
+                max_inflight=self.max_inflight,
+                degrade_inflight=self.degrade_inflight,
+                budget_ms=round(self.budget_s * 1000, 1),
+                latency_ewma_ms=round(self._ewma_s * 1000, 3),
+                degraded=int(self._degraded_since is not None),
+                degraded_for_s=round(degraded_s, 1),
+            )
+
+
+# --- HEURISTIC CHECK: AGREEMENT AND COST VS THE FULL SCORING ---
+def _per_call_us(fn, rows):
+    start = time.perf_counter()
+    for row in rows:
+        fn(row)
+    return (time.perf_counter() - start) / len(rows) * 1e6
+
+
+if __name__ == '__main__':
+    import numpy as np
+    from features import extract_features, quick_features
+    from train import load_csv
+
+    parser = argparse.ArgumentParser(description="Compare the degraded-mode heuristic with the labels")
+    parser.add_argument('--data', default='training_data.csv')
+    parser.add_argument('--model', default='model.pkl')
+    args = parser.parse_args()
+
+    X, y = load_csv(args.data)
+    p = np.array([heuristic_probability(row[0], row[2]) for row in X])
+    human, bot = y == 0, y == 1
+    print(f"Rows: {len(y)} | humans sent to CAPTCHA or blocked: {(p[human] > 0.3).mean():.2%} "
+          f"(blocked {(p[human] > 0.7).mean():.2%}) | bots let through: {(p[bot] <= 0.3).mean():.2%} "
+          f"(blocked {(p[bot] > 0.7).mean():.2%})")
+
+    from compiled_forest import CompiledForest
+    from wire import _browser_payload
+    engine = CompiledForest.load(args.model)
+    rng = np.random.default_rng(7)
+    payloads = [_browser_payload(200, rng) for _ in range(200)]
+    for payload in payloads:
+        payload["mouse_path"] = np.array(payload["mouse_path"], dtype=np.float64)   # as normalize_payload leaves it
+    full_us = _per_call_us(lambda d: engine.predict_one(extract_features(d)), payloads)
+    quick_us = _per_call_us(lambda d: heuristic_probability(*quick_features(d)), payloads)
+    print(f"200-point path: features + forest {full_us:.1f} us | quick features + heuristic {quick_us:.1f} us "
+          f"({full_us / quick_us:.1f}x)")
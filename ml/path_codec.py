@@ -0,0 +1,221 @@
+"""
+Compact storage for login_attempts.mouse_path.
+
+A path of [x, y, epoch_ms] triples is stored as a BLOB:
+
+    header  '<2sBBIbbqqq'  magic b'MP', version, flags, n_points,
+                           xy / t decimal scale (10^k), first x, y, t (scaled ints)
+    body    int32 deltas, column-major: dx[n-1], dy[n-1], dt[n-1]
+            (zlib-compressed when flags & FLAG_ZLIB)
+
+Browser coordinates and Date.now() are integers, so the scale is 10^0 and
+the round trip is exact. Fractional inputs (scripted bots) keep up to
+MAX_DECIMALS decimals. Paths that don't fit (deltas overflow int32, odd
+shapes) stay JSON. load_path reads both forms, so JSON rows keep working
+during and after the migration.
+
+    python path_codec.py --migrate [database.db] [--vacuum]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import sqlite3
+import argparse
+import numpy as np
+
+MAGIC = b'MP'
+VERSION = 1
+FLAG_ZLIB = 0x01
+HEADER = struct.Struct('<2sBBIbbqqq')
+MAX_DECIMALS = 3
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def _decimals_needed(values):
+    """Smallest k <= MAX_DECIMALS such that values * 10^k are (near) integers."""
+    for k in range(MAX_DECIMALS + 1):
+        scaled = values * 10 ** k
+        if np.all(np.abs(scaled - np.round(scaled)) < 1e-6):
+            return k
+    return MAX_DECIMALS
+
+
+def encode_path(path, compress=True):
+    """Packs an (n, 3) path into bytes. Returns None if it can't be packed losslessly enough."""
+    try:
+        arr = np.asarray(path, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if arr.size == 0:
+        return HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0, 0, 0, 0)
+    if arr.ndim != 2 or arr.shape[1] != 3 or not np.all(np.isfinite(arr)):
+        return None
+
+    xy_k = _decimals_needed(arr[:, :2])
+    t_k = _decimals_needed(arr[:, 2])
+    scaled = np.empty(arr.shape, dtype=np.int64)
+    scaled[:, :2] = np.round(arr[:, :2] * 10 ** xy_k)
+    scaled[:, 2] = np.round(arr[:, 2] * 10 ** t_k)
+
+    deltas = np.diff(scaled, axis=0)
+    if deltas.size and np.abs(deltas).max() > INT32_MAX:
+        return None
+
+    body = np.ascontiguousarray(deltas.T, dtype='<i4').tobytes()
+    flags = 0
+    if compress and body:
+        packed = zlib.compress(body, 6)
+        if len(packed) < len(body):
+            body, flags = packed, FLAG_ZLIB
+
+    x0, y0, t0 = (int(v) for v in scaled[0])
+    return HEADER.pack(MAGIC, VERSION, flags, len(arr), xy_k, t_k, x0, y0, t0) + body
+
+
+def is_encoded(value):
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:2]) == MAGIC
+
+
+def decode_path(blob):
+    """Unpacks bytes from encode_path into an (n, 3) float64 array."""
+    magic, version, flags, n, xy_k, t_k, x0, y0, t0 = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a packed mouse path (magic={magic!r}, version={version})")
+    out = np.empty((n, 3), dtype=np.float64)
+    if n == 0:
+        return out
+
+    body = memoryview(blob)[HEADER.size:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    deltas = np.frombuffer(body, dtype='<i4').reshape(3, n - 1)
+
+    scaled = np.empty((n, 3), dtype=np.int64)
+    scaled[0] = (x0, y0, t0)
+    np.cumsum(deltas.T, axis=0, dtype=np.int64, out=scaled[1:])
+    scaled[1:] += scaled[0]
+
+    out[:, :2] = scaled[:, :2] / 10 ** xy_k
+    out[:, 2] = scaled[:, 2] / 10 ** t_k
+    return out
+
+
+def load_path(value):
+    """
+    Reads a stored mouse_path (packed BLOB, legacy JSON text or NULL) as an (n, 3) array.
+    ValueError if it can't be read or isn't [x, y, t] triples (cut-off JSON, [x, y] rows).
+    """
+    if value is None:
+        return np.empty((0, 3))
+    try:
+        if is_encoded(value):
+            return decode_path(bytes(value))
+        arr = np.asarray(json.loads(value), dtype=np.float64)
+    except (TypeError, struct.error, zlib.error) as e:
+        raise ValueError(f"unreadable mouse_path: {e}") from e
+    if not arr.size:
+        return np.empty((0, 3))
+    if arr.ndim != 2 or arr.shape[1] != 3:
+        raise ValueError(f"mouse_path of shape {arr.shape} is not [x, y, t] triples")
+    return arr
+
+
+def _plain(value):
+    """json.dumps fallback for NumPy arrays and scalars (binary bodies keep paths as arrays)."""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def store_path(path, compress=True):
+    """Value to write into mouse_path: packed BLOB, or JSON text if the path can't be packed (e.g. NaN points)."""
+    packed = encode_path(path, compress)
+    return packed if packed is not None else json.dumps(path, default=_plain)
+
+
+# --- MIGRATION: JSON TEXT ROWS -> PACKED BLOBS ---
+def migrate(db_path, chunk=1000, vacuum=False):
+    size_before = os.path.getsize(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA busy_timeout=5000")
+
+    last_id = 0
+    converted = skipped = 0
+    json_bytes = blob_bytes = 0
+    json_read_s = blob_read_s = 0.0
+    while True:
+        rows = conn.execute('''
+            SELECT id, mouse_path FROM login_attempts
+            WHERE id > ? AND typeof(mouse_path) = 'text'
+            ORDER BY id LIMIT ?
+        ''', (last_id, chunk)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, text in rows:
+            last_id = row_id
+            # Time the replay read path both ways while we have both forms
+            start = time.perf_counter()
+            try:
+                path = np.asarray(json.loads(text), dtype=np.float64)
+            except (TypeError, ValueError):
+                # Malformed or ragged JSON: leave the row as it is
+                skipped += 1
+                continue
+            json_read_s += time.perf_counter() - start
+
+            packed = encode_path(path)
+            if packed is None:
+                skipped += 1
+                continue
+            start = time.perf_counter()
+            decode_path(packed)
+            blob_read_s += time.perf_counter() - start
+
+            json_bytes += len(text.encode())
+            blob_bytes += len(packed)
+            updates.append((packed, row_id))
+        with conn:
+            conn.executemany("UPDATE login_attempts SET mouse_path = ? WHERE id = ?", updates)
+        converted += len(updates)
+
+    if vacuum:
+        conn.execute("VACUUM")
+    conn.close()
+
+    return {
+        "converted": converted,
+        "skipped": skipped,
+        "path_bytes_json": json_bytes,
+        "path_bytes_packed": blob_bytes,
+        "db_bytes_before": size_before,
+        "db_bytes_after": os.path.getsize(db_path),
+        "read_ms_json": json_read_s * 1000,
+        "read_ms_packed": blob_read_s * 1000,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pack JSON mouse paths into compact BLOBs")
+    parser.add_argument('db', nargs='?', default='database.db')
+    parser.add_argument('--migrate', action='store_true', help="convert JSON rows in place")
+    parser.add_argument('--vacuum', action='store_true', help="VACUUM afterwards so the file shrinks")
+    parser.add_argument('--chunk', type=int, default=1000)
+    args = parser.parse_args()
+
+    if not args.migrate:
+        parser.print_help()
+        sys.exit(1)
+
+    report = migrate(args.db, args.chunk, args.vacuum)
+    print(f"✅ Packed {report['converted']} paths ({report['skipped']} left as JSON)")
+    if report['converted']:
+        print(f"   Path bytes : {report['path_bytes_json']:,} JSON -> {report['path_bytes_packed']:,} packed "
+              f"({report['path_bytes_json'] / max(report['path_bytes_packed'], 1):.1f}x smaller)")
+        print(f"   Read time  : {report['read_ms_json']:.1f} ms JSON -> {report['read_ms_packed']:.1f} ms packed "
+              f"({report['read_ms_json'] / max(report['read_ms_packed'], 1e-9):.1f}x faster)")
+    print(f"   DB file    : {report['db_bytes_before']:,} -> {report['db_bytes_after']:,} bytes"
+          + ("" if args.vacuum else " (run with --vacuum to release freed pages)"))
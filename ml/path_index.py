@@ -0,0 +1,567 @@
+"""
+PathIndex: near-duplicate lookup over every scored trajectory.
+
+Replay bots post a recorded human path again with a little jitter
+(bot_smart.py: the same base curve plus +-2 px of noise). The exact
+fingerprint in replay_cache.py misses those, and each copy looks human to
+extract_features. Here every path becomes a fixed-length signature:
+
+    path_signature()   the position at SIGNATURE_POINTS equal fractions of
+                       the movement time, shifted to start at 0 and divided
+                       by the bounding-box diagonal -> float32[DIMS]
+
+Sampling by time, not by distance along the path, matters: per-point
+jitter adds a zig-zag to the path length and shifts every arc-length
+sample, while the timing of a replay stays the same. Dividing by the
+box diagonal makes the signature independent of where on the page and at
+what size the recording is replayed.
+
+Copies of one recording land within `radius` of each other; paths of two
+different people do not. The lookup is p-stable LSH (E2LSH): `tables`
+hash tables, each keyed by `bits` quantized random projections. A copy
+lands in the original's bucket in at least one table with high
+probability, and only the rows in those buckets are compared exactly. So
+a lookup costs what the buckets hold, not what the index holds.
+
+All tables share one sorted int64 key array (a per-table salt is folded
+into each key) searched with np.searchsorted. New rows first go into a
+dict and are merged into the sorted arrays once they reach a quarter of
+them. Merges are geometric, so an insert costs O(log n) amortized, and
+lookups keep running on the old arrays while one is in progress. After
+start() they run on a thread of their own, so add() (called from the log
+writer thread) never waits for a sort; without it add() merges inline.
+
+On disk (the index directory) there is meta.json (the signature layout)
+and entries.bin: (attempt id, signature) records, appended under a lock on
+entries.lock (where fcntl exists) so several worker processes can share
+one file. The hash tables are rebuilt from entries.bin by open(). Each
+process remembers how far into entries.bin it has read; with several
+workers the merge thread reads what the others appended every tail_s.
+
+compact() rewrites entries.bin without the ids it is given (retention
+calls it with the attempts it moved out of database.db) and down to the
+newest max_entries, then rebuilds the tables from what is left. A worker
+that finds entries.bin replaced on its next read reloads it the same way.
+Rows cost ~450 B in memory each (signature, id, one key and row per
+table) and 192 B on disk; past max_entries by a quarter, the index
+compacts itself.
+
+    python path_index.py --bench --sizes 1000,10000,100000      # lookup latency and recall as it grows
+    python path_index.py --build database.db --dir path_index   # index the paths already stored
+    python path_index.py --stats --dir path_index
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl   # entries.bin appends from several serve.py workers
+except ImportError:
+    fcntl = None
+
+from model_registry import LatencyWindow
+
+SIGNATURE_POINTS = 24
+DIMS = 2 * (SIGNATURE_POINTS - 1)   # the first point is always (0, 0)
+# Paths with fewer points or a smaller extent than this are too plain to tell two people apart
+MIN_POINTS = 20
+MIN_EXTENT_PX = 40.0
+
+ENTRY = np.dtype([("id", "<i8"), ("signature", "<f4", (DIMS,))])
+MERGE_MIN_ROWS = 1024
+# Grown this far past max_entries, the index compacts itself back down to it
+COMPACT_SLACK = 1.25
+# A bucket that big is one shape submitted over and over; comparing against part of it is enough
+MAX_CANDIDATES = 4096
+
+
+def path_signature(path):
+    """float32[DIMS] for an (n, 3) path, or None if it is too short to be distinctive."""
+    arr = np.asarray(path, dtype=np.float64)
+    if arr.ndim != 2 or len(arr) < MIN_POINTS:
+        return None
+    xy, t = arr[:, :2], arr[:, 2]
+    extent = float(np.hypot(*(xy.max(axis=0) - xy.min(axis=0))))
+    duration = t[-1] - t[0]
+    if extent < MIN_EXTENT_PX or duration <= 0:
+        return None
+    at = t[0] + np.linspace(0.0, duration, SIGNATURE_POINTS)[1:]
+    return np.concatenate([
+        (np.interp(at, t, xy[:, 0]) - xy[0, 0]) / extent,
+        (np.interp(at, t, xy[:, 1]) - xy[0, 1]) / extent,
+    ]).astype(np.float32)
+
+
+class PathIndex:
+    def __init__(self, directory=None, radius=0.08, tables=16, bits=6, width=None, seed=7, max_entries=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.radius = radius
+        self.tables = tables
+        self.bits = bits
+        self.width = width or 4 * radius
+        rng = np.random.default_rng(seed)
+        self._projection = rng.standard_normal((DIMS, tables * bits)).astype(np.float32)
+        self._offset = rng.uniform(0, self.width, tables * bits).astype(np.float32)
+        self._mix = rng.integers(1, 2 ** 62, bits, dtype=np.int64) | 1
+        self._salt = rng.integers(0, 2 ** 62, tables, dtype=np.int64)
+
+        self._lock = threading.Lock()          # row arrays, dicts, counters
+        self._merge_lock = threading.Lock()    # one merge at a time
+        self._signatures = np.empty((MERGE_MIN_ROWS, DIMS), dtype=np.float32)
+        self._ids = np.empty(MERGE_MIN_ROWS, dtype=np.int64)
+        self._size = 0
+        self._keys = np.empty(0, dtype=np.int64)     # sorted, one per (row, table)
+        self._rows = np.empty(0, dtype=np.int64)     # row of each key
+        self._recent = {}                            # key -> row or (rows...), not merged yet
+        self._merging = {}                           # the dict a running merge is folding in
+        self._pending = []                           # (keys, rows) arrays of the rows in _recent
+        self._recent_rows = 0
+        self._latency = LatencyWindow()
+        self._counters = {"lookups": 0, "matches": 0, "candidates": 0, "inserted": 0, "merges": 0,
+                          "tailed": 0, "reloads": 0, "compactions": 0, "pruned": 0}
+        self._file_lock = threading.Lock()     # entries.bin and the read position, one thread at a time
+        self._read_pos = 0                     # bytes of entries.bin already in memory
+        self._inode = None                     # which entries.bin they came from (compact() replaces it)
+        self._compact_due = False
+        self._tail_s = None
+        self._merge_due = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- HASHING ---
+    def _hash(self, signatures):
+        """(n, tables) int64 bucket keys. Integer overflow wraps, which is all a hash needs."""
+        codes = np.floor((signatures @ self._projection + self._offset) / self.width).astype(np.int64)
+        return (codes.reshape(len(signatures), self.tables, self.bits) * self._mix).sum(axis=2) + self._salt
+
+    # --- PERSISTENCE ---
+    def _entries_path(self):
+        return os.path.join(self.directory, "entries.bin")
+
+    @contextmanager
+    def _flocked(self):
+        """Holds entries.lock: appends, reads and rewrites of entries.bin, across processes."""
+        with open(os.path.join(self.directory, "entries.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def open(self):
+        """Creates the directory, or loads what it holds and builds the tables. Returns self."""
+        if self.directory is None:
+            return self
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path = os.path.join(self.directory, "meta.json")
+        layout = {"signature_points": SIGNATURE_POINTS, "sampled_by": "time", "dims": DIMS}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                stored = json.load(f)
+            if stored != layout:
+                raise ValueError(f"{self.directory} holds {stored} signatures, this code makes {layout}: rebuild it")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump(layout, f)
+
+        with self._file_lock:
+            with self._flocked():
+                self._inode = None
+                entries, _ = self._read_new()
+            self._rebuild(entries["id"], entries["signature"])
+        return self
+
+    def _read_new(self):
+        """
+        (records appended to entries.bin since the last read, replaced): all of them if the file was
+        replaced or never read. Caller holds _file_lock and entries.lock.
+        """
+        path = self._entries_path()
+        with open(path, "ab"):
+            pass
+        stat = os.stat(path)
+        replaced = stat.st_ino != self._inode
+        if replaced:
+            self._inode, self._read_pos = stat.st_ino, 0
+        # A writer killed mid-record leaves a partial one at the end; appending after it would misalign the rest
+        whole = stat.st_size // ENTRY.itemsize * ENTRY.itemsize
+        if whole != stat.st_size:
+            os.truncate(path, whole)
+        count = (whole - self._read_pos) // ENTRY.itemsize
+        entries = np.fromfile(path, dtype=ENTRY, count=count, offset=self._read_pos) if count else np.empty(0, ENTRY)
+        self._read_pos = whole
+        return entries, replaced
+
+    def _take_in(self, entries, replaced):
+        """Indexes what _read_new found (other workers' appends); True if a merge is due. Caller holds _file_lock."""
+        if replaced:
+            # Another worker compacted entries.bin: what it holds now replaces the tables
+            self._rebuild(entries["id"], entries["signature"])
+            with self._lock:
+                self._counters["reloads"] += 1
+            return False
+        if not len(entries):
+            return False
+        with self._lock:
+            self._counters["tailed"] += len(entries)
+        return self._insert(entries["id"], entries["signature"])
+
+    def tail(self):
+        """Reads what other workers appended to entries.bin since the last call (the merge thread does, every tail_s)."""
+        if self.directory is None:
+            return
+        with self._file_lock:
+            with self._flocked():
+                found = self._read_new()
+            due = self._take_in(*found)
+        if due:
+            self._merge()
+
+    # --- INSERTS (the log writer thread, with the committed row ids) ---
+    def add(self, ids, signatures):
+        """Indexes paths under their attempt ids and appends them to entries.bin."""
+        ids = np.asarray(ids, dtype=np.int64)
+        signatures = np.asarray(signatures, dtype=np.float32).reshape(-1, DIMS)
+        if not len(ids):
+            return
+        with self._file_lock:
+            due = False
+            if self.directory is not None:
+                entries = np.empty(len(ids), dtype=ENTRY)
+                entries["id"] = ids
+                entries["signature"] = signatures
+                with self._flocked():
+                    # Other workers' records are read first, so the read position lands after ours
+                    found = self._read_new()
+                    with open(self._entries_path(), "ab") as f:
+                        f.write(entries.tobytes())
+                    self._read_pos += entries.nbytes
+                due = self._take_in(*found)
+            due = self._insert(ids, signatures) or due
+            over = self.max_entries is not None and self._size > self.max_entries * COMPACT_SLACK
+        if self._thread is not None:
+            self._compact_due = self._compact_due or over
+            if due or over:
+                self._merge_due.set()
+        elif over:
+            self.compact()
+        elif due:
+            self._merge()
+
+    # --- COMPACTION (retention's archived ids, the max_entries cap) ---
+    def compact(self, drop_ids=()):
+        """
+        Drops drop_ids and all but the newest max_entries, rewriting entries.bin, and rebuilds
+        the tables from what is left. Returns the number of rows removed.
+        """
+        drop_ids = np.asarray(drop_ids, dtype=np.int64)
+        with self._file_lock:
+            if self.directory is not None:
+                with self._flocked():
+                    self._inode = None
+                    entries, _ = self._read_new()
+                    kept = self._kept(entries, drop_ids)
+                    if len(kept) < len(entries):
+                        tmp = self._entries_path() + ".tmp"
+                        kept.tofile(tmp)
+                        os.replace(tmp, self._entries_path())
+                        self._inode, self._read_pos = os.stat(self._entries_path()).st_ino, kept.nbytes
+            else:
+                with self._lock:
+                    entries = np.empty(self._size, dtype=ENTRY)
+                    entries["id"] = self._ids[:self._size]
+                    entries["signature"] = self._signatures[:self._size]
+                kept = self._kept(entries, drop_ids)
+            self._rebuild(kept["id"], kept["signature"])
+            removed = len(entries) - len(kept)
+            with self._lock:
+                self._counters["compactions"] += 1
+                self._counters["pruned"] += removed
+        return removed
+
+    def _kept(self, entries, drop_ids):
+        if len(drop_ids):
+            entries = entries[~np.isin(entries["id"], drop_ids)]
+        if self.max_entries is not None and len(entries) > self.max_entries:
+            entries = entries[len(entries) - self.max_entries:]   # appended in id order: the newest are last
+        return entries
+
+    def _rebuild(self, ids, signatures):
+        """Replaces the tables with these rows, sorted in one go; lookups use the old ones until the swap."""
+        n = len(ids)
+        capacity = max(MERGE_MIN_ROWS, n)
+        signatures_new = np.empty((capacity, DIMS), dtype=np.float32)
+        signatures_new[:n] = signatures
+        ids_new = np.empty(capacity, dtype=np.int64)
+        ids_new[:n] = ids
+        keys = self._hash(signatures_new[:n]).ravel()
+        order = np.argsort(keys)   # rows within a bucket can come in any order
+        rows = np.repeat(np.arange(n, dtype=np.int64), self.tables)[order]
+        with self._merge_lock:
+            with self._lock:
+                self._signatures, self._ids, self._size = signatures_new, ids_new, n
+                self._keys, self._rows = keys[order], rows
+                self._recent, self._merging, self._pending = {}, {}, []
+                self._recent_rows = 0
+
+    # --- MERGE THREAD ---
+    def start(self, tail_s=None):
+        """
+        Runs merges and compactions on a background thread from now on (call after fork, like the
+        log writer). With tail_s it also reads other workers' appends that often.
+        """
+        if self._thread is None:
+            self._tail_s = tail_s if self.directory is not None else None
+            self._thread = threading.Thread(target=self._run, name="path-index-merge", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self._merge_due.wait(self._tail_s)
+            if self._stop.is_set():
+                return
+            self._merge_due.clear()
+            try:
+                if self._tail_s:
+                    self.tail()
+                if self._compact_due:
+                    self._compact_due = False
+                    self.compact()
+                self._merge()
+            except Exception as e:
+                print(f"⚠️ Path index merge failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._merge_due.set()
+
+    def _insert(self, ids, signatures):
+        """Adds rows to the in-memory index; True when the unmerged part is due for a merge."""
+        keys = self._hash(signatures)
+        with self._lock:
+            start = self._size
+            end = start + len(ids)
+            if end > len(self._ids):
+                # New arrays, never resized in place: a lookup may be reading the old ones
+                capacity = max(end, 2 * len(self._ids))
+                signatures_grown = np.empty((capacity, DIMS), dtype=np.float32)
+                signatures_grown[:start] = self._signatures[:start]
+                ids_grown = np.empty(capacity, dtype=np.int64)
+                ids_grown[:start] = self._ids[:start]
+                self._signatures, self._ids = signatures_grown, ids_grown
+            self._signatures[start:end] = signatures
+            self._ids[start:end] = ids
+            recent = self._recent
+            for row, row_keys in enumerate(keys.tolist(), start):
+                for key in row_keys:
+                    # Ints and tuples of ints, not lists: the cyclic GC doesn't track them, so a
+                    # big unmerged dict costs no collector pauses on the threads that insert
+                    earlier = recent.get(key)
+                    recent[key] = row if earlier is None else (
+                        earlier + (row,) if type(earlier) is tuple else (earlier, row))
+            self._pending.append((keys.ravel(), np.repeat(np.arange(start, end, dtype=np.int64), self.tables)))
+            self._size = end
+            self._recent_rows += len(ids)
+            self._counters["inserted"] += len(ids)
+            return self._recent_rows >= max(MERGE_MIN_ROWS, len(self._keys) // (4 * self.tables))
+
+    def _merge(self):
+        """
+        Folds the recent rows into the sorted arrays, off the lock; lookups use the old ones meanwhile.
+        Only NumPy work (sort the new keys, insert them), so it holds the GIL as little as it can.
+        """
+        with self._merge_lock:
+            with self._lock:
+                if not self._recent:
+                    return
+                self._merging, self._recent = self._recent, {}
+                pending, self._pending = self._pending, []
+                self._recent_rows = 0
+                keys, rows = self._keys, self._rows
+            new_keys = np.concatenate([k for k, _ in pending])
+            new_rows = np.concatenate([r for _, r in pending])
+            order = np.argsort(new_keys, kind="stable")
+            new_keys, new_rows = new_keys[order], new_rows[order]
+            at = np.searchsorted(keys, new_keys, side="right")
+            keys, rows = np.insert(keys, at, new_keys), np.insert(rows, at, new_rows)
+            with self._lock:
+                self._keys, self._rows = keys, rows
+                self._merging = {}
+                self._counters["merges"] += 1
+
+    # --- LOOKUPS (request threads) ---
+    def lookup(self, signature):
+        """(attempt id, distance) of the closest indexed path within radius, or None."""
+        start = time.perf_counter()
+        signature = np.asarray(signature, dtype=np.float32)
+        keys = self._hash(signature[None, :])[0]
+        with self._lock:
+            sorted_keys, sorted_rows = self._keys, self._rows
+            signatures, ids = self._signatures, self._ids
+            found = [d[key] for key in keys.tolist() for d in (self._recent, self._merging) if key in d]
+        unmerged = [row for rows in found for row in (rows if type(rows) is tuple else (rows,))]
+        left = np.searchsorted(sorted_keys, keys, side="left")
+        right = np.searchsorted(sorted_keys, keys, side="right")
+        blocks = [sorted_rows[a:b] for a, b in zip(left.tolist(), right.tolist()) if b > a]
+        blocks.append(np.array(unmerged, dtype=np.int64))
+        candidates = np.unique(np.concatenate(blocks))[:MAX_CANDIDATES]
+
+        match = None
+        if len(candidates):
+            distances = np.sqrt(((signatures[candidates] - signature) ** 2).sum(axis=1))
+            best = int(np.argmin(distances))
+            if distances[best] <= self.radius:
+                match = (int(ids[candidates[best]]), float(distances[best]))
+        self._latency.add((time.perf_counter() - start) * 1000)
+        with self._lock:
+            self._counters["lookups"] += 1
+            self._counters["candidates"] += len(candidates)
+            self._counters["matches"] += match is not None
+        return match
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size, recent = self._size, self._recent_rows
+        lookups = counters["lookups"]
+        return dict(
+            counters,
+            size=size,
+            max_entries=self.max_entries,
+            unmerged=recent,
+            radius=self.radius,
+            match_rate=round(counters["matches"] / lookups, 4) if lookups else 0.0,
+            mean_candidates=round(counters["candidates"] / lookups, 2) if lookups else 0.0,
+            latency=self._latency.summary(),
+        )
+
+
+# --- BENCHMARK: LOOKUP LATENCY AND RECALL AS THE INDEX GROWS ---
+def _human_paths(count, rng, points=120):
+    """Distinct human-like paths: two eased cubic strokes through a random waypoint to the button, with tremor."""
+    s = np.linspace(0, 1, points // 2)[None, :, None]
+    s = s * s * (3 - 2 * s)
+
+    def stroke(start, end):
+        c1 = start + rng.normal(0, 150, (count, 1, 2))
+        c2 = end + rng.normal(0, 150, (count, 1, 2))
+        return (1 - s) ** 3 * start + 3 * (1 - s) ** 2 * s * c1 + 3 * (1 - s) * s ** 2 * c2 + s ** 3 * end
+
+    start = rng.uniform([100, 100], [1100, 700], (count, 1, 2))
+    waypoint = rng.uniform([100, 100], [1100, 700], (count, 1, 2))
+    button = np.array([520.0, 450.0]) + rng.normal(0, 10, (count, 1, 2))
+    xy = np.concatenate([stroke(start, waypoint), stroke(waypoint, button)], axis=1)
+    xy = np.round(xy + rng.normal(0, 0.8, xy.shape))
+    dt = rng.uniform(8, 24, (count, xy.shape[1])) * rng.uniform(0.6, 1.6, (count, 1))
+    t = 1.76e12 + np.cumsum(dt, axis=1)
+    return np.concatenate([xy, t[:, :, None]], axis=2)
+
+
+def _replay(path, rng):
+    """bot_smart.py's trick on a recorded path: +-2 px of noise, shifted in time, a few ms of timer jitter."""
+    copy = path.copy()
+    copy[:, :2] += rng.uniform(-2, 2, (len(path), 2))
+    copy[:, 2] += rng.uniform(1e6, 1e7) + np.cumsum(rng.uniform(-1, 1, len(path)))
+    return copy
+
+
+def _bench(sizes, queries, radius, tables, bits, seed):
+    rng = np.random.default_rng(seed)
+    print(f"radius {radius} | {tables} tables x {bits} projections | {queries} replays + {queries} fresh paths per size")
+    print(f"{'size':>9} {'recall':>7} {'false+':>7} {'cands':>7} {'p50 us':>8} {'p99 us':>8} {'scan p50 us':>12} {'build s':>8}")
+    for size in sizes:
+        index = PathIndex(radius=radius, tables=tables, bits=bits, seed=seed)
+        kept = None
+        begin = time.perf_counter()
+        while len(index) < size:
+            block = _human_paths(min(10000, size - len(index)), rng)
+            signatures = [path_signature(p) for p in block]
+            # Strokes too small to sign are never indexed, as in app.py
+            valid = [i for i, signature in enumerate(signatures) if signature is not None]
+            block = block[valid]
+            if kept is None:
+                kept = block[:queries]
+            index.add(np.arange(len(index), len(index) + len(block)), np.array([signatures[i] for i in valid]))
+        build_s = time.perf_counter() - begin
+
+        picks = rng.integers(0, len(kept), queries)
+        replays = [path_signature(_replay(kept[i], rng)) for i in picks]
+        fresh = [s for s in (path_signature(p) for p in _human_paths(queries, rng)) if s is not None]
+        times, hits, false_hits = [], 0, 0
+        before = index.stats()["candidates"]
+        for i, signature in zip(picks, replays):
+            start = time.perf_counter()
+            match = index.lookup(signature)
+            times.append(time.perf_counter() - start)
+            hits += match is not None and match[0] == i
+        for signature in fresh:
+            false_hits += index.lookup(signature) is not None
+        candidates = (index.stats()["candidates"] - before) / (queries + len(fresh))
+
+        # The brute-force scan the index replaces
+        everything = index._signatures[:len(index)]
+        scan = []
+        for signature in replays[:50]:
+            start = time.perf_counter()
+            np.sqrt(((everything - signature) ** 2).sum(axis=1)).argmin()
+            scan.append(time.perf_counter() - start)
+        print(f"{size:>9,} {hits / queries:>7.1%} {false_hits / len(fresh):>7.2%} {candidates:>7.1f} "
+              f"{np.percentile(times, 50) * 1e6:>8.1f} {np.percentile(times, 99) * 1e6:>8.1f} "
+              f"{np.percentile(scan, 50) * 1e6:>12.1f} {build_s:>8.2f}")
+
+
+def _build(db_path, directory, chunk=2000):
+    import sqlite3
+    from path_codec import load_path
+    if os.path.exists(os.path.join(directory, "entries.bin")):
+        print(f"❌ {directory} already has entries; --build starts from an empty directory")
+        raise SystemExit(1)
+    index = PathIndex(directory).open()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, mouse_path FROM login_attempts
+            WHERE id > ? AND mouse_path IS NOT NULL AND trigger_source = 'ML_Model'
+            ORDER BY id LIMIT ?
+        ''', (last_id, chunk)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        pairs = [(row_id, path_signature(load_path(value))) for row_id, value in rows]
+        pairs = [(row_id, s) for row_id, s in pairs if s is not None]
+        if pairs:
+            index.add([p[0] for p in pairs], np.array([p[1] for p in pairs]))
+    conn.close()
+    print(f"✅ Indexed {len(index)} paths into {directory}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Near-duplicate trajectory index")
+    parser.add_argument('--dir', default='path_index')
+    parser.add_argument('--build', metavar='DB', help="index the model-scored paths stored in this database")
+    parser.add_argument('--stats', action='store_true')
+    parser.add_argument('--bench', action='store_true')
+    parser.add_argument('--sizes', default="1000,10000,100000")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--radius', type=float, default=0.08)
+    parser.add_argument('--tables', type=int, default=16)
+    parser.add_argument('--bits', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench([int(s) for s in args.sizes.split(',')], args.queries, args.radius, args.tables, args.bits, args.seed)
+    elif args.build:
+        _build(args.build, args.dir)
+    elif args.stats:
+        print(json.dumps(PathIndex(args.dir).open().stats(), indent=2))
+    else:
+        parser.print_help()
@@ -0,0 +1,116 @@
+"""
+ReplayCache: remembers the verdict for each submitted trajectory.
+
+Scripted bots run at scale post the same path over and over. The
+fingerprint quantizes the path (absolute x/y to a pixel grid, time
+relative to the first point) plus the click and typing rhythm, then
+hashes it. A repeat submission gets the earlier verdict straight from
+memory, with no feature extraction and no forest, and is logged as a
+replay.
+
+Bounded by entry count, a memory cap and a TTL. Least recently used
+entries go first. The memory cap counts each entry's digest and result
+dict as sys.getsizeof measures them, plus the bookkeeping per entry,
+measured once at import on the running interpreter (CPython 3.11: ~190 B
+besides the key and result, ~550 B per entry in all). sys.getsizeof
+leaves out the allocator's rounding, so the real total runs a few
+percent over the count.
+"""
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+def _entry_overhead_bytes(probe=4096):
+    """Per-entry memory besides the digest and the result dict: OrderedDict slot and links,
+    the [stored_at, result, hits] list and its float. Averaged over `probe` inserts."""
+    entries = OrderedDict((i.to_bytes(16, "little"), None) for i in range(probe))
+    per_slot = (sys.getsizeof(entries) - sys.getsizeof(OrderedDict())) / probe
+    return round(per_slot + sys.getsizeof([time.monotonic(), None, 0]) + sys.getsizeof(time.monotonic()))
+
+
+ENTRY_OVERHEAD_BYTES = _entry_overhead_bytes()
+
+
+def entry_bytes(digest, result):
+    """Memory one cached entry holds: digest, result dict and its values, bookkeeping."""
+    return (ENTRY_OVERHEAD_BYTES + sys.getsizeof(digest) + sys.getsizeof(result)
+            + sum(sys.getsizeof(v) for v in result.values()))
+
+
+def path_fingerprint(payload, grid_px=4, grid_ms=10, min_points=5):
+    """16-byte digest of the quantized path + timings, or None for paths too short to be meaningful."""
+    path = np.asarray(payload.get('mouse_path', []), dtype=np.float64)
+    if path.ndim != 2 or len(path) < min_points:
+        return None
+    q = np.empty((len(path), 3), dtype=np.int64)
+    q[:, :2] = np.floor(path[:, :2] / grid_px)
+    q[:, 2] = np.floor((path[:, 2] - path[0, 2]) / grid_ms)
+
+    h = hashlib.blake2b(q.tobytes(), digest_size=16)
+    for key in ('click_timestamps', 'keystroke_timestamps'):
+        stamps = np.asarray(payload.get(key, []), dtype=np.float64)
+        if stamps.size:
+            h.update(np.floor((stamps - stamps[0]) / grid_ms).astype(np.int64).tobytes())
+        h.update(b'|')
+    return h.digest()
+
+
+class ReplayCache:
+    def __init__(self, max_entries=100000, max_bytes=32 * 1024 * 1024, ttl_s=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()   # digest -> [stored_at, result, hits]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evicted_ttl": 0, "evicted_capacity": 0}
+
+    def get(self, digest):
+        """Returns (earlier_result, times_seen_before) or None."""
+        if digest is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and now - entry[0] > self.ttl_s:
+                del self._entries[digest]
+                self._bytes -= entry_bytes(digest, entry[1])
+                self._counters["evicted_ttl"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            entry[2] += 1
+            self._entries.move_to_end(digest)
+            self._counters["hits"] += 1
+            return entry[1], entry[2]
+
+    def put(self, digest, result):
+        """result: small dict with verdict / confidence_score (never the raw path)."""
+        if digest is None:
+            return
+        size = entry_bytes(digest, result)
+        with self._lock:
+            earlier = self._entries.get(digest)
+            if earlier is not None:
+                self._bytes -= entry_bytes(digest, earlier[1])
+            self._entries[digest] = [time.monotonic(), result, 0]
+            self._entries.move_to_end(digest)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                evicted, entry = self._entries.popitem(last=False)
+                self._bytes -= entry_bytes(evicted, entry[1])
+                self._counters["evicted_capacity"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._counters,
+                entries=len(self._entries),
+                capacity=self.max_entries,
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
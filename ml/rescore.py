@@ -0,0 +1,245 @@
+"""
+Offline re-scoring: run a model over historical traffic and diff the verdicts.
+
+    python rescore.py database.db --model model.pkl --workers 8
+    python rescore.py training_data.csv
+
+database.db rows are read in id order (keyset pages, so memory stays flat
+however large the table is). Paths are decoded, features come from
+features.py and scores from the compiled model, the same code /predict uses.
+CSV rows already hold the six features; they are scored and compared
+with their label.
+
+Chunks are scored on a process pool with a bounded number in flight and
+merged in order. After each merged chunk the counts, the read position
+and the size of the flips file are saved to the checkpoint. Re-running
+the same command resumes from there (--fresh starts over).
+
+Only rows the model decided are read (trigger_source 'ML_Model', which the
+fast tier and the shadow model log under too); trap and cache verdicts have
+nothing to compare against. Rows logged before input_timings existed have
+no click/typing data. They are skipped unless --include-legacy, which scores
+them with zeros there (what extract_features does for a path-only payload).
+Rows whose path can't be decoded or isn't [x, y, t] triples are skipped too.
+"""
+import os
+import csv
+import json
+import time
+import zlib
+import struct
+import sqlite3
+import argparse
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from compiled_forest import CompiledForest
+from features import extract_features_batch
+from path_codec import load_path
+
+VERDICTS = {0: "HUMAN", 1: "BOT"}
+# What build_result logs for the forest, the fast tier and the shadow model alike
+MODEL_SOURCE = "ML_Model"
+
+# Per-process model, loaded once by the pool initializer
+_engine = None
+
+
+def _init_worker(model_path):
+    global _engine
+    _engine = CompiledForest.load(model_path)
+
+
+# --- SOURCES: CHUNKS OF ROWS FROM A POSITION ---
+def db_chunks(db_path, after_id, chunk):
+    """Yields lists of (id, verdict, score, source, mouse_path, input_timings) of model-scored rows with id > after_id."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        # Databases from before input_timings was added (app.py migrates them on start) are all legacy rows
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(login_attempts)")]
+        timings = "input_timings" if "input_timings" in columns else "NULL AS input_timings"
+        while True:
+            rows = conn.execute(f'''
+                SELECT id, verdict, confidence_score, trigger_source, mouse_path, {timings}
+                FROM login_attempts WHERE id > ? AND trigger_source = ? ORDER BY id LIMIT ?
+            ''', (after_id, MODEL_SOURCE, chunk)).fetchall()
+            if not rows:
+                return
+            after_id = rows[-1][0]
+            yield rows
+    finally:
+        conn.close()
+
+
+def csv_chunks(csv_path, rows_done, chunk):
+    """Yields lists of (row_number, label, features) after the first rows_done data rows."""
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        label_col = header.index('label')
+        feature_cols = [i for i in range(len(header)) if i != label_col][:6]
+        numbered = enumerate(reader, start=1)
+        for _ in islice(numbered, rows_done):
+            pass
+        while True:
+            block = list(islice(numbered, chunk))
+            if not block:
+                return
+            yield [(n, int(float(row[label_col])), [float(row[i]) for i in feature_cols]) for n, row in block]
+
+
+# --- WORKER: SCORE ONE CHUNK ---
+def _row_payload(mouse_path, timings):
+    """extract_features input for one row, or None if its path or timings can't be read."""
+    try:
+        path = load_path(mouse_path)
+        extra = json.loads(timings) if timings is not None else {"click_timestamps": [], "keystroke_timestamps": []}
+    except (ValueError, TypeError, struct.error, zlib.error):   # bad JSON, ragged rows, a truncated BLOB
+        return None
+    # Old rows logged [x, y] pairs; extract_features_batch needs a time column
+    if path.ndim != 2 or path.shape[1] != 3 or not isinstance(extra, dict):
+        return None
+    return dict(extra, mouse_path=path)
+
+
+def _score_db_chunk(rows, include_legacy):
+    keep, payloads = [], []
+    skipped = 0
+    for row_id, verdict, score, source, mouse_path, timings in rows:
+        if timings is None and not include_legacy:
+            skipped += 1
+            continue
+        payload = _row_payload(mouse_path, timings)
+        if payload is None:
+            skipped += 1
+            continue
+        keep.append((row_id, verdict, score, source or "Unknown"))
+        payloads.append(payload)
+    if not payloads:
+        return [], skipped
+    labels, probabilities = _engine.predict(extract_features_batch(payloads))
+    return [(row, VERDICTS[int(label)], float(p) * 100) for row, label, p in zip(keep, labels, probabilities)], skipped
+
+
+def _score_csv_chunk(rows):
+    labels, probabilities = _engine.predict(np.array([features for _, _, features in rows]))
+    return [((n, VERDICTS[label], None, "label"), VERDICTS[int(new)], float(p) * 100)
+            for (n, label, _), new, p in zip(rows, labels, probabilities)], 0
+
+
+def score_chunk(kind, rows, include_legacy):
+    """Returns ([((key, old_verdict, old_score, source), new_verdict, new_score)], skipped)."""
+    if kind == "db":
+        return _score_db_chunk(rows, include_legacy)
+    return _score_csv_chunk(rows)
+
+
+# --- CHECKPOINT ---
+def new_state(source, model):
+    return {"source": os.path.abspath(source), "model": os.path.abspath(model),
+            "position": 0, "diff_bytes": 0, "scored": 0, "skipped": 0, "elapsed_s": 0.0,
+            "by_source": {}}
+
+
+def load_state(path, source, model, fresh):
+    if fresh or not os.path.exists(path):
+        return new_state(source, model)
+    with open(path) as f:
+        state = json.load(f)
+    if state["source"] != os.path.abspath(source) or state["model"] != os.path.abspath(model):
+        raise SystemExit(f"❌ {path} belongs to {state['source']} / {state['model']}; use --fresh or another --checkpoint")
+    return state
+
+
+def save_state(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def merge(state, scored, skipped, diff_writer):
+    """Folds one chunk into the running counts and streams its flips to the diff file."""
+    for (key, old, old_score, source), new, new_score in scored:
+        group = state["by_source"].setdefault(source, {"rows": 0, "transitions": {}, "abs_score_delta": 0.0})
+        group["rows"] += 1
+        transition = f"{old}->{new}"
+        group["transitions"][transition] = group["transitions"].get(transition, 0) + 1
+        if old_score is not None:
+            group["abs_score_delta"] += abs(new_score - old_score)
+        if old != new:
+            diff_writer.writerow([key, source, old, new, "" if old_score is None else f"{old_score:.2f}", f"{new_score:.2f}"])
+    state["scored"] += len(scored)
+    state["skipped"] += skipped
+
+
+def print_report(state, workers):
+    rate = state["scored"] / state["elapsed_s"] if state["elapsed_s"] else 0
+    print(f"Rows scored: {state['scored']:,} | skipped (no input_timings or unreadable path): {state['skipped']:,} "
+          f"| {state['elapsed_s']:.1f} s ({rate:,.0f} rows/s, {workers} workers)")
+    for source, group in sorted(state["by_source"].items()):
+        agree = sum(n for t, n in group["transitions"].items() if t.split("->")[0] == t.split("->")[1])
+        changed = ", ".join(f"{t} {n}" for t, n in sorted(group["transitions"].items())
+                            if t.split("->")[0] != t.split("->")[1]) or "none"
+        line = (f"  {source:14s} {group['rows']:>10,} rows | agree {agree:,} ({agree / group['rows'] * 100:.1f}%) "
+                f"| changed: {changed}")
+        if source != "label":
+            line += f" | mean |Δscore| {group['abs_score_delta'] / group['rows']:.2f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Re-score historical attempts and diff against stored verdicts")
+    parser.add_argument('source', nargs='?', default='database.db', help="database.db or a training_data.csv-shaped file")
+    parser.add_argument('--model', default='model.pkl')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk', type=int, default=2000, help="rows per worker task")
+    parser.add_argument('--checkpoint', default=None, help="default: <source>.rescore.json")
+    parser.add_argument('--diff-out', default=None, help="changed verdicts, CSV (default: <source>.rescore.csv)")
+    parser.add_argument('--fresh', action='store_true', help="ignore an existing checkpoint")
+    parser.add_argument('--include-legacy', action='store_true', help="score rows without input_timings too")
+    args = parser.parse_args()
+
+    kind = "csv" if args.source.lower().endswith(".csv") else "db"
+    checkpoint = args.checkpoint or args.source + ".rescore.json"
+    diff_path = args.diff_out or args.source + ".rescore.csv"
+    state = load_state(checkpoint, args.source, args.model, args.fresh)
+    if state["position"]:
+        print(f"Resuming from {'id' if kind == 'db' else 'row'} {state['position']:,} ({state['scored']:,} rows scored)")
+
+    # Drop flips written after the last checkpoint, then append
+    diff_file = open(diff_path, "a+" if state["diff_bytes"] else "w", newline='')
+    diff_file.truncate(state["diff_bytes"])
+    diff_file.seek(state["diff_bytes"])
+    diff_writer = csv.writer(diff_file)
+    if not state["diff_bytes"]:
+        diff_writer.writerow(["id" if kind == "db" else "row", "source", "old_verdict", "new_verdict", "old_score", "new_score"])
+
+    chunks = db_chunks(args.source, state["position"], args.chunk) if kind == "db" else csv_chunks(args.source, state["position"], args.chunk)
+    started = time.perf_counter() - state["elapsed_s"]
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(args.model,)) as pool:
+        pending = deque()   # (future, position after this chunk), merged in submission order
+
+        def merge_oldest():
+            future, position = pending.popleft()
+            merge(state, *future.result(), diff_writer)
+            diff_file.flush()
+            state["position"] = position
+            state["diff_bytes"] = diff_file.tell()
+            state["elapsed_s"] = time.perf_counter() - started
+            save_state(checkpoint, state)
+
+        for rows in chunks:
+            # Last id (db) or last data row number (csv) is where a resume starts from
+            pending.append((pool.submit(score_chunk, kind, rows, args.include_legacy), rows[-1][0]))
+            # Bounded in flight: memory is a few chunks per worker, whatever the table size
+            if len(pending) >= 2 * args.workers:
+                merge_oldest()
+        while pending:
+            merge_oldest()
+    diff_file.close()
+
+    print_report(state, args.workers)
+    print(f"✅ Changed verdicts written to {diff_path} | checkpoint {checkpoint}")
@@ -0,0 +1,394 @@
+"""
+Retention for login_attempts: indexes, monthly archive partitions, incremental VACUUM.
+
+database.db keeps the hot window only. Older data moves out in two steps:
+
+    paths older than PATH_DAYS   mouse_path moves to attempt_paths in the month's
+                                 archive file (zlib-packed, see path_codec.py); the row stays
+    rows older than ROW_DAYS     the whole row moves to login_attempts in the month's
+                                 archive file and is deleted from database.db
+
+Archive files are one SQLite database per UTC month, archive/attempts-YYYY-MM.db,
+so a month can be copied off or dropped as one file. Reviewed rows (label set)
+keep their path until the row itself moves: train.py reads them. Rollups are
+not touched, so the dashboard panels still count the whole history.
+
+Each batch is copied into the archive and committed there before it is removed
+from database.db; a crash in between leaves a duplicate that the next pass
+overwrites, never a lost row. Freed pages go back to the OS with
+PRAGMA incremental_vacuum, a few hundred at a time, so the writer is never
+locked out for a full VACUUM.
+
+The indexes serve the queries that run on every dashboard load: the live
+feed / stream catch-up (covering, so a page of rows doesn't read the path
+blobs), time ranges, and the verdict / trigger_source filters.
+
+    python retention.py --run [database.db]                 # one pass now
+    python retention.py --stats [database.db]
+    python retention.py --enable-incremental-vacuum [database.db]   # one-time VACUUM for older files
+"""
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+
+from path_codec import is_encoded, load_path, store_path
+
+try:
+    import fcntl   # one pass at a time across serve.py workers
+except ImportError:
+    fcntl = None
+
+ARCHIVE_PATTERN = re.compile(r'^attempts-(\d{4}-\d{2})\.db$')
+AUTO_VACUUM_INCREMENTAL = 2
+
+INDEX_SCHEMA = '''
+    -- /admin/stats live feed and /admin/stream catch-up: every column they read, in id order
+    CREATE INDEX IF NOT EXISTS login_attempts_feed
+        ON login_attempts (id, timestamp, verdict, trigger_source, fail_reason, confidence_score);
+    CREATE INDEX IF NOT EXISTS login_attempts_time ON login_attempts (timestamp);
+    CREATE INDEX IF NOT EXISTS login_attempts_verdict ON login_attempts (verdict, id);
+    CREATE INDEX IF NOT EXISTS login_attempts_trigger ON login_attempts (trigger_source, id);
+    -- Rows whose path is still in database.db; shrinks as paths are archived
+    CREATE INDEX IF NOT EXISTS login_attempts_path_pending
+        ON login_attempts (timestamp) WHERE mouse_path IS NOT NULL AND label IS NULL;
+'''
+
+ARCHIVE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS login_attempts (
+        id INTEGER PRIMARY KEY,    -- same id as in database.db
+        timestamp DATETIME,
+        verdict TEXT,
+        confidence_score REAL,
+        trigger_source TEXT,
+        fail_reason TEXT,
+        mouse_path TEXT,           -- NULL when the path was archived first (see attempt_paths)
+        window_dims TEXT,
+        ip_address TEXT,
+        input_timings TEXT,
+        label INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS attempt_paths (
+        id INTEGER PRIMARY KEY,
+        mouse_path BLOB
+    );
+'''
+COLUMNS = ('id', 'timestamp', 'verdict', 'confidence_score', 'trigger_source', 'fail_reason',
+           'mouse_path', 'window_dims', 'ip_address', 'input_timings', 'label')
+
+
+def ensure_indexes(conn):
+    conn.executescript(INDEX_SCHEMA)
+
+
+def incremental_vacuum_enabled(conn):
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+
+
+def enable_incremental_vacuum(db_path):
+    """Switches an existing file to auto_vacuum=INCREMENTAL (needs one full VACUUM)."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    enabled = incremental_vacuum_enabled(conn)
+    conn.close()
+    return enabled
+
+
+# --- ARCHIVE PARTITIONS (One SQLite File per Month) ---
+def archive_file(archive_dir, month):
+    return os.path.join(archive_dir, f"attempts-{month}.db")
+
+
+def partitions(archive_dir):
+    """[(month, path)] oldest first."""
+    if not os.path.isdir(archive_dir):
+        return []
+    found = [(m.group(1), os.path.join(archive_dir, name))
+             for name in os.listdir(archive_dir) if (m := ARCHIVE_PATTERN.match(name))]
+    return sorted(found)
+
+
+def open_partition(archive_dir, month):
+    os.makedirs(archive_dir, exist_ok=True)
+    conn = sqlite3.connect(archive_file(archive_dir, month), timeout=30)
+    # Must be set before the first table exists; a no-op on files that already have one
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.executescript(ARCHIVE_SCHEMA)
+    return conn
+
+
+def archived_path(archive_dir, row_id, timestamp):
+    """The stored mouse_path value of an archived attempt (or None), looked up in its month's file."""
+    path = archive_file(archive_dir, str(timestamp)[:7])
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT mouse_path FROM attempt_paths WHERE id = ?", (row_id,)).fetchone()
+        if row is None:
+            row = conn.execute("SELECT mouse_path FROM login_attempts WHERE id = ?", (row_id,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def _by_month(rows, timestamp_index):
+    months = {}
+    for row in rows:
+        months.setdefault(str(row[timestamp_index])[:7], []).append(row)
+    return months
+
+
+def _repack(value):
+    """Archive copy of a stored path: packed BLOBs as they are, legacy JSON text packed on the way."""
+    if is_encoded(value):
+        return value
+    try:
+        return store_path(load_path(value))
+    except ValueError:
+        return value
+
+
+class Retention:
+    def __init__(self, db_path, archive_dir, path_days=30, row_days=180,
+                 interval_s=3600, batch_size=500, vacuum_pages=500, on_archive=None):
+        if path_days > row_days:
+            raise ValueError("path_days must not be larger than row_days")
+        self.db_path = db_path
+        # Called after a pass with the ids it moved out of database.db (app.py: the path index drops them)
+        self.on_archive = on_archive
+        self.archive_dir = archive_dir
+        self.path_days = path_days
+        self.row_days = row_days
+        self.interval_s = interval_s
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages   # per incremental_vacuum call; the write lock is held that long
+        self._stop = threading.Event()
+        self._thread = None
+        self._counters = {
+            "passes": 0,
+            "skipped_passes": 0,      # another process held the lock
+            "paths_archived": 0,
+            "rows_archived": 0,
+            "path_bytes_before": 0,
+            "path_bytes_after": 0,
+            "pages_vacuumed": 0,
+        }
+        self._last_pass_ms = None
+        self._last_error = None
+
+    # --- ONE PASS ---
+    def run_once(self):
+        """Archives old paths, then old rows, then vacuums. Returns this pass's counts."""
+        lock = self._acquire()
+        if lock is False:
+            self._counters["skipped_passes"] += 1
+            return None
+        start = time.perf_counter()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        done = {"paths_archived": 0, "rows_archived": 0, "pages_vacuumed": 0}
+        archived_ids = []
+        try:
+            while not self._stop.is_set():
+                moved = self._archive_paths(conn)
+                done["paths_archived"] += moved
+                if moved < self.batch_size:
+                    break
+            while not self._stop.is_set():
+                moved = self._archive_rows(conn)
+                archived_ids += moved
+                if len(moved) < self.batch_size:
+                    break
+            done["rows_archived"] = len(archived_ids)
+            done["pages_vacuumed"] = self._vacuum(conn)
+        finally:
+            conn.close()
+            if lock is not None:
+                lock.close()
+        for key, value in done.items():
+            self._counters[key] += value
+        if archived_ids and self.on_archive is not None:
+            try:
+                self.on_archive(archived_ids)
+            except Exception as e:
+                # The rows are archived either way; a failing subscriber only misses them
+                print(f"⚠️ Retention on_archive hook failed: {e}")
+        self._counters["passes"] += 1
+        self._last_pass_ms = round((time.perf_counter() - start) * 1000, 1)
+        return done
+
+    def _acquire(self):
+        """Open lock file (None where fcntl is missing), or False if another process is mid-pass."""
+        if fcntl is None:
+            return None
+        lock = open(self.db_path + ".retention.lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        return lock
+
+    def _archive_paths(self, conn):
+        rows = conn.execute('''
+            SELECT id, timestamp, mouse_path FROM login_attempts
+            WHERE timestamp < datetime('now', ?) AND mouse_path IS NOT NULL AND label IS NULL
+            ORDER BY timestamp LIMIT ?
+        ''', (f'-{self.path_days} days', self.batch_size)).fetchall()
+        for month, group in _by_month(rows, 1).items():
+            packed = [(row_id, _repack(value)) for row_id, _, value in group]
+            self._counters["path_bytes_before"] += sum(len(value) for _, _, value in group)
+            self._counters["path_bytes_after"] += sum(len(value) for _, value in packed)
+            archive = open_partition(self.archive_dir, month)
+            try:
+                with archive:
+                    archive.executemany("INSERT OR REPLACE INTO attempt_paths (id, mouse_path) VALUES (?, ?)", packed)
+            finally:
+                archive.close()
+            with conn:
+                conn.executemany("UPDATE login_attempts SET mouse_path = NULL WHERE id = ?",
+                                 [(row_id,) for row_id, _, _ in group])
+        return len(rows)
+
+    def _archive_rows(self, conn):
+        rows = conn.execute(f'''
+            SELECT {", ".join(COLUMNS)} FROM login_attempts
+            WHERE timestamp < datetime('now', ?)
+            ORDER BY timestamp LIMIT ?
+        ''', (f'-{self.row_days} days', self.batch_size)).fetchall()
+        for month, group in _by_month(rows, 1).items():
+            archive = open_partition(self.archive_dir, month)
+            try:
+                with archive:
+                    archive.executemany(
+                        f"INSERT OR REPLACE INTO login_attempts ({', '.join(COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(COLUMNS))})", group)
+            finally:
+                archive.close()
+            with conn:
+                conn.executemany("DELETE FROM login_attempts WHERE id = ?", [(row[0],) for row in group])
+        return [row[0] for row in rows]
+
+    def _vacuum(self, conn):
+        """Releases free pages in vacuum_pages steps. 0 if the file isn't in incremental mode."""
+        if not incremental_vacuum_enabled(conn):
+            return 0
+        released = 0
+        while not self._stop.is_set():
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free == 0:
+                break
+            conn.execute(f"PRAGMA incremental_vacuum({min(free, self.vacuum_pages)})").fetchall()
+            left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if left >= free:
+                break
+            released += free - left
+        return released
+
+    # --- BACKGROUND THREAD ---
+    def start(self):
+        if self.interval_s > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.run_once()
+                self._last_error = None
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"⚠️ Retention pass failed: {e}")
+
+    def close(self):
+        self._stop.set()
+
+    def stats(self):
+        return dict(
+            self._counters,
+            path_days=self.path_days,
+            row_days=self.row_days,
+            partitions=len(partitions(self.archive_dir)),
+            last_pass_ms=self._last_pass_ms,
+            last_error=self._last_error,
+        )
+
+
+def report(db_path, archive_dir):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    hot = conn.execute('''
+        SELECT COUNT(*), COUNT(mouse_path), MIN(timestamp), MAX(timestamp) FROM login_attempts
+    ''').fetchone()
+    pages, free, page_size = (conn.execute(f"PRAGMA {p}").fetchone()[0]
+                              for p in ("page_count", "freelist_count", "page_size"))
+    incremental = incremental_vacuum_enabled(conn)
+    conn.close()
+    months = []
+    for month, path in partitions(archive_dir):
+        part = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        rows, paths = (part.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                       for t in ("login_attempts", "attempt_paths"))
+        part.close()
+        months.append((month, rows, paths, os.path.getsize(path)))
+    return {"hot": hot, "pages": pages, "free_pages": free, "page_size": page_size,
+            "incremental": incremental, "months": months}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Archive old login_attempts and reclaim space")
+    parser.add_argument('db', nargs='?', default='database.db')
+    parser.add_argument('--archive-dir', default=None, help="default: archive/ next to the database")
+    parser.add_argument('--path-index-dir', default=None,
+                        help="near-duplicate index to drop archived ids from (default: path_index/ next to the database)")
+    parser.add_argument('--path-days', type=int, default=int(os.environ.get("RETENTION_PATH_DAYS", 30)))
+    parser.add_argument('--row-days', type=int, default=int(os.environ.get("RETENTION_ROW_DAYS", 180)))
+    parser.add_argument('--run', action='store_true', help="archive and vacuum once")
+    parser.add_argument('--stats', action='store_true', help="hot table and partition sizes")
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help="one full VACUUM so the background pass can release pages")
+    args = parser.parse_args()
+    archive_dir = args.archive_dir or os.path.join(os.path.dirname(os.path.abspath(args.db)), "archive")
+    index_dir = args.path_index_dir or os.path.join(os.path.dirname(os.path.abspath(args.db)), "path_index")
+
+    if not (args.run or args.stats or args.enable_incremental_vacuum):
+        parser.print_help()
+        sys.exit(1)
+
+    if args.enable_incremental_vacuum:
+        before = os.path.getsize(args.db)
+        if not enable_incremental_vacuum(args.db):
+            sys.exit("❌ auto_vacuum is still not INCREMENTAL (is another connection holding the file?)")
+        print(f"✅ Incremental vacuum enabled ({before:,} -> {os.path.getsize(args.db):,} bytes)")
+
+    if args.run:
+        conn = sqlite3.connect(args.db)
+        ensure_indexes(conn)
+        conn.close()
+        retention = Retention(args.db, archive_dir, args.path_days, args.row_days, interval_s=0)
+        if os.path.exists(os.path.join(index_dir, "entries.bin")):
+            from path_index import PathIndex
+            # Running workers see the rewritten entries.bin on their next read and reload it
+            retention.on_archive = PathIndex(index_dir).compact
+        done = retention.run_once()
+        if done is None:
+            sys.exit("⚠️ Another process is running a retention pass")
+        counters = retention.stats()
+        print(f"✅ Archived {done['paths_archived']} paths and {done['rows_archived']} rows, "
+              f"released {done['pages_vacuumed']} pages in {counters['last_pass_ms']} ms")
+        if counters["path_bytes_before"]:
+            print(f"   Path bytes : {counters['path_bytes_before']:,} -> {counters['path_bytes_after']:,} archived")
+
+    if args.stats:
+        r = report(args.db, archive_dir)
+        rows, with_path, oldest, newest = r["hot"]
+        print(f"database.db : {rows} rows ({with_path} with a path), {oldest} .. {newest}")
+        print(f"   Pages    : {r['pages']:,} x {r['page_size']} B, {r['free_pages']:,} free"
+              + ("" if r["incremental"] else " (run --enable-incremental-vacuum to release them in the background)"))
+        for month, rows, paths, size in r["months"]:
+            print(f"   {month}  : {rows:>8} rows {paths:>8} paths {size:>12,} bytes")
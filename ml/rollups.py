@@ -0,0 +1,185 @@
+"""
+Hour-bucket rollups for the Admin Dashboard.
+
+attempt_rollups holds one counter per (IST hour, verdict, trigger_source,
+fail_reason). A trigger on login_attempts bumps the matching counter in the
+same transaction as the INSERT, so /admin/stats reads a few hundred rows
+instead of scanning (and time-shifting) every attempt ever logged.
+
+NULL dimensions are stored as '' (primary key columns can't hold NULL in a
+WITHOUT ROWID table) and turned back into NULL when read.
+
+One-time backfill for an existing database:
+    python rollups.py --backfill [database.db] [--archive-dir archive]
+
+The backfill counts the rows retention has moved to the monthly archive
+files as well (retention.py), so a rebuild keeps the whole history.
+"""
+import os
+import sys
+import sqlite3
+import argparse
+from collections import Counter
+
+from retention import partitions
+
+# UTC -> IST shift, applied once per event at write time
+IST_SHIFT = '+5.5 hours'
+
+ROLLUP_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS attempt_rollups (
+        bucket TEXT NOT NULL,            -- IST hour, 'YYYY-MM-DD HH'
+        verdict TEXT NOT NULL,
+        trigger_source TEXT NOT NULL,
+        fail_reason TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, verdict, trigger_source, fail_reason)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS login_attempts_rollup
+    AFTER INSERT ON login_attempts
+    BEGIN
+        INSERT INTO attempt_rollups (bucket, verdict, trigger_source, fail_reason, attempts)
+        VALUES (
+            IFNULL(strftime('%Y-%m-%d %H', NEW.timestamp, '{IST_SHIFT}'), ''),
+            IFNULL(NEW.verdict, ''),
+            IFNULL(NEW.trigger_source, ''),
+            IFNULL(NEW.fail_reason, ''),
+            1
+        )
+        ON CONFLICT (bucket, verdict, trigger_source, fail_reason)
+        DO UPDATE SET attempts = attempts + 1;
+    END;
+'''
+
+BACKFILL_SQL = f'''
+    INSERT INTO attempt_rollups (bucket, verdict, trigger_source, fail_reason, attempts)
+    SELECT IFNULL(strftime('%Y-%m-%d %H', timestamp, '{IST_SHIFT}'), ''),
+           IFNULL(verdict, ''), IFNULL(trigger_source, ''), IFNULL(fail_reason, ''),
+           COUNT(*)
+    FROM login_attempts
+    GROUP BY 1, 2, 3, 4
+'''
+
+
+def ensure_rollups(conn):
+    """Creates the rollup table and trigger. Returns True if the table is new."""
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='attempt_rollups'"
+    ).fetchone() is not None
+    conn.executescript(ROLLUP_SCHEMA)
+    return not existed
+
+
+ARCHIVE_ROWS_SQL = f'''
+    SELECT id, IFNULL(strftime('%Y-%m-%d %H', timestamp, '{IST_SHIFT}'), ''),
+           IFNULL(verdict, ''), IFNULL(trigger_source, ''), IFNULL(fail_reason, '')
+    FROM login_attempts
+'''
+
+ARCHIVE_UPSERT_SQL = '''
+    INSERT INTO attempt_rollups (bucket, verdict, trigger_source, fail_reason, attempts)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (bucket, verdict, trigger_source, fail_reason)
+    DO UPDATE SET attempts = attempts + excluded.attempts
+'''
+
+
+def archived_counts(conn, archive_dir, chunk=5000):
+    """
+    Rollup counts of the rows in the archive partitions. A row that is in both the archive and
+    login_attempts (a retention pass interrupted between copy and delete) is left to the live count.
+    """
+    counts = Counter()
+    for _, path in partitions(archive_dir):
+        archive = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = archive.execute(ARCHIVE_ROWS_SQL)
+            while block := rows.fetchmany(chunk):
+                ids = [row[0] for row in block]
+                live = {r[0] for r in conn.execute(
+                    f"SELECT id FROM login_attempts WHERE id IN ({','.join('?' * len(ids))})", ids)}
+                counts.update(row[1:] for row in block if row[0] not in live)
+        finally:
+            archive.close()
+    return counts
+
+
+def backfill(conn, archive_dir=None):
+    """Rebuilds attempt_rollups from login_attempts and the archive partitions in one write transaction."""
+    conn.executescript(ROLLUP_SCHEMA)
+    # IMMEDIATE takes the write lock first, so no INSERT can slip in between the DELETE and the rebuild,
+    # and retention can't delete a row from login_attempts while its archive copy is being counted
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM attempt_rollups")
+        conn.execute(BACKFILL_SQL)
+        if archive_dir is not None:
+            conn.executemany(ARCHIVE_UPSERT_SQL, [key + (n,) for key, n in archived_counts(conn, archive_dir).items()])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return conn.execute("SELECT COUNT(*), IFNULL(SUM(attempts), 0) FROM attempt_rollups").fetchone()
+
+
+# --- DASHBOARD READS (Only Touch attempt_rollups) ---
+def funnel(cursor):
+    """Attack funnel: attempts by trigger_source."""
+    cursor.execute('''
+        SELECT NULLIF(trigger_source, ''), SUM(attempts)
+        FROM attempt_rollups GROUP BY trigger_source
+    ''')
+    return [{"name": r[0], "value": r[1]} for r in cursor.fetchall()]
+
+
+def zoo(cursor):
+    """Bot types: BOT attempts by fail_reason."""
+    cursor.execute('''
+        SELECT NULLIF(fail_reason, ''), SUM(attempts)
+        FROM attempt_rollups WHERE verdict = 'BOT' GROUP BY fail_reason
+    ''')
+    return [{"name": r[0], "value": r[1]} for r in cursor.fetchall()]
+
+
+def heatmap(cursor):
+    """BOT attempts per IST hour of day, all 24 hours."""
+    cursor.execute('''
+        SELECT substr(bucket, 12, 2) AS hour, SUM(attempts)
+        FROM attempt_rollups WHERE verdict = 'BOT' AND bucket != '' GROUP BY hour
+    ''')
+    heatmap_raw = {int(r[0]): r[1] for r in cursor.fetchall()}
+    return [{"hour": f"{h:02d}:00", "bots": heatmap_raw.get(h, 0)} for h in range(24)]
+
+
+def volume(cursor, days=7):
+    """BOT vs HUMAN attempts per IST date, latest `days` dates."""
+    cursor.execute('''
+        SELECT substr(bucket, 1, 10) AS day,
+               SUM(CASE WHEN verdict='BOT' THEN attempts ELSE 0 END) AS bots,
+               SUM(CASE WHEN verdict='HUMAN' THEN attempts ELSE 0 END) AS humans
+        FROM attempt_rollups
+        WHERE bucket != ''
+        GROUP BY day
+        ORDER BY day DESC LIMIT ?
+    ''', (days,))
+    return [{"date": r[0], "bots": r[1], "humans": r[2]} for r in cursor.fetchall()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Maintain the attempt_rollups table")
+    parser.add_argument('db', nargs='?', default='database.db')
+    parser.add_argument('--backfill', action='store_true', help="rebuild rollups from login_attempts and the archive")
+    parser.add_argument('--archive-dir', help="retention's archive directory (default: archive/ next to the database)")
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.print_help()
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout=5000")
+    archive_dir = args.archive_dir or os.path.join(os.path.dirname(os.path.abspath(args.db)), "archive")
+    buckets, attempts = backfill(conn, archive_dir)
+    conn.close()
+    print(f"✅ Rollups rebuilt: {attempts} attempts in {buckets} buckets")
@@ -0,0 +1,155 @@
+"""
+Production entry point: N pre-forked worker processes on one listening socket.
+
+    python serve.py --workers 4 --port 5000    # default: one worker (WORKERS)
+    WORKERS=4 TRUST_PROXY=1 python serve.py --host 0.0.0.0
+
+The master runs app.create_app() once, so the database setup, the model
+load and the warm-up happen a single time, before fork. Workers inherit the
+compiled forest's NumPy arrays copy-on-write; nothing writes to them, so
+those pages stay shared. gc.freeze() keeps the collector from touching
+(and so copying) the objects that were alive at fork.
+
+Each worker then starts its own log writer and model watcher threads
+(threads don't survive fork) and runs a threaded WSGI server on the
+inherited socket; the kernel hands each new connection to one of them.
+The master restarts a worker that dies and passes SIGTERM / SIGINT on.
+GET /ready answers 200 as soon as a worker is accepting connections.
+
+Per-worker state, worth knowing before raising --workers:
+    /session/*        a session lives in the worker that started it, so with more than one worker
+                      /session/start answers 404 and the login page scores through /predict
+    /admin/stream     each worker has its own live feed; with more than one, every worker reads new
+                      rows from the database (STREAM_TAIL_MS) so each stream sees all workers' attempts
+    admission         rate limits are counted per worker
+    overload          MAX_INFLIGHT and degraded mode are per worker: the process-wide limit is workers x MAX_INFLIGHT
+    retention         every worker runs the timer; a file lock lets one pass run at a time
+    replay cache      per worker, so a replay may be scored again by another worker
+    path index        loaded before fork; each worker then indexes only its own new paths (all append
+                      to one entries.bin, so every worker sees them all after a restart)
+    /metrics, /admin  each request reaches one worker; /admin/model/* swaps only that worker's
+                      model. Replace the file at MODEL_PATH instead: every worker's watcher reloads it.
+
+Run bench_serve.py to see throughput and memory per worker count.
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import random
+import socket
+import logging
+import argparse
+
+# A worker that exits this soon after starting is crash-looping; wait before the next restart
+RESTART_BACKOFF_S = 1.0
+
+
+def listen(host, port, backlog):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(index, workers, sock, host, port):
+    """Runs in the child after fork; never returns."""
+    from werkzeug.serving import make_server
+    import app
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    random.seed()   # forked children start with the master's random state (shadow / profile sampling)
+    code = 0
+    try:
+        app.start_background(workers)
+        server = make_server(host, port, app.app, threaded=True, fd=sock.fileno())
+        print(f"✅ Worker {index} serving (pid {os.getpid()})")
+        server.serve_forever()   # returns on KeyboardInterrupt
+    except Exception as e:
+        print(f"❌ Worker {index} failed: {e}")
+        code = 1
+    finally:
+        # Drain the log queue; os._exit skips the atexit hooks inherited from the master
+        app.log_writer.close()
+        app.models.close()
+        app.retention.close()
+        app.feed_tail.close()
+        app.path_index.close()
+        sys.stdout.flush()
+        os._exit(code)
+
+
+def spawn(index, workers, sock, host, port):
+    pid = os.fork()
+    if pid == 0:
+        run_worker(index, workers, sock, host, port)
+    return pid
+
+
+def serve(args):
+    sock = listen(args.host, args.port, args.backlog)
+    # The request log is one line per request on stdout; the app's own log and /metrics are enough
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    print(f"Preloading app.py for {args.workers} workers...")
+    import app
+    app.create_app(background=False)   # threads are started per worker, after fork
+    gc.collect()
+    gc.freeze()
+
+    workers = {}    # pid -> (index, started_at)
+    stopping = []
+
+    def shutdown(signum, frame):
+        if not stopping:
+            stopping.append(signum)
+            print(f"Stopping {len(workers)} workers...")
+            for pid in workers:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for index in range(args.workers):
+        workers[spawn(index, args.workers, sock, args.host, args.port)] = (index, time.monotonic())
+    print(f"✅ Listening on http://{args.host}:{args.port} (master pid {os.getpid()})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index, started_at = workers.pop(pid, (None, 0))
+        if index is None or stopping:
+            continue
+        print(f"⚠️ Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        if time.monotonic() - started_at < RESTART_BACKOFF_S:
+            time.sleep(RESTART_BACKOFF_S)
+        workers[spawn(index, args.workers, sock, args.host, args.port)] = (index, time.monotonic())
+    sock.close()
+    print("✅ All workers stopped")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve app.py with pre-forked worker processes")
+    parser.add_argument('--host', default=os.environ.get("HOST", "127.0.0.1"))
+    parser.add_argument('--port', type=int, default=int(os.environ.get("PORT", 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get("WORKERS", 1)))
+    parser.add_argument('--backlog', type=int, default=1024, help="listen queue shared by all workers")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if not hasattr(os, "fork"):
+        sys.exit("❌ serve.py needs os.fork (Linux / macOS); use `python app.py` on Windows")
+    serve(args)
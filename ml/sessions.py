@@ -0,0 +1,192 @@
+"""
+Streaming telemetry sessions.
+
+The browser opens a session when the page loads and posts mouse points in
+small chunks. Each chunk updates RunningFeatures, so by the time the user
+clicks Login the path features are already computed and finalize only
+has to score one row. Work at submit time no longer grows with how long
+the user stayed on the page.
+
+RunningFeatures gives the same values as extract_features on the
+concatenated path (up to float rounding):
+    movement_time   last t - first t
+    speed_variance  population std of segment speeds, merged chunk by chunk (Welford / Chan)
+    path_efficiency straight-line distance / total distance
+    curvature_sum   turning angles, including the one across each chunk boundary
+"""
+import time
+import secrets
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class RunningFeatures:
+    __slots__ = ("first", "last", "last_diff", "speed_n", "speed_mean", "speed_m2",
+                 "total_dist", "curvature_sum")
+
+    def __init__(self):
+        self.first = None       # first [x, y, t]
+        self.last = None        # last [x, y, t], joins the next chunk
+        self.last_diff = None   # last segment vector, for the angle across the boundary
+        self.speed_n = 0
+        self.speed_mean = 0.0
+        self.speed_m2 = 0.0
+        self.total_dist = 0.0
+        self.curvature_sum = 0.0
+
+    @property
+    def n_points(self):
+        return 0 if self.first is None else self.speed_n + 1
+
+    def update(self, chunk):
+        """Folds a (k, 3) block of [x, y, t] points into the running totals."""
+        points = np.asarray(chunk, dtype=np.float64)
+        if points.size == 0:
+            return
+        points = points[:, :3]
+        if self.first is None:
+            self.first = points[0].copy()
+        else:
+            points = np.vstack([self.last, points])
+        self.last = points[-1].copy()
+        if len(points) < 2:
+            return
+
+        diffs = np.diff(points[:, :2], axis=0)
+        segment_dists = np.sqrt((diffs ** 2).sum(axis=1))
+        speeds = segment_dists / (np.diff(points[:, 2]) + 0.001)
+        self.total_dist += segment_dists.sum()
+
+        # Merge this chunk's speed mean / M2 into the running ones
+        n_b = len(speeds)
+        mean_b = speeds.mean()
+        m2_b = ((speeds - mean_b) ** 2).sum()
+        n = self.speed_n + n_b
+        delta = mean_b - self.speed_mean
+        self.speed_mean += delta * n_b / n
+        self.speed_m2 += m2_b + delta ** 2 * self.speed_n * n_b / n
+        self.speed_n = n
+
+        if self.last_diff is not None:
+            diffs_with_prev = np.vstack([self.last_diff, diffs])
+        else:
+            diffs_with_prev = diffs
+        if len(diffs_with_prev) > 1:
+            v1 = diffs_with_prev[:-1]; v2 = diffs_with_prev[1:]
+            norms = np.linalg.norm(v1, axis=1) * np.linalg.norm(v2, axis=1)
+            dot = (v1 * v2).sum(axis=1)
+            self.curvature_sum += np.sum(np.arccos(np.clip(dot / (norms + 1e-10), -1.0, 1.0)))
+        self.last_diff = diffs[-1].copy()
+
+    def path_features(self):
+        """[movement_time, speed_variance, path_efficiency, curvature_sum], or None if < 2 points."""
+        if self.speed_n == 0:
+            return None
+        movement_time = self.last[2] - self.first[2]
+        speed_variance = np.sqrt(self.speed_m2 / self.speed_n)
+        straight_dist = np.linalg.norm(self.last[:2] - self.first[:2])
+        path_efficiency = straight_dist / self.total_dist if self.total_dist > 0 else 1
+        return [movement_time, speed_variance, path_efficiency, self.curvature_sum]
+
+
+class Session:
+    __slots__ = ("id", "created", "last_seen", "features", "replay", "replay_points",
+                 "next_seq", "lock")
+
+    def __init__(self, session_id):
+        now = time.monotonic()
+        self.id = session_id
+        self.created = now
+        self.last_seen = now
+        self.features = RunningFeatures()
+        self.replay = []          # chunks kept for the logged replay path, capped
+        self.replay_points = 0
+        self.next_seq = 0
+        self.lock = threading.Lock()
+
+    def add_chunk(self, seq, points, max_replay_points):
+        """
+        Applies chunk `seq` if it is the next one: "applied", "duplicate" (a retry of an
+        applied chunk, ignored) or "gap" (an earlier chunk is missing, nothing applied).
+        The running features join each chunk to the last point, so chunks go in strictly in order.
+        """
+        with self.lock:
+            if seq < self.next_seq:
+                return "duplicate"
+            if seq > self.next_seq:
+                return "gap"
+            self.next_seq = seq + 1
+            self.features.update(points)
+            room = max_replay_points - self.replay_points
+            if room > 0 and len(points):
+                kept = points[:room, :3].tolist()
+                self.replay.append(kept)
+                self.replay_points += len(kept)
+            return "applied"
+
+    def replay_path(self):
+        return [p for chunk in self.replay for p in chunk]
+
+
+class SessionStore:
+    """Open sessions, oldest-touched first. Expired or excess sessions are evicted lazily."""
+
+    def __init__(self, ttl_s=600, max_sessions=10000, max_replay_points=5000):
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.max_replay_points = max_replay_points
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"started": 0, "finalized": 0, "chunks": 0, "chunk_gaps": 0,
+                          "evicted_ttl": 0, "evicted_capacity": 0}
+
+    def start(self):
+        session = Session(secrets.token_urlsafe(16))
+        with self._lock:
+            self._evict(time.monotonic())
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._counters["evicted_capacity"] += 1
+            self._sessions[session.id] = session
+            self._counters["started"] += 1
+        return session
+
+    def get(self, session_id):
+        """Returns the live session (and marks it active), or None if unknown/expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_seen = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def add_chunk(self, session, seq, points):
+        outcome = session.add_chunk(seq, points, self.max_replay_points)
+        if outcome != "duplicate":
+            with self._lock:
+                self._counters["chunks" if outcome == "applied" else "chunk_gaps"] += 1
+        return outcome
+
+    def pop(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._counters["finalized"] += 1
+            return session
+
+    def _evict(self, now):
+        # Caller holds self._lock; the front of the OrderedDict is the least recently touched
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_seen < self.ttl_s:
+                break
+            self._sessions.popitem(last=False)
+            self._counters["evicted_ttl"] += 1
+
+    def stats(self):
+        with self._lock:
+            self._evict(time.monotonic())
+            return dict(self._counters, active=len(self._sessions))
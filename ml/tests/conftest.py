@@ -0,0 +1,30 @@
+import os
+import sys
+import importlib
+import warnings
+
+import pytest
+
+# The ml/ modules import each other flat, as when run from ml/
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """app.py set up on a scratch database and path index (background threads off)."""
+    scratch = tmp_path_factory.mktemp("app")
+    os.environ["DB_PATH"] = str(scratch / "database.db")
+    os.environ["PATH_INDEX_DIR"] = str(scratch / "path_index")
+    app = importlib.import_module("app")
+    # Never the committed database.db: app reads DB_PATH once, on first import
+    assert app.DB_NAME == os.environ["DB_PATH"]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")   # pickle from an older scikit-learn
+        app.create_app(background=False)
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    return app_module.app.test_client()
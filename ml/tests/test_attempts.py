@@ -0,0 +1,97 @@
+"""attempts.search keyset paging across database.db and the archive partitions; stored paths that can't be replayed."""
+import sqlite3
+
+import pytest
+
+import attempts
+from path_codec import store_path
+from retention import Retention
+
+SCHEMA = '''
+    CREATE TABLE login_attempts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        verdict TEXT, confidence_score REAL, trigger_source TEXT, fail_reason TEXT,
+        mouse_path TEXT, window_dims TEXT, ip_address TEXT, input_timings TEXT, label INTEGER
+    )
+'''
+PATH = [[100, 100, 1.76e12], [140, 120, 1.76e12 + 16], [200, 180, 1.76e12 + 40]]
+# (timestamp, verdict): ids 1-4 January, 5-7 February, 8-12 live
+ROWS = [("2020-01-10 10:00:00", "BOT")] * 4 + [("2020-02-10 10:00:00", "HUMAN")] * 3 + [("now", "BOT")] * 5
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_path, archive_dir = str(tmp_path / "database.db"), str(tmp_path / "archive")
+    conn = sqlite3.connect(db_path)
+    conn.execute(SCHEMA)
+    for timestamp, verdict in ROWS:
+        conn.execute("INSERT INTO login_attempts (timestamp, verdict, trigger_source, mouse_path) "
+                     "VALUES (datetime(?), ?, 'ML_Model', ?)", (timestamp, verdict, store_path(PATH)))
+    conn.commit()
+    conn.close()
+    Retention(db_path, archive_dir, path_days=30, row_days=30).run_once()
+    return db_path, archive_dir
+
+
+def all_pages(db_path, archive_dir, filters, limit):
+    pages, before_id = [], None
+    while True:
+        rows, before_id = attempts.search(db_path, archive_dir, filters, before_id, limit)
+        pages.append([(r["id"], r["archived"]) for r in rows])
+        if before_id is None:
+            return pages
+
+
+def test_pages_run_from_live_into_the_archive(db):
+    pages = all_pages(*db, {}, limit=3)
+    ids = [row_id for page in pages for row_id, _ in page]
+    assert ids == list(range(12, 0, -1))
+    # Page 2 crosses from database.db (9, 8) into February (7)
+    assert pages[1] == [(9, False), (8, False), (7, True)]
+    assert [len(page) for page in pages] == [3, 3, 3, 3, 0]
+
+
+def test_page_boundary_at_the_end_of_live(db):
+    rows, before_id = attempts.search(*db, {}, limit=5)
+    assert [r["id"] for r in rows] == [12, 11, 10, 9, 8] and before_id == 8
+    rows, before_id = attempts.search(*db, {}, before_id=8, limit=5)
+    assert [r["id"] for r in rows] == [7, 6, 5, 4, 3] and all(r["archived"] for r in rows)
+
+
+def test_filters_apply_in_every_partition(db):
+    pages = all_pages(*db, {"verdict": "BOT"}, limit=4)
+    assert [row_id for page in pages for row_id, _ in page] == [12, 11, 10, 9, 8, 4, 3, 2, 1]
+
+
+def test_time_range_skips_other_months(db):
+    filters = attempts.parse_filters({"since": "2020-02-01", "until": "2020-03-01"})
+    assert [month for month, _ in attempts._months_in_range(db[1], filters)] == ["2020-02"]
+    rows, before_id = attempts.search(*db, filters, limit=10)
+    assert [r["id"] for r in rows] == [7, 6, 5] and before_id is None
+
+
+def test_stored_path_found_in_the_archive(db):
+    for attempt_id in (2, 6, 12):
+        path, total, duration = attempts.replay_path(attempts.stored_path(*db, attempt_id), 10)
+        assert total == 3 and duration == 40
+    with pytest.raises(KeyError):
+        attempts.stored_path(*db, 99)
+
+
+@pytest.mark.parametrize("value", ["[[100, 100, 1", "[[100, 100], [140, 120]]", b"MP\x01\x00"])
+def test_unreadable_stored_path(value):
+    with pytest.raises(ValueError):
+        attempts.replay_path(value, 10)
+
+
+def test_route_answers_422_for_an_unreadable_path(app_module, client):
+    conn = sqlite3.connect(app_module.DB_NAME)
+    cursor = conn.execute("INSERT INTO login_attempts (verdict, trigger_source, mouse_path) "
+                          "VALUES ('BOT', 'ML_Model', '[[100, 100], [140, 120]]')")
+    conn.commit()
+    conn.close()
+    response = client.get(f"/admin/attempts/{cursor.lastrowid}/path")
+    assert response.status_code == 422
+    assert "can't be read" in response.get_json()["error"]
+    assert client.get("/admin/attempts/999999/path").status_code == 404
@@ -0,0 +1,51 @@
+"""Parity of CompiledForest with the scikit-learn forest it was flattened from (model.pkl, training_data.csv)."""
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+
+from compiled_forest import CompiledForest
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope="module")
+def forest():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")   # pickle from an older scikit-learn
+        model = joblib.load(os.path.join(ML_DIR, "model.pkl"))
+    X = np.loadtxt(os.path.join(ML_DIR, "training_data.csv"), delimiter=',', skiprows=1)[:, :6]
+    return model, CompiledForest.from_sklearn(model), X
+
+
+def sklearn_scores(model, X):
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return model.predict(X), model.predict_proba(X)[:, 1]
+
+
+def test_batch_parity(forest):
+    model, engine, X = forest
+    expected_labels, expected = sklearn_scores(model, X)
+    labels, got = engine.predict(X)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(labels, expected_labels)
+
+
+def test_single_row_parity(forest):
+    model, engine, X = forest
+    expected_labels, expected = sklearn_scores(model, X[:50])
+    for row, label, probability in zip(X[:50], expected_labels, expected):
+        got_label, got = engine.predict_one(row.tolist())
+        assert got_label == label
+        assert got == pytest.approx(probability, abs=TOLERANCE)
+
+
+def test_saved_arrays_parity(forest, tmp_path):
+    model, engine, X = forest
+    engine.save(str(tmp_path / "model.forest"))
+    opened, _ = CompiledForest.open(str(tmp_path / "model.forest"))
+    np.testing.assert_array_equal(opened.predict_proba(X), engine.predict_proba(X))
@@ -0,0 +1,158 @@
+"""LogWriter: overflow policies, retries on a locked database, draining on flush/close, the on_commit hook."""
+import sqlite3
+import threading
+
+import pytest
+
+from log_writer import LogWriter
+
+INSERT_SQL = "INSERT INTO events (name) VALUES (?)"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "events.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def make_writer(db_path, **kwargs):
+    return LogWriter(db_path, INSERT_SQL, lambda event: (event["name"],), **kwargs)
+
+
+def stored_names(db_path):
+    conn = sqlite3.connect(db_path)
+    names = [row[0] for row in conn.execute("SELECT name FROM events ORDER BY id")]
+    conn.close()
+    return names
+
+
+class NoWaitWriter(LogWriter):
+    """Fails fast on a locked database, so the retry loop (not busy_timeout) does the waiting."""
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.execute("PRAGMA busy_timeout=0")
+        return conn
+
+
+def test_unknown_overflow_policy_rejected(db_path):
+    with pytest.raises(ValueError):
+        make_writer(db_path, overflow="spill")
+
+
+def test_drop_oldest_keeps_the_newest_events(db_path):
+    writer = make_writer(db_path, max_queue=3, overflow="drop_oldest")
+    results = [writer.submit({"name": f"e{i}"}) for i in range(5)]
+    assert results == [True] * 5
+    writer.start()
+    assert writer.flush()
+    writer.close()
+    assert stored_names(db_path) == ["e2", "e3", "e4"]
+    assert writer.stats()["dropped_overflow"] == 2
+
+
+def test_drop_newest_rejects_when_full(db_path):
+    writer = make_writer(db_path, max_queue=3, overflow="drop_newest")
+    results = [writer.submit({"name": f"e{i}"}) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    writer.start()
+    writer.close()
+    assert stored_names(db_path) == ["e0", "e1", "e2"]
+    assert writer.stats()["dropped_overflow"] == 2
+
+
+def test_block_times_out_when_nothing_drains(db_path):
+    writer = make_writer(db_path, max_queue=1, overflow="block", block_timeout=0.01)
+    assert writer.submit({"name": "a"})
+    assert not writer.submit({"name": "b"})
+    writer.start()
+    # With the writer running the queue drains, so a blocked submit gets through
+    assert writer.submit({"name": "c"})
+    writer.close()
+    assert stored_names(db_path) == ["a", "c"]
+
+
+def test_close_drains_everything_queued(db_path):
+    writer = make_writer(db_path, batch_size=7, flush_ms=5).start()
+    for i in range(100):
+        writer.submit({"name": f"e{i}"})
+    writer.close()
+    assert stored_names(db_path) == [f"e{i}" for i in range(100)]
+    stats = writer.stats()
+    assert stats["written"] == 100 and stats["pending"] == 0
+    assert stats["batches"] >= 100 // 7
+
+
+def test_flush_waits_for_the_commit(db_path):
+    writer = make_writer(db_path, flush_ms=20).start()
+    writer.submit({"name": "a"})
+    assert writer.flush()
+    assert stored_names(db_path) == ["a"]
+    writer.close()
+
+
+def test_on_commit_gets_row_ids_in_order(db_path):
+    committed = []
+    writer = make_writer(db_path, on_commit=committed.extend).start()
+    events = [{"name": f"e{i}"} for i in range(10)]
+    for event in events:
+        writer.submit(event)
+    writer.close()
+    assert [event for _, event in committed] == events
+    conn = sqlite3.connect(db_path)
+    assert [row_id for row_id, _ in committed] == [r[0] for r in conn.execute("SELECT id FROM events ORDER BY id")]
+    conn.close()
+
+
+def test_failing_on_commit_hook_keeps_the_rows(db_path):
+    def hook(committed):
+        raise RuntimeError("subscriber gone")
+
+    writer = make_writer(db_path, on_commit=hook).start()
+    writer.submit({"name": "a"})
+    writer.close()
+    assert stored_names(db_path) == ["a"]
+
+
+def test_bad_event_dropped_alone(db_path):
+    writer = make_writer(db_path).start()
+    writer.submit({"name": "a"})
+    writer.submit({})   # to_row raises KeyError
+    writer.submit({"name": "b"})
+    writer.close()
+    assert stored_names(db_path) == ["a", "b"]
+    assert writer.stats()["dropped_errors"] == 1
+
+
+def test_locked_database_is_retried(db_path):
+    blocker = sqlite3.connect(db_path, check_same_thread=False)
+    blocker.execute("PRAGMA journal_mode=WAL")
+    blocker.execute("BEGIN EXCLUSIVE")
+    writer = NoWaitWriter(db_path, INSERT_SQL, lambda event: (event["name"],), max_retries=5)
+    writer.start()
+    writer.submit({"name": "a"})
+    # Release the lock while the writer is backing off (50 ms, 100 ms, 200 ms, ...)
+    threading.Timer(0.12, blocker.rollback).start()
+    assert writer.flush()
+    writer.close()
+    blocker.close()
+    assert stored_names(db_path) == ["a"]
+    assert writer.stats()["retries"] >= 1
+
+
+def test_batch_dropped_after_max_retries(db_path):
+    blocker = sqlite3.connect(db_path)
+    blocker.execute("PRAGMA journal_mode=WAL")
+    blocker.execute("BEGIN EXCLUSIVE")
+    writer = NoWaitWriter(db_path, INSERT_SQL, lambda event: (event["name"],), max_retries=1).start()
+    writer.submit({"name": "a"})
+    assert writer.flush()
+    writer.close()
+    blocker.rollback()
+    blocker.close()
+    stats = writer.stats()
+    assert stats["retries"] == 1 and stats["dropped_errors"] == 1 and stats["written"] == 0
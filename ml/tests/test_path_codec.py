@@ -0,0 +1,35 @@
+"""path_codec: packed round trip, the JSON fallback for paths that can't be packed, the migration."""
+import sqlite3
+
+import numpy as np
+
+from path_codec import decode_path, encode_path, load_path, migrate, store_path
+
+
+def test_round_trip():
+    path = np.array([[10, 20, 1.7e12], [12.5, 21, 1.7e12 + 16], [15, 19.25, 1.7e12 + 33]])
+    np.testing.assert_array_equal(decode_path(encode_path(path)), path)
+    np.testing.assert_array_equal(load_path(store_path(path.tolist())), path)
+
+
+def test_unpackable_ndarray_falls_back_to_json():
+    path = np.array([[1.0, 2.0, 3.0], [np.nan, 5.0, 6.0]], dtype=np.float32)
+    stored = store_path(path)
+    assert isinstance(stored, str)
+    np.testing.assert_array_equal(load_path(stored), path.astype(np.float64))
+
+
+def test_migrate_skips_malformed_rows(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE login_attempts (id INTEGER PRIMARY KEY, mouse_path TEXT)")
+    conn.executemany("INSERT INTO login_attempts (mouse_path) VALUES (?)",
+                     [("[[1, 2, 3], [4, 5, 6]]",), ("[[1, 2",), ("[[1, 2, 3], [4, 5]]",)])
+    conn.commit()
+
+    report = migrate(db_path)
+    assert report["converted"] == 1 and report["skipped"] == 2
+    values = [row[0] for row in conn.execute("SELECT mouse_path FROM login_attempts ORDER BY id")]
+    conn.close()
+    assert isinstance(values[0], bytes)
+    assert values[1:] == ["[[1, 2", "[[1, 2, 3], [4, 5]]"]
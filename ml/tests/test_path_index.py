@@ -0,0 +1,130 @@
+"""PathIndex across workers (two instances on one directory), compaction on retention and at the cap."""
+import os
+import time
+import sqlite3
+
+import numpy as np
+import pytest
+
+from path_index import DIMS, ENTRY, PathIndex
+from retention import Retention
+
+
+def signatures(n, seed):
+    return np.random.default_rng(seed).normal(0, 1, (n, DIMS)).astype(np.float32)
+
+
+def entries_on_disk(directory):
+    return np.fromfile(os.path.join(directory, "entries.bin"), dtype=ENTRY)
+
+
+def found(index, ids, sigs):
+    return [index.lookup(sig) is not None and index.lookup(sig)[0] == row_id for row_id, sig in zip(ids, sigs)]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "path_index")
+
+
+def test_reopen_loads_entries(directory):
+    sigs = signatures(50, 1)
+    PathIndex(directory).open().add(np.arange(1, 51), sigs)
+    index = PathIndex(directory).open()
+    assert len(index) == 50 and all(found(index, range(1, 51), sigs))
+
+
+def test_tail_reads_other_workers_appends(directory):
+    first, second = PathIndex(directory).open(), PathIndex(directory).open()
+    sigs = signatures(30, 2)
+    first.add(np.arange(1, 21), sigs[:20])
+    assert second.lookup(sigs[0]) is None
+    second.tail()
+    assert len(second) == 20 and all(found(second, range(1, 21), sigs[:20]))
+    # An add takes in what the other worker wrote before appending its own
+    second.add(np.arange(21, 31), sigs[20:])
+    first.add(np.arange(31, 32), signatures(1, 3))
+    assert len(first) == 31 and all(found(first, range(21, 31), sigs[20:]))
+    assert len(entries_on_disk(directory)) == 31
+    assert first.stats()["tailed"] == 10
+
+
+def test_merge_thread_tails(directory):
+    first = PathIndex(directory).open()
+    second = PathIndex(directory).open().start(tail_s=0.02)
+    try:
+        sigs = signatures(5, 4)
+        first.add(np.arange(1, 6), sigs)
+        deadline = time.monotonic() + 2
+        while len(second) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert all(found(second, range(1, 6), sigs))
+    finally:
+        second.close()
+
+
+def test_compact_drops_ids_everywhere(directory):
+    first, second = PathIndex(directory).open(), PathIndex(directory).open()
+    sigs = signatures(40, 5)
+    first.add(np.arange(1, 41), sigs)
+    second.tail()
+
+    assert first.compact(np.arange(1, 11)) == 10
+    assert entries_on_disk(directory)["id"].tolist() == list(range(11, 41))
+    assert not any(found(first, range(1, 11), sigs[:10])) and all(found(first, range(11, 41), sigs[10:]))
+
+    # The other worker finds entries.bin replaced and reloads it
+    second.tail()
+    assert len(second) == 30 and second.stats()["reloads"] == 1
+    assert not any(found(second, range(1, 11), sigs[:10]))
+    second.add(np.arange(41, 42), signatures(1, 6))
+    assert entries_on_disk(directory)["id"].tolist() == list(range(11, 42))
+
+
+def test_cap_keeps_the_newest(directory):
+    index = PathIndex(directory, max_entries=100).open()
+    sigs = signatures(130, 7)
+    for start in range(0, 130, 10):
+        index.add(np.arange(start + 1, start + 11), sigs[start:start + 10])
+    # 130 > 100 * 1.25: compacted back to the newest 100 once it passed 125
+    assert len(index) <= 125 and index.stats()["compactions"] == 1
+    ids = entries_on_disk(directory)["id"]
+    assert ids[0] > 1 and ids[-1] == 130 and len(ids) == len(index)
+    assert all(found(index, range(121, 131), sigs[120:]))
+    assert index.lookup(sigs[0]) is None
+
+
+def test_cap_in_memory_only():
+    index = PathIndex(max_entries=10)
+    sigs = signatures(20, 8)
+    index.add(np.arange(1, 21), sigs)
+    assert len(index) == 10 and all(found(index, range(11, 21), sigs[10:]))
+
+
+def test_partial_record_truncated(directory):
+    PathIndex(directory).open().add(np.arange(1, 4), signatures(3, 9))
+    with open(os.path.join(directory, "entries.bin"), "ab") as f:
+        f.write(b"\x01\x02\x03")   # a worker killed mid-write
+    index = PathIndex(directory).open()
+    index.add(np.arange(4, 5), signatures(1, 10))
+    assert entries_on_disk(directory)["id"].tolist() == [1, 2, 3, 4]
+
+
+def test_retention_prunes_archived_ids(tmp_path, directory):
+    db_path = str(tmp_path / "database.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('''CREATE TABLE login_attempts (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp DATETIME,
+                    verdict TEXT, confidence_score REAL, trigger_source TEXT, fail_reason TEXT, mouse_path TEXT,
+                    window_dims TEXT, ip_address TEXT, input_timings TEXT, label INTEGER)''')
+    conn.executemany("INSERT INTO login_attempts (timestamp, verdict) VALUES (datetime(?), 'BOT')",
+                     [("2020-01-10 10:00:00",)] * 3 + [("now",)] * 2)
+    conn.commit()
+    conn.close()
+    index = PathIndex(directory).open()
+    sigs = signatures(5, 11)
+    index.add(np.arange(1, 6), sigs)
+
+    retention = Retention(db_path, str(tmp_path / "archive"), path_days=30, row_days=30, on_archive=index.compact)
+    assert retention.run_once()["rows_archived"] == 3
+    assert entries_on_disk(directory)["id"].tolist() == [4, 5]
+    assert found(index, range(1, 6), sigs) == [False, False, False, True, True]
@@ -0,0 +1,51 @@
+"""ReplayCache: memory cap against tracemalloc, byte accounting through overwrites and expiry."""
+import os
+import tracemalloc
+
+import replay_cache
+from replay_cache import ReplayCache, entry_bytes
+
+
+def result(i):
+    return {"verdict": "BOT" if i % 2 else "HUMAN", "confidence_score": float(i % 100) + 0.5,
+            "efficiency": 0.5 + i * 1e-7, "curvature": 3.0 + i * 1e-6}
+
+
+def test_memory_cap_holds_against_tracemalloc():
+    cap = 4 * 1024 * 1024
+    tracemalloc.start()
+    try:
+        cache = ReplayCache(max_entries=10 ** 7, max_bytes=cap)
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(30000):
+            cache.put(os.urandom(16), result(i))
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    stats = cache.stats()
+    assert stats["bytes"] <= cap and stats["evicted_capacity"] > 0
+    # sys.getsizeof leaves out allocator rounding: within 10% of the cap
+    assert held <= cap * 1.10
+
+
+def test_bytes_follow_overwrites_and_expiry(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(replay_cache.time, "monotonic", lambda: now[0])
+    cache = ReplayCache(ttl_s=10)
+    keys = [bytes([i]) * 16 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, result(i))
+    cache.put(keys[0], result(7))
+    assert cache.stats()["bytes"] == sum(entry_bytes(k, r) for k, r in zip(keys, (result(7), result(1), result(2))))
+
+    now[0] = 11
+    assert cache.get(keys[1]) is None
+    assert cache.stats()["bytes"] == entry_bytes(keys[0], result(7)) + entry_bytes(keys[2], result(2))
+
+
+def test_hit_counts_repeats():
+    cache = ReplayCache()
+    cache.put(b"k" * 16, result(1))
+    assert cache.get(b"k" * 16) == (result(1), 1)
+    assert cache.get(b"k" * 16) == (result(1), 2)
+    assert cache.get(b"x" * 16) is None
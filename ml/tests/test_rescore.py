@@ -0,0 +1,65 @@
+"""rescore.py: only model-scored rows are read; undecodable or [x, y] paths are skipped, not fatal."""
+import os
+import json
+import sqlite3
+import warnings
+
+import pytest
+
+import rescore
+from path_codec import store_path
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMINGS = json.dumps({"click_timestamps": [1.7e12 + 900], "keystroke_timestamps": []})
+GOOD_PATH = [[100, 100, 1.7e12], [140, 120, 1.7e12 + 16], [200, 180, 1.7e12 + 40]]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def engine():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")   # pickle from an older scikit-learn
+        rescore._init_worker(os.path.join(ML_DIR, "model.pkl"))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "database.db")
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE login_attempts (id INTEGER PRIMARY KEY AUTOINCREMENT, verdict TEXT,
+                    confidence_score REAL, trigger_source TEXT, mouse_path TEXT, input_timings TEXT)''')
+    rows = [
+        ("HUMAN", 10.0, "ML_Model", store_path(GOOD_PATH), TIMINGS),
+        ("BOT", 100.0, "Honeypot", store_path(GOOD_PATH), TIMINGS),
+        ("BOT", 90.0, "ML_Model", "[[100, 100], [140, 120]]", TIMINGS),   # legacy [x, y] pairs
+        ("BOT", 90.0, "ML_Model", "[[100, 100, 1", TIMINGS),              # cut-off JSON
+        ("BOT", 90.0, "ML_Model", b"MP\x01\x00", TIMINGS),                # truncated BLOB
+        ("HUMAN", 20.0, "ML_Model", store_path(GOOD_PATH), None),          # before input_timings
+        ("HUMAN", 15.0, "ReplayCache", store_path(GOOD_PATH), TIMINGS),
+    ]
+    conn.executemany("INSERT INTO login_attempts (verdict, confidence_score, trigger_source, mouse_path, input_timings) "
+                     "VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def all_rows(db_path):
+    return [row for chunk in rescore.db_chunks(db_path, 0, 2) for row in chunk]
+
+
+def test_only_model_rows_are_read(db_path):
+    assert [row[0] for row in all_rows(db_path)] == [1, 3, 4, 5, 6]
+
+
+def test_unreadable_paths_counted_as_skipped(db_path):
+    scored, skipped = rescore.score_chunk("db", all_rows(db_path), include_legacy=False)
+    assert [key for (key, _, _, _), _, _ in scored] == [1]
+    assert skipped == 4
+
+
+def test_legacy_rows_scored_with_include_legacy(db_path):
+    scored, skipped = rescore.score_chunk("db", all_rows(db_path), include_legacy=True)
+    assert [key for (key, _, _, _), _, _ in scored] == [1, 6]
+    assert skipped == 3
+    assert all(new in ("HUMAN", "BOT") and 0 <= score <= 100 for _, new, score in scored)
+
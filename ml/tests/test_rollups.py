@@ -0,0 +1,66 @@
+"""rollups.backfill keeps the counts of rows retention has moved to the archive partitions."""
+import sqlite3
+
+import rollups
+from retention import Retention, open_partition
+
+SCHEMA = '''
+    CREATE TABLE login_attempts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        verdict TEXT, confidence_score REAL, trigger_source TEXT, fail_reason TEXT,
+        mouse_path TEXT, window_dims TEXT, ip_address TEXT, input_timings TEXT, label INTEGER
+    )
+'''
+
+
+def make_db(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(SCHEMA)
+    rollups.ensure_rollups(conn)
+    rows = [("2020-01-15 10:00:00", "BOT", "Honeypot", "Middle Name Filled")] * 3 \
+        + [("2020-02-01 08:30:00", "HUMAN", "ML_Model", None)] * 2 \
+        + [("now", "BOT", "SpeedTrap", "Too Fast")] * 4
+    for timestamp, verdict, trigger, reason in rows:
+        conn.execute("INSERT INTO login_attempts (timestamp, verdict, trigger_source, fail_reason) "
+                     "VALUES (datetime(?), ?, ?, ?)", (timestamp, verdict, trigger, reason))
+    return db_path, conn
+
+
+def totals(conn):
+    return dict(conn.execute("SELECT trigger_source, SUM(attempts) FROM attempt_rollups GROUP BY 1").fetchall())
+
+
+def test_backfill_counts_archived_rows(tmp_path):
+    db_path, conn = make_db(tmp_path)
+    archive_dir = str(tmp_path / "archive")
+    before = totals(conn)
+    assert before == {"Honeypot": 3, "ML_Model": 2, "SpeedTrap": 4}
+
+    Retention(db_path, archive_dir, path_days=30, row_days=30).run_once()
+    assert conn.execute("SELECT COUNT(*) FROM login_attempts").fetchone()[0] == 4
+
+    rollups.backfill(conn, archive_dir)
+    assert totals(conn) == before
+    # Without the archive only the live rows are left
+    rollups.backfill(conn)
+    assert totals(conn) == {"SpeedTrap": 4}
+    conn.close()
+
+
+def test_row_in_archive_and_live_counted_once(tmp_path):
+    db_path, conn = make_db(tmp_path)
+    archive_dir = str(tmp_path / "archive")
+    # A retention pass that copied a row to the archive but stopped before deleting it
+    row = conn.execute("SELECT id, timestamp, verdict, trigger_source, fail_reason FROM login_attempts "
+                       "WHERE trigger_source = 'Honeypot' LIMIT 1").fetchone()
+    archive = open_partition(archive_dir, "2020-01")
+    archive.execute("INSERT INTO login_attempts (id, timestamp, verdict, trigger_source, fail_reason) "
+                    "VALUES (?, ?, ?, ?, ?)", row)
+    archive.commit()
+    archive.close()
+
+    rollups.backfill(conn, archive_dir)
+    assert totals(conn) == {"Honeypot": 3, "ML_Model": 2, "SpeedTrap": 4}
+    conn.close()
@@ -0,0 +1,121 @@
+"""Streaming sessions: running features vs extract_features, chunk ordering, eviction."""
+import numpy as np
+import pytest
+
+import sessions
+from features import extract_features
+from sessions import RunningFeatures, Session, SessionStore
+
+
+def human_path(n, seed):
+    """Curved path with jitter, 8-24 ms sampling and some repeated timestamps and pauses."""
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.2, n))
+    step = rng.gamma(2.0, 2.0, n)
+    step[rng.random(n) < 0.05] = 0   # the pointer resting
+    xy = np.cumsum(np.column_stack([np.cos(heading), np.sin(heading)]) * step[:, None], axis=0)
+    dt = rng.integers(8, 24, n)
+    dt[rng.random(n) < 0.03] = 0
+    return np.column_stack([np.round(xy + 500), 1.76e12 + np.cumsum(dt)])
+
+
+def chunked(path, sizes):
+    start = 0
+    for size in sizes:
+        yield path[start:start + size]
+        start += size
+    if start < len(path):
+        yield path[start:]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("sizes", [[1] * 400, [2, 3, 1, 7], [50] * 8, [399], [1, 398]])
+def test_running_features_match_extract_features(seed, sizes):
+    path = human_path(400, seed)
+    running = RunningFeatures()
+    for chunk in chunked(path, sizes):
+        running.update(chunk)
+    expected = extract_features({"mouse_path": path})[:4]
+    assert running.n_points == len(path)
+    np.testing.assert_allclose(running.path_features(), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_empty_chunks_and_too_few_points():
+    running = RunningFeatures()
+    running.update(np.empty((0, 3)))
+    assert running.path_features() is None and running.n_points == 0
+    running.update([[1, 2, 3]])
+    assert running.path_features() is None and running.n_points == 1
+    running.update([[4, 6, 13]])
+    np.testing.assert_allclose(running.path_features(), extract_features({"mouse_path": [[1, 2, 3], [4, 6, 13]]})[:4])
+
+
+def test_duplicate_chunk_ignored():
+    session = Session("s")
+    block = np.array([[1, 2, 3], [4, 5, 6]], dtype=float)
+    assert session.add_chunk(0, block, 100) == "applied"
+    assert session.add_chunk(0, block, 100) == "duplicate"
+    assert session.features.n_points == 2
+    assert session.replay_path() == block.tolist()
+
+
+def test_gap_rejected_until_the_missing_chunk_arrives():
+    session = Session("s")
+    path = human_path(30, 1)
+    assert session.add_chunk(0, path[:10], 100) == "applied"
+    assert session.add_chunk(2, path[20:], 100) == "gap"
+    assert session.next_seq == 1 and session.features.n_points == 10
+    assert session.add_chunk(1, path[10:20], 100) == "applied"
+    assert session.add_chunk(2, path[20:], 100) == "applied"
+    np.testing.assert_allclose(session.features.path_features(), extract_features({"mouse_path": path})[:4])
+
+
+def test_replay_path_capped():
+    session = Session("s")
+    path = human_path(30, 2)
+    session.add_chunk(0, path[:20], 25)
+    session.add_chunk(1, path[20:], 25)
+    assert len(session.replay_path()) == 25
+    assert session.features.n_points == 30   # features still see every point
+
+
+def test_store_counts_chunks_and_gaps():
+    store = SessionStore()
+    session = store.start()
+    block = np.array([[1, 2, 3]], dtype=float)
+    assert store.add_chunk(session, 0, block) == "applied"
+    assert store.add_chunk(session, 0, block) == "duplicate"
+    assert store.add_chunk(session, 5, block) == "gap"
+    stats = store.stats()
+    assert stats["chunks"] == 1 and stats["chunk_gaps"] == 1
+
+
+def test_ttl_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions.time, "monotonic", lambda: now[0])
+    store = SessionStore(ttl_s=10)
+    idle, active = store.start(), store.start()
+    now[0] += 6
+    assert store.get(active.id) is active   # touching it keeps it alive
+    now[0] += 6
+    assert store.get(idle.id) is None
+    assert store.get(active.id) is active
+    assert store.stats()["evicted_ttl"] == 1
+
+
+def test_capacity_evicts_least_recently_touched():
+    store = SessionStore(max_sessions=2)
+    first, second = store.start(), store.start()
+    store.get(first.id)
+    third = store.start()
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first and store.get(third.id) is third
+    assert store.stats()["evicted_capacity"] == 1
+
+
+def test_pop_finalizes_once():
+    store = SessionStore()
+    session = store.start()
+    assert store.pop(session.id) is session
+    assert store.pop(session.id) is None
+    assert store.stats()["finalized"] == 1
@@ -0,0 +1,48 @@
+"""train.pick_within_budget: the best-ranked candidate that fits the latency budget wins."""
+import numpy as np
+
+import train
+
+# Three candidates, best CV score first by rank: the biggest forest, then the mid one, then the small one
+CV_RESULTS = {
+    "params": [{"n_estimators": 3}, {"n_estimators": 40}, {"n_estimators": 20}],
+    "rank_test_score": np.array([3, 1, 2]),
+    "mean_test_score": np.array([0.90, 0.99, 0.95]),
+}
+
+
+def data(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 6))
+    return X, (X[:, 0] + rng.normal(0, 0.5, n) > 0).astype(int)
+
+
+def fake_latency(model, X):
+    # Deterministic stand-in for the timing: 0.01 ms per tree
+    p99 = model.n_estimators * 0.01
+    return {"compiled": {"p50_ms": p99 / 2, "p99_ms": p99}, "sklearn": {}, "nodes": 0, "depth": 0}
+
+
+def pick(budget_ms, monkeypatch):
+    monkeypatch.setattr(train, "single_row_latency", fake_latency)
+    X, y = data()
+    return train.pick_within_budget(CV_RESULTS, X, y, X, budget_ms, seed=0, jobs=1)
+
+
+def test_best_candidate_when_it_fits(monkeypatch):
+    model, latency, index, over_budget = pick(1.0, monkeypatch)
+    assert index == 1 and model.n_estimators == 40 and over_budget == []
+    assert model.n_jobs is None
+
+
+def test_skips_candidates_over_budget(monkeypatch):
+    model, latency, index, over_budget = pick(0.25, monkeypatch)
+    assert index == 2 and model.n_estimators == 20
+    assert over_budget == [(1, 0.4)]
+    assert latency["compiled"]["p99_ms"] <= 0.25
+
+
+def test_none_when_every_candidate_is_over(monkeypatch):
+    model, latency, index, over_budget = pick(0.01, monkeypatch)
+    assert model is None and index is None
+    assert [i for i, _ in over_budget] == [1, 2, 0]
@@ -0,0 +1,127 @@
+"""wire.py round trips and rejects, and /predict answering 400 (not 500) for bodies it can't read."""
+import json
+import struct
+
+import numpy as np
+import pytest
+
+import wire
+from wire import HEADER, WIRE_MIMETYPE, decode, encode
+
+PAYLOAD = {
+    "mouse_path": [[600, 400, 1.76e12], [604, 398, 1.76e12 + 16], [611, 390, 1.76e12 + 33]],
+    "click_timestamps": [1.76e12 + 500],
+    "keystroke_timestamps": [1.76e12 + 120, 1.76e12 + 310],
+    "screen_width": 1920,
+    "screen_height": 1080,
+}
+
+
+# --- FORMAT ---
+def test_round_trip():
+    decoded = decode(encode(PAYLOAD, seq=4))
+    np.testing.assert_array_equal(decoded["mouse_path"], np.array(PAYLOAD["mouse_path"]))
+    assert decoded["click_timestamps"] == [int(v) for v in PAYLOAD["click_timestamps"]]
+    assert decoded["keystroke_timestamps"] == [int(v) for v in PAYLOAD["keystroke_timestamps"]]
+    assert (decoded["screen_width"], decoded["screen_height"], decoded["seq"]) == (1920, 1080, 4)
+
+
+def test_fractional_coordinates_use_float32():
+    payload = dict(PAYLOAD, mouse_path=[[600.5, 400.25, 1.76e12], [604.75, 398.5, 1.76e12 + 16]])
+    body = encode(payload)
+    assert HEADER.unpack_from(body)[2] & wire.FLAG_XY_FLOAT32
+    np.testing.assert_array_equal(decode(body)["mouse_path"], np.array(payload["mouse_path"]))
+
+
+def test_empty_payload():
+    decoded = decode(encode({}))
+    assert decoded["mouse_path"].shape == (0, 3)
+    assert decoded["click_timestamps"] == [] and decoded["seq"] is None
+
+
+def test_truncated_body():
+    body = encode(PAYLOAD)
+    with pytest.raises(ValueError, match="header describes"):
+        decode(body[:-1])
+    with pytest.raises(ValueError, match="shorter than"):
+        decode(body[:HEADER.size - 1])
+
+
+def test_bad_magic_and_version():
+    body = encode(PAYLOAD)
+    with pytest.raises(ValueError, match="magic"):
+        decode(b"XX" + body[2:])
+    with pytest.raises(ValueError, match="version"):
+        decode(body[:2] + bytes([wire.VERSION + 1]) + body[3:])
+
+
+def test_point_count_mismatch():
+    body = bytearray(encode(PAYLOAD))
+    struct.pack_into('<I', body, 4, len(PAYLOAD["mouse_path"]) + 1)
+    with pytest.raises(ValueError, match="header describes"):
+        decode(bytes(body))
+
+
+def test_non_finite_values():
+    body = bytearray(encode(PAYLOAD))
+    struct.pack_into('<d', body, HEADER.size - 8, float("nan"))
+    with pytest.raises(ValueError, match="t0"):
+        decode(bytes(body))
+    nan_xy = dict(PAYLOAD, mouse_path=[[np.nan, 1.5, 1.76e12], [2.5, 3.5, 1.76e12 + 16]])
+    with pytest.raises(ValueError, match="non-finite"):
+        decode(encode(nan_xy, xy_float32=True))
+
+
+def test_encode_rejects_int32_overflow():
+    with pytest.raises(ValueError, match="int32"):
+        encode(dict(PAYLOAD, click_timestamps=[1.76e12 + 2 ** 32]))
+
+
+# --- /predict ---
+def post_wire(client, body, **headers):
+    return client.post("/predict", data=body, content_type=WIRE_MIMETYPE, headers=headers)
+
+
+def post_json(client, body):
+    return client.post("/predict", data=json.dumps(body), content_type="application/json")
+
+
+def test_predict_scores_wire_and_json(client):
+    for response in (post_wire(client, encode(PAYLOAD)), post_json(client, PAYLOAD)):
+        assert response.status_code == 200
+        assert "is_bot" in response.get_json()
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda body: body[:-3],
+    lambda body: body[:10],
+    lambda body: b"",
+    lambda body: b"XX" + body[2:],
+    lambda body: body[:2] + b"\x09" + body[3:],
+    lambda body: body[:4] + struct.pack('<I', 1000) + body[8:],
+])
+def test_predict_malformed_wire_body_is_400(client, mangle):
+    response = post_wire(client, mangle(encode(PAYLOAD)))
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Bad telemetry body")
+
+
+def test_predict_bad_signals_header_is_400(client):
+    assert post_wire(client, encode(PAYLOAD), **{"X-Client-Signals": "{"}).status_code == 400
+
+
+@pytest.mark.parametrize("body", [
+    [1, 2, 3],
+    dict(PAYLOAD, mouse_path=5),
+    dict(PAYLOAD, mouse_path={"x": 1}),
+    dict(PAYLOAD, mouse_path=[["a", "b", "c"]] * 3),
+    dict(PAYLOAD, mouse_path=[[1, 2, 3], [1, 2]]),
+    dict(PAYLOAD, mouse_path=[[1, 2], [3, 4], [5, 6]]),
+    dict(PAYLOAD, mouse_path=[[None, 2, 3]] * 3),
+    dict(PAYLOAD, click_timestamps="x"),
+    dict(PAYLOAD, keystroke_timestamps=["a", "b"]),
+])
+def test_predict_malformed_json_body_is_400(client, body):
+    response = post_json(client, body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,255 @@
+"""
+Training pipeline: training_data.csv (+ reviewed database rows) -> versioned model.
+
+    python train.py                                  # CSV only, default grid
+    python train.py --db database.db --jobs 8        # also rows with a `label`
+    python train.py --grid '{"n_estimators": [100, 200], "max_depth": [null, 8]}'
+
+Steps:
+  1. load the six features (features.FEATURE_NAMES) and labels. Database rows
+     need a label and input_timings; their features come from features.py
+  2. stratified hold-out split, then a cross-validated grid search over
+     RandomForestClassifier, parallel over candidates x folds (--jobs)
+  3. walk the candidates from the best CV score down, fit each on the
+     training split and time single-row inference of its compiled forest
+     (what /predict runs); the first within --latency-budget-ms is the
+     model. If none is, stop without writing anything
+  4. write models/model-<version>.pkl and a .json sidecar with the feature
+     order, parameters, CV and hold-out metrics, training time, latency,
+     data digest and library versions
+
+Every random step is seeded (--seed), so the same data and grid give the
+same model. Nothing here touches the live model.pkl.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import platform
+from datetime import datetime, timezone
+import numpy as np
+import joblib
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+
+from compiled_forest import CompiledForest
+from features import FEATURE_NAMES, extract_features_batch
+from path_codec import load_path
+
+DEFAULT_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [None, 5, 10],
+    "min_samples_leaf": [1, 3],
+}
+
+
+# --- DATA ---
+def load_csv(path):
+    """(X, y) from a training_data.csv-shaped file; columns are matched by name."""
+    with open(path) as f:
+        header = f.readline().strip().split(',')
+    data = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    X = data[:, [header.index(name) for name in FEATURE_NAMES]]
+    y = data[:, header.index('label')].astype(int)
+    return X, y
+
+
+def load_db(db_path, chunk=2000):
+    """(X, y) from reviewed login_attempts rows (label set, input_timings stored)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(login_attempts)")]
+    if 'label' not in columns:
+        conn.close()
+        print(f"⚠️ {db_path} has no label column yet (start app.py once); using the CSV only")
+        return np.empty((0, len(FEATURE_NAMES))), np.empty(0, dtype=int)
+
+    blocks, labels = [], []
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, mouse_path, input_timings, label FROM login_attempts
+            WHERE id > ? AND label IS NOT NULL AND input_timings IS NOT NULL
+            ORDER BY id LIMIT ?
+        ''', (last_id, chunk)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        payloads = []
+        for _, mouse_path, timings, _ in rows:
+            payload = {"mouse_path": load_path(mouse_path) if mouse_path is not None else np.empty((0, 3))}
+            payload.update(json.loads(timings))
+            payloads.append(payload)
+        blocks.append(extract_features_batch(payloads))
+        labels.extend(int(r[3]) for r in rows)
+    conn.close()
+    if not blocks:
+        return np.empty((0, len(FEATURE_NAMES))), np.empty(0, dtype=int)
+    return np.vstack(blocks), np.array(labels)
+
+
+def data_digest(X, y):
+    """sha256 of the exact training matrix, to tell later whether two runs saw the same data."""
+    h = hashlib.sha256(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(y, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+# --- EVALUATION ---
+def holdout_metrics(model, X, y):
+    labels = model.predict(X)
+    proba = model.predict_proba(X)[:, 1]
+    return {
+        "accuracy": accuracy_score(y, labels),
+        "precision": precision_score(y, labels, zero_division=0),
+        "recall": recall_score(y, labels, zero_division=0),
+        "f1": f1_score(y, labels, zero_division=0),
+        "roc_auc": roc_auc_score(y, proba) if len(set(y)) > 1 else None,
+        "rows": int(len(y)),
+    }
+
+
+def single_row_latency(model, X, repeats=500):
+    """p50 / p99 ms for one row through the compiled forest, and through sklearn for reference."""
+    engine = CompiledForest.from_sklearn(model)
+    rows = X[np.arange(repeats) % len(X)]
+
+    def percentiles(fn):
+        times = np.empty(repeats)
+        for i, row in enumerate(rows):
+            start = time.perf_counter()
+            fn(row)
+            times[i] = (time.perf_counter() - start) * 1000
+        return {"p50_ms": float(np.percentile(times, 50)), "p99_ms": float(np.percentile(times, 99))}
+
+    compiled = percentiles(engine.predict_one)
+    reference = percentiles(lambda row: model.predict_proba(row[None, :]))
+    return {"compiled": compiled, "sklearn": reference, "nodes": int(len(engine.feature)), "depth": int(engine.depth)}
+
+
+def pick_within_budget(cv_results, X_train, y_train, X_test, budget_ms, seed, jobs):
+    """Best-ranked candidate whose compiled p99 fits the budget.
+
+    Returns (model, latency, index, over_budget) with over_budget the skipped
+    [(index, p99_ms)]; model and index are None if every candidate is over.
+    """
+    over_budget = []
+    for index in np.argsort(cv_results["rank_test_score"], kind="stable"):
+        params = cv_results["params"][index]
+        model = RandomForestClassifier(random_state=seed, n_jobs=jobs, **params).fit(X_train, y_train)
+        model.set_params(n_jobs=None)  # serving scores one row at a time; no worker pool per call
+        latency = single_row_latency(model, X_test)
+        p99 = latency["compiled"]["p99_ms"]
+        print(f"  #{cv_results['rank_test_score'][index]} {params}: compiled p99 {p99:.3f} ms"
+              + ("" if p99 <= budget_ms else " (over budget)"))
+        if p99 <= budget_ms:
+            return model, latency, int(index), over_budget
+        over_budget.append((int(index), p99))
+    return None, None, None, over_budget
+
+
+if __name__ == '__main__':
+    import warnings
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    parser = argparse.ArgumentParser(description="Train a versioned RandomForest model")
+    parser.add_argument('--data', default='training_data.csv')
+    parser.add_argument('--db', default=None, help="also train on labeled rows of this database")
+    parser.add_argument('--out-dir', default='models')
+    parser.add_argument('--grid', default=None, help="JSON parameter grid (default: DEFAULT_GRID)")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--scoring', default='roc_auc')
+    parser.add_argument('--holdout', type=float, default=0.2)
+    parser.add_argument('--jobs', type=int, default=-1, help="parallel workers for the search and the final fit")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency-budget-ms', type=float,
+                        default=float(os.environ.get("MODEL_LATENCY_BUDGET_MS", 2.0)),
+                        help="max p99 single-row latency of the compiled forest")
+    args = parser.parse_args()
+
+    X, y = load_csv(args.data)
+    sources = {"csv": {"path": args.data, "rows": int(len(y))}}
+    if args.db:
+        X_db, y_db = load_db(args.db)
+        X, y = np.vstack([X, X_db]), np.concatenate([y, y_db])
+        sources["db"] = {"path": args.db, "rows": int(len(y_db))}
+    summary = ', '.join(f"{k}: {v['rows']}" for k, v in sources.items())
+    print(f"Rows: {len(y)} ({summary}) | bots: {int(y.sum())}")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.holdout, stratify=y, random_state=args.seed)
+    grid = json.loads(args.grid) if args.grid else DEFAULT_GRID
+    search = GridSearchCV(
+        RandomForestClassifier(random_state=args.seed),
+        grid,
+        cv=StratifiedKFold(args.folds, shuffle=True, random_state=args.seed),
+        scoring=args.scoring,
+        n_jobs=args.jobs,
+        refit=False,  # the winner is refit below, once it is known to fit the latency budget
+    )
+    start = time.perf_counter()
+    search.fit(X_train, y_train)
+    search_s = time.perf_counter() - start
+    results = search.cv_results_
+    candidates = len(results["params"])
+    print(f"Search: {candidates} candidates x {args.folds} folds in {search_s:.1f} s | "
+          f"best {args.scoring} {search.best_score_:.4f} with {search.best_params_}")
+
+    print(f"Latency budget: compiled p99 <= {args.latency_budget_ms} ms")
+    model, latency, chosen, over_budget = pick_within_budget(
+        results, X_train, y_train, X_test, args.latency_budget_ms, args.seed, args.jobs)
+    if model is None:
+        print(f"❌ All {candidates} candidates are over the {args.latency_budget_ms} ms p99 budget; "
+              f"no artifact written (add smaller forests to the grid or raise --latency-budget-ms)")
+        sys.exit(1)
+    chosen_score = float(results["mean_test_score"][chosen])
+    if over_budget:
+        print(f"⚠️ {len(over_budget)} better-scoring candidate(s) over budget; using {results['params'][chosen]} "
+              f"({args.scoring} {chosen_score:.4f} vs best {search.best_score_:.4f})")
+
+    metrics = holdout_metrics(model, X_test, y_test)
+    print("Hold-out: " + " | ".join(f"{k} {v:.4f}" for k, v in metrics.items() if isinstance(v, float)))
+    print(f"Latency (1 row): compiled p50 {latency['compiled']['p50_ms']:.3f} ms, p99 {latency['compiled']['p99_ms']:.3f} ms "
+          f"| sklearn p50 {latency['sklearn']['p50_ms']:.3f} ms | {latency['nodes']} nodes, depth {latency['depth']}")
+
+    digest = data_digest(X, y)
+    created = datetime.now(timezone.utc)
+    version = f"{created.strftime('%Y%m%d-%H%M%S')}-{digest[:8]}"
+    os.makedirs(args.out_dir, exist_ok=True)
+    artifact = os.path.join(args.out_dir, f"model-{version}.pkl")
+    joblib.dump(model, artifact)
+
+    metadata = {
+        "version": version,
+        "artifact": os.path.basename(artifact),
+        "created_at": created.isoformat(timespec='seconds'),
+        "feature_names": FEATURE_NAMES,
+        "classes": [int(c) for c in model.classes_],
+        "params": model.get_params(),
+        "search": {
+            "grid": grid,
+            "scoring": args.scoring,
+            "folds": args.folds,
+            "candidates": candidates,
+            "best_score": float(search.best_score_),
+            "best_params": search.best_params_,
+            "chosen_score": chosen_score,
+            "chosen_params": results["params"][chosen],
+            "over_budget": [{"params": results["params"][i], "score": float(results["mean_test_score"][i]),
+                             "p99_ms": p99} for i, p99 in over_budget],
+        },
+        "holdout": metrics,
+        "training_seconds": search_s,
+        "latency": dict(latency, budget_p99_ms=args.latency_budget_ms),
+        "data": {"sources": sources, "rows": int(len(y)), "sha256": digest, "holdout_fraction": args.holdout},
+        "seed": args.seed,
+        "versions": {"python": platform.python_version(), "numpy": np.__version__,
+                     "scikit-learn": sklearn.__version__, "joblib": joblib.__version__},
+    }
+    with open(os.path.splitext(artifact)[0] + ".json", "w") as f:
+        json.dump(metadata, f, indent=2)
+    print(f"✅ Wrote {artifact} (+ .json metadata)")
@@ -0,0 +1,180 @@
+"""
+Trajectory normalization in front of extract_features.
+
+A client can post a path of any size, and every point costs an array
+conversion, a curvature term and bytes in the log. normalize_path bounds
+that cost:
+
+  1. dedupe:     points sharing a timestamp collapse to the last one
+                 (dt = 0 otherwise turns into a 1000x speed spike)
+  2. downsample: above `max_points`, keep the shape with
+                 'rdp'    Ramer-Douglas-Peucker (spatial tolerance, then
+                          time buckets if still too long), or
+                 'bucket' last point per equal-width time bucket
+The first and last points are always kept, so movement_time and the
+straight-line distance are unchanged.
+
+Measure how limits move the six features and the verdicts:
+    python trajectory.py --evaluate [database.db] --limits 250,500,1000
+    python trajectory.py --evaluate --synthetic 300
+"""
+import time
+import argparse
+import numpy as np
+
+METHODS = ("rdp", "bucket")
+
+
+def dedupe_timestamps(arr):
+    """Keeps the last point of every run of equal timestamps."""
+    if len(arr) < 2:
+        return arr
+    keep = np.empty(len(arr), dtype=bool)
+    keep[:-1] = arr[1:, 2] != arr[:-1, 2]
+    keep[-1] = True
+    return arr if keep.all() else arr[keep]
+
+
+def bucket_resample(arr, max_points):
+    """Last point in each of (max_points - 1) equal time buckets, plus the first point."""
+    if len(arr) <= max_points:
+        return arr
+    t = arr[:, 2]
+    span = t[-1] - t[0]
+    if span <= 0:
+        idx = np.linspace(0, len(arr) - 1, max_points).astype(int)
+        return arr[np.unique(idx)]
+    buckets = np.minimum(((t - t[0]) / span * (max_points - 1)).astype(int), max_points - 2)
+    # Index of the last point in every bucket (buckets are non-decreasing along the path)
+    last_in_bucket = np.flatnonzero(np.append(buckets[1:] != buckets[:-1], True))
+    return arr[np.union1d([0], last_in_bucket)]
+
+
+def rdp_mask(xy, epsilon):
+    """Ramer-Douglas-Peucker keep-mask, iterative so long paths can't hit the recursion limit."""
+    keep = np.zeros(len(xy), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(xy) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a = xy[start]
+        seg = xy[end] - a
+        seg_len = np.hypot(seg[0], seg[1])
+        rel = xy[start + 1:end] - a
+        if seg_len == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        i = int(dist.argmax())
+        if dist[i] > epsilon:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return keep
+
+
+def rdp_resample(arr, max_points, epsilon=1.0):
+    if len(arr) <= max_points:
+        return arr
+    # Cap RDP's own (worst-case quadratic) input first
+    arr = bucket_resample(arr, max_points * 4)
+    arr = arr[rdp_mask(arr[:, :2], epsilon)]
+    return bucket_resample(arr, max_points)
+
+
+def normalize_path(path, max_points=1000, dedupe=True, method="rdp", epsilon=1.0):
+    """Returns the normalized (n, 3) float array. The input is never modified."""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    arr = np.asarray(path, dtype=np.float64)
+    if arr.ndim != 2 or len(arr) < 3:
+        return arr
+    arr = arr[:, :3]
+    if dedupe:
+        arr = dedupe_timestamps(arr)
+    if method == "rdp":
+        return rdp_resample(arr, max_points, epsilon)
+    return bucket_resample(arr, max_points)
+
+
+# --- EVALUATION: FEATURE DRIFT & VERDICT FLIPS PER LIMIT ---
+def _synthetic_paths(count, seed=7):
+    """Long human-like paths: curved drift, jitter, 8-24 ms sampling, occasional repeated timestamps."""
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        n = int(rng.integers(1500, 20000))
+        heading = np.cumsum(rng.normal(0, 0.15, n))
+        step = rng.gamma(2.0, 2.0, n)
+        xy = np.cumsum(np.column_stack([np.cos(heading), np.sin(heading)]) * step[:, None], axis=0)
+        xy = np.round(xy + rng.normal(0, 0.7, (n, 2)) + 600)
+        dt = rng.integers(8, 24, n)
+        dt[rng.random(n) < 0.03] = 0
+        yield np.column_stack([xy, 1.76e12 + np.cumsum(dt)])
+
+
+def _db_paths(db_path, min_points):
+    import sqlite3
+    from path_codec import load_path
+    conn = sqlite3.connect(db_path)
+    for (value,) in conn.execute("SELECT mouse_path FROM login_attempts WHERE mouse_path IS NOT NULL"):
+        arr = load_path(value)
+        if len(arr) >= min_points:
+            yield arr
+    conn.close()
+
+
+if __name__ == '__main__':
+    import warnings
+    warnings.filterwarnings("ignore")
+    from features import extract_features
+    from compiled_forest import CompiledForest
+    engine = CompiledForest.load('model.pkl')
+
+    parser = argparse.ArgumentParser(description="Measure how path normalization moves features and verdicts")
+    parser.add_argument('db', nargs='?', default='database.db')
+    parser.add_argument('--evaluate', action='store_true')
+    parser.add_argument('--synthetic', type=int, default=0, help="use N generated paths instead of the database")
+    parser.add_argument('--limits', default='250,500,1000,2000')
+    parser.add_argument('--min-points', type=int, default=300)
+    args = parser.parse_args()
+    if not args.evaluate:
+        parser.print_help()
+        raise SystemExit(1)
+
+    paths = list(_synthetic_paths(args.synthetic) if args.synthetic else _db_paths(args.db, args.min_points))
+    print(f"Paths: {len(paths)} | median points: {int(np.median([len(p) for p in paths])) if paths else 0}")
+    if not paths:
+        raise SystemExit(0)
+
+    names = ["movement_time", "speed_variance", "path_efficiency", "curvature_sum"]
+    # Click / typing timings aren't stored with paths; hold them at typical human values
+    extras = [110.0, 250.0]
+
+    def score(p):
+        f = extract_features({"mouse_path": p})[:4] + extras
+        return np.array(f), engine.predict_one(f)
+
+    start = time.perf_counter()
+    baseline = [score(p) for p in paths]
+    base_ms = (time.perf_counter() - start) * 1000 / len(paths)
+
+    for limit in [int(x) for x in args.limits.split(',')]:
+        for method in METHODS:
+            for dedupe in (False, True):
+                drift, flips, prob_shift, spent = [], 0, [], 0.0
+                for p, (f0, (v0, p0)) in zip(paths, baseline):
+                    start = time.perf_counter()
+                    q = normalize_path(p, limit, dedupe, method)
+                    f1, (v1, p1) = score(q)
+                    spent += time.perf_counter() - start
+                    drift.append(np.abs(f1[:4] - f0[:4]) / np.maximum(np.abs(f0[:4]), 1e-9))
+                    flips += int(v0 != v1)
+                    prob_shift.append(abs(p1 - p0))
+                drift = np.array(drift)
+                med = " ".join(f"{n[:10]}={np.median(drift[:, i]) * 100:.1f}%" for i, n in enumerate(names))
+                print(f"limit={limit:5d} {method:6s} dedupe={str(dedupe):5s} | median drift {med} "
+                      f"| verdict flips {flips}/{len(paths)} | mean |dP| {np.mean(prob_shift):.3f} "
+                      f"| {spent * 1000 / len(paths):.2f} ms/path (full: {base_ms:.2f})")
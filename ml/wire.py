@@ -0,0 +1,140 @@
+"""
+Binary telemetry bodies for /predict and /session/* (Content-Type WIRE_MIMETYPE).
+
+The browser sends one ArrayBuffer instead of JSON text:
+
+    header  '<2sBBIIIHHid' (32 bytes)  magic b'RT', version, flags,
+            n_points, n_clicks, n_keys, screen width, height,
+            seq (-1 = none), t0 (epoch ms, float64)
+    body    x[n_points], y[n_points]    float32 (flags & FLAG_XY_FLOAT32) or int32
+            t[n_points]                 int32 ms since t0
+            clicks[n_clicks]            int32 ms since t0
+            keys[n_keys]                int32 ms since t0
+
+All little-endian, every column 4-byte aligned. decode() reads the columns
+with np.frombuffer, as views of the request bytes; the only copy is the
+single pass that widens them into the (n, 3) float64 path the feature math
+runs on. JSON bodies stay the default (see app.request_payload);
+useBehaviorTracking.js switches to this format when /session/start lists it.
+
+    python wire.py        # bytes on the wire and decode time, JSON vs binary
+"""
+import json
+import time
+import struct
+import argparse
+import numpy as np
+
+WIRE_MIMETYPE = "application/vnd.realones.telemetry"
+MAGIC = b'RT'
+VERSION = 1
+FLAG_XY_FLOAT32 = 0x01
+HEADER = struct.Struct('<2sBBIIIHHid')
+NO_SEQ = -1
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def decode(body):
+    """Wire bytes -> payload dict in the JSON body's shape (mouse_path as an (n, 3) array). Raises ValueError."""
+    if len(body) < HEADER.size:
+        raise ValueError(f"body shorter than the {HEADER.size}-byte header")
+    magic, version, flags, n, n_clicks, n_keys, width, height, seq, t0 = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError("not a telemetry body (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"unsupported telemetry version {version}")
+    expected = HEADER.size + 4 * (3 * n + n_clicks + n_keys)
+    if len(body) != expected:
+        raise ValueError(f"body is {len(body)} bytes, header describes {expected}")
+    if not np.isfinite(t0):
+        raise ValueError("t0 is not finite")
+
+    xy_dtype = '<f4' if flags & FLAG_XY_FLOAT32 else '<i4'
+    offset = HEADER.size
+    x = np.frombuffer(body, xy_dtype, n, offset)
+    y = np.frombuffer(body, xy_dtype, n, offset + 4 * n)
+    t = np.frombuffer(body, '<i4', n, offset + 8 * n)
+    clicks = np.frombuffer(body, '<i4', n_clicks, offset + 12 * n)
+    keys = np.frombuffer(body, '<i4', n_keys, offset + 12 * n + 4 * n_clicks)
+
+    path = np.empty((n, 3), dtype=np.float64)
+    path[:, 0] = x
+    path[:, 1] = y
+    np.add(t, t0, out=path[:, 2])
+    if flags & FLAG_XY_FLOAT32 and not np.all(np.isfinite(path[:, :2])):
+        raise ValueError("mouse_path has non-finite coordinates")
+    # Short lists, kept as plain lists: they go into input_timings JSON as they are.
+    # Date.now() is whole milliseconds, so they come back as the same ints the JSON body had
+    base = int(t0) if t0.is_integer() else t0
+    return {
+        "mouse_path": path,
+        "click_timestamps": [base + int(v) for v in clicks],
+        "keystroke_timestamps": [base + int(v) for v in keys],
+        "screen_width": width,
+        "screen_height": height,
+        "seq": None if seq == NO_SEQ else seq,
+    }
+
+
+def encode(payload, seq=None, xy_float32=None):
+    """The browser's encoder in Python (loadgen.py, bench.py). Same keys as the JSON body."""
+    path = np.asarray(payload.get('mouse_path', []), dtype=np.float64).reshape(-1, 3)
+    clicks = np.asarray(payload.get('click_timestamps', []), dtype=np.float64)
+    keys = np.asarray(payload.get('keystroke_timestamps', []), dtype=np.float64)
+    stamps = [a for a in (path[:, 2], clicks, keys) if len(a)]
+    t0 = float(stamps[0][0]) if stamps else 0.0
+    if xy_float32 is None:
+        xy_float32 = bool(len(path)) and not np.array_equal(path[:, :2], np.round(path[:, :2]))
+    xy_dtype = '<f4' if xy_float32 else '<i4'
+    header = HEADER.pack(MAGIC, VERSION, FLAG_XY_FLOAT32 if xy_float32 else 0, len(path), len(clicks), len(keys),
+                         int(payload.get('screen_width', 0)), int(payload.get('screen_height', 0)),
+                         NO_SEQ if seq is None else seq, t0)
+    xy = path[:, :2] if xy_float32 else np.round(path[:, :2])
+    offsets = [np.round(a - t0) for a in (path[:, 2], clicks, keys)]
+    if any(len(a) and np.abs(a).max() > INT32_MAX for a in offsets):
+        raise ValueError("timestamps span more than an int32 of milliseconds from the first one")
+    return b''.join([
+        header,
+        xy[:, 0].astype(xy_dtype).tobytes(), xy[:, 1].astype(xy_dtype).tobytes(),
+        *(a.astype('<i4').tobytes() for a in offsets),
+    ])
+
+
+# --- COMPARISON: BYTES AND DECODE TIME, JSON VS BINARY ---
+def _browser_payload(n, rng):
+    """What useBehaviorTracking records: integer clientX / clientY, Date.now() stamps 8-24 ms apart."""
+    xy = np.round(np.cumsum(rng.normal(0, 4, (n, 2)), axis=0) + 600)
+    t = 1.76e12 + np.cumsum(rng.integers(8, 24, n))
+    return {"mouse_path": np.column_stack([xy, t]).astype(np.int64).tolist(),
+            "click_timestamps": [int(t[-1]) + 40, int(t[-1]) + 150],
+            "keystroke_timestamps": (int(t[0]) + np.cumsum(rng.integers(90, 280, 20))).tolist(),
+            "screen_width": 1920, "screen_height": 1080}
+
+
+def _per_call_us(fn, min_time=0.2):
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        fn()
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare JSON and binary telemetry bodies")
+    parser.add_argument('--sizes', default="100,1000,10000,50000", help="comma-separated path lengths")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'points':>7} {'json B':>10} {'binary B':>10} {'smaller':>8} {'json us':>10} {'binary us':>10} {'faster':>7}")
+    for n in (int(s) for s in args.sizes.split(',')):
+        payload = _browser_payload(n, rng)
+        text = json.dumps(payload, separators=(',', ':')).encode()   # JSON.stringify has no spaces
+        body = encode(payload)
+        decoded = decode(body)
+        assert np.array_equal(decoded["mouse_path"], np.asarray(payload["mouse_path"], dtype=np.float64))
+        # What the server did with JSON: parse, then np.array the path for extract_features
+        json_us = _per_call_us(lambda: np.array(json.loads(text)["mouse_path"], dtype=np.float64))
+        wire_us = _per_call_us(lambda: decode(body))
+        print(f"{n:>7} {len(text):>10,} {len(body):>10,} {len(text) / len(body):>7.1f}x "
+              f"{json_us:>10.1f} {wire_us:>10.1f} {json_us / wire_us:>6.1f}x")